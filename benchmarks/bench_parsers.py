@@ -0,0 +1,122 @@
+"""Compare the single-pass parsers against the shell/regex code they replaced.
+
+Both sides read the captured files in fixtures/, so the numbers do not
+depend on the hardware the benchmark runs on.
+
+    python benchmarks/bench_parsers.py [--repeat 200]
+"""
+import os
+import re
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from laptopcheck_parsers import (  # noqa: E402
+    read_meminfo, read_cpuinfo, cpu_summary, parse_dmidecode, memory_devices, read_power_supply, batteries,
+)
+
+FIXTURES = os.path.join(ROOT, 'fixtures')
+MEMINFO = os.path.join(FIXTURES, 'proc_meminfo.txt')
+CPUINFO = os.path.join(FIXTURES, 'proc_cpuinfo.txt')
+DMIDECODE = os.path.join(FIXTURES, 'dmidecode_t17.txt')
+POWER_SUPPLY = os.path.join(FIXTURES, 'power_supply')
+
+
+# ========================================
+# Previous implementations, pointed at the fixtures
+# ========================================
+
+def legacy_meminfo():
+    return int(subprocess.check_output(f"cat {MEMINFO} | grep MemTotal | awk '{{print $2}}'", shell=True))
+
+
+def legacy_cpu_model():
+    with open(CPUINFO, 'r') as f:
+        for line in f:
+            if 'model name' in line.lower():
+                return line.split(':')[1].strip()
+    return None
+
+
+def legacy_ram_spd(text):
+    modules = []
+    for block in text.split("Memory Device")[1:]:
+        serial = re.search(r"Serial Number: (.+)", block)
+        part = re.search(r"Part Number: (.+)", block)
+        speed = re.search(r"Speed: (\d+)", block)
+        if part and "NO DIMM" not in part.group(1):
+            modules.append((part.group(1).strip(), serial.group(1).strip() if serial else None,
+                            int(speed.group(1)) if speed else None))
+    return modules
+
+
+def legacy_battery():
+    base = os.path.join(POWER_SUPPLY, 'BAT0')
+    info = {}
+    for name in ('capacity', 'cycle_count', 'manufacturer', 'manufacture_date',
+                 'energy_full_design', 'energy_full', 'status'):
+        path = os.path.join(base, name)
+        if os.path.exists(path):
+            info[name] = open(path).read().strip()
+    return info
+
+
+# ========================================
+# New parsers
+# ========================================
+
+def new_meminfo():
+    return read_meminfo(MEMINFO)['MemTotal']
+
+
+def new_cpu_model():
+    return cpu_summary(read_cpuinfo(CPUINFO))['model']
+
+
+def new_ram_spd(text):
+    return [(m['part'], m['serial'], m['speed_mts']) for m in memory_devices(parse_dmidecode(text)) if m['part']]
+
+
+def new_battery():
+    return batteries(read_power_supply(POWER_SUPPLY))[0]
+
+
+def _time(func, repeat):
+    return min(timeit.repeat(func, number=repeat, repeat=3)) / repeat * 1e6
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with open(DMIDECODE) as f:
+        dmi_text = f.read()
+
+    # Same answers before timing anything
+    assert legacy_meminfo() == new_meminfo()
+    assert legacy_cpu_model() == new_cpu_model()
+    assert legacy_ram_spd(dmi_text) == new_ram_spd(dmi_text)
+    assert {k: v for k, v in new_battery().items() if k in legacy_battery()} == legacy_battery()
+
+    cases = [
+        ("meminfo", legacy_meminfo, new_meminfo),
+        ("cpuinfo", legacy_cpu_model, new_cpu_model),
+        ("dmidecode", lambda: legacy_ram_spd(dmi_text), lambda: new_ram_spd(dmi_text)),
+        ("power_supply", legacy_battery, new_battery),
+    ]
+    print(f"{'source':<14}{'legacy µs':>12}{'parser µs':>12}{'speedup':>10}")
+    for name, old, new in cases:
+        # The shell pipeline forks three processes; a few runs are plenty
+        repeat = max(1, args.repeat // 20) if name == 'meminfo' else args.repeat
+        t_old, t_new = _time(old, repeat), _time(new, repeat)
+        print(f"{name:<14}{t_old:>12.1f}{t_new:>12.1f}{t_old / t_new:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
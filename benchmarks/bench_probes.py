@@ -0,0 +1,369 @@
+"""Replay captured hardware fixtures through the probes and catch regressions.
+
+Every data source the probes read (/proc files, dmidecode, the sysfs
+power_supply and net trees, lsblk, iwconfig / ip, wmic, netsh, the event logs) is pointed
+at a file in fixtures/ for the duration of a case, so the suite needs no
+hardware, no root and no external tools. Three recorded machines are
+replayed:
+
+    linux-nvme      single battery, sysfs net tree, NVMe system disk
+    linux-dual      two batteries (energy_* and charge_*), no sysfs net (iwconfig
+                    and ``ip link`` fallback), journald export
+    windows         wmic / netsh output, wevtutil XML export
+
+Each probe is timed per call (median, p95, calls/s), and two batch
+workloads replay 10k machines: every probe of every machine in turn, and
+condition scoring of 10k varied result sets (scalar and vectorised).
+
+    python benchmarks/bench_probes.py                   # compare with baseline
+    python benchmarks/bench_probes.py --save-baseline   # after an intended change
+
+The baseline stores each case's time relative to a fixed calibration loop
+timed right next to it, so it carries across machines of different speed
+and through frequency drift on the same one, and the probe outputs,
+so a change in what a probe returns fails too. Exit status 1 means a case
+slowed down by more than ``--tolerance`` or an output changed.
+"""
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import laptopcheck_eventlog as eventlog  # noqa: E402
+import laptopcheck_parsers as parsers  # noqa: E402
+import laptopcheck_pro as pro  # noqa: E402
+import laptopcheck_storage as storage  # noqa: E402
+from laptopcheck_model import StorageHealthResult, StressResult, to_dict  # noqa: E402
+from laptopcheck_scoring import columns, evaluate, features, load_policy  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, 'fixtures')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+BATCH = 10_000
+# Differences below this are timer noise, whatever the ratio
+NOISE_US = 5.0
+# Fields read from the machine running the suite rather than from fixtures
+HOST_FIELDS = ('architecture', 'cores')
+
+LSBLK = ('lsblk', '-o', 'NAME,SERIAL,MODEL', '-d', '-n', '-P')
+
+MACHINES = {
+    'linux-nvme': {
+        'os': 'linux',
+        'cpuinfo': 'proc_cpuinfo.txt',
+        'dmidecode': 'dmidecode_t17.txt',
+        'power_supply': 'power_supply',
+        'net': 'sys_class_net',
+        'sys_vendor': 'LENOVO',
+        'root_disk': 'nvme0n1',
+        'commands': {LSBLK: 'lsblk_P.txt', ('ip', 'link'): 'ip_link.txt'},
+        'smartctl': 'smartctl_nvme.json',
+        'probes': ('Processor', 'RAM SPD', 'Battery', 'WiFi MAC', 'Storage'),
+    },
+    'linux-dual': {
+        'os': 'linux',
+        'cpuinfo': 'proc_cpuinfo.txt',
+        'dmidecode': 'dmidecode_t17.txt',
+        'power_supply': os.path.join('dual_battery', 'power_supply'),
+        'root_disk': None,
+        'commands': {LSBLK: 'lsblk_P.txt', ('iwconfig',): 'iwconfig.txt', ('ip', 'link'): 'ip_link.txt'},
+        'eventlog': os.path.join('eventlog', 'journal.json'),
+        'smartctl': 'smartctl_ata.json',
+        'probes': ('Processor', 'RAM SPD', 'Battery', 'WiFi MAC', 'Storage', 'Event Log', 'Lid Opens'),
+    },
+    'windows': {
+        'os': 'windows',
+        'commands': {
+            ('wmic', 'cpu', 'get', 'name,numberofcores,numberoflogicalprocessors'): 'wmic_cpu.txt',
+            ('wmic', 'diskdrive', 'get', 'serialnumber,model'): 'wmic_diskdrive.txt',
+            ('netsh', 'wlan', 'show', 'interfaces'): 'netsh_wlan.txt',
+        },
+        'eventlog': os.path.join('eventlog', 'system.xml'),
+        'smartctl': 'smartctl_nvme.json',
+        'probes': ('Processor', 'WiFi MAC', 'Storage', 'Event Log', 'BIOS Flash'),
+    },
+}
+
+PROBES = {
+    'Processor': pro.get_processor_info,
+    'RAM SPD': pro.get_ram_spd,
+    'Battery': pro.get_battery_info_pro,
+    'WiFi MAC': pro.get_wifi_card,
+    'Storage': pro.get_storage_serial,
+    'Event Log': pro.get_event_log,
+    # Derived from the event log; the scheduler would pass its result in
+    'BIOS Flash': lambda: pro.get_bios_flash_count({'Event Log': pro.get_event_log()}),
+    'Lid Opens': lambda: pro.get_lid_open_count({'Event Log': pro.get_event_log()}),
+}
+
+
+def _output(result):
+    data = to_dict(result)
+    for name in HOST_FIELDS:
+        data.pop(name, None)
+    return data
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+# ========================================
+# REPLAY
+# ========================================
+
+class _Uncached:
+    """Stands in for the hardware inventory: every fact is collected again"""
+
+    @staticmethod
+    def get(key, collect):
+        return collect()
+
+
+@contextlib.contextmanager
+def replay(machine):
+    """Point laptopcheck_pro's data sources at one fixture machine"""
+    outputs = {argv: _fixture(name) for argv, name in machine['commands'].items()}
+
+    def run(argv, timeout=None, check=True):
+        try:
+            return outputs[tuple(argv)]
+        except KeyError:
+            raise FileNotFoundError(2, "No such file or directory", argv[0]) from None
+
+    patches = {
+        (pro, 'os_type'): machine['os'],
+        (pro, 'get_inventory'): _Uncached,
+        (pro, 'run'): run,
+        # No net tree means the probe falls back to commands, as in a container
+        (pro, 'read_net_interfaces'): lambda stats=True: [],
+        (pro, 'system_vendor'): lambda: machine.get('sys_vendor'),
+        (storage, 'disk_for_path'): lambda path: machine.get('root_disk'),
+    }
+    if 'cpuinfo' in machine:
+        path = os.path.join(FIXTURES, machine['cpuinfo'])
+        patches[(pro, 'read_cpuinfo')] = lambda: parsers.read_cpuinfo(path)
+    if 'dmidecode' in machine:
+        text = _fixture(machine['dmidecode'])
+        patches[(pro, 'read_dmidecode')] = lambda dmi_type=17: text
+    if 'power_supply' in machine:
+        root = os.path.join(FIXTURES, machine['power_supply'])
+        patches[(pro, 'read_power_supply')] = lambda: parsers.read_power_supply(root)
+    if 'net' in machine:
+        net_root = os.path.join(FIXTURES, machine['net'])
+        patches[(pro, 'read_net_interfaces')] = lambda stats=True: parsers.read_net_interfaces(net_root, stats)
+    if 'eventlog' in machine:
+        with open(os.path.join(FIXTURES, machine['eventlog']), 'rb') as f:
+            log = f.read()
+
+        def stream(argv, timeout=None):
+            for i in range(0, len(log), eventlog.READ_SIZE):
+                yield log[i:i + eventlog.READ_SIZE]
+        patches[(eventlog, 'stream')] = stream
+        # No bookmarks: every call reads the whole export again
+        patches[(eventlog, 'BOOKMARK_PATH')] = None
+
+    saved = {key: getattr(*key) for key in patches}
+    try:
+        for (module, name), value in patches.items():
+            setattr(module, name, value)
+        yield
+    finally:
+        for (module, name), value in saved.items():
+            setattr(module, name, value)
+
+
+def scan_results(name, machine):
+    """Probe results of one replayed machine plus the slow probes' recorded outcome"""
+    with replay(machine):
+        results = {probe: PROBES[probe]() for probe in machine['probes']}
+    smart = storage.parse_smartctl(json.loads(_fixture(machine['smartctl'])))
+    results['Storage Health'] = StorageHealthResult(
+        device=smart['device'], protocol=smart['protocol'], smart_passed=smart['passed'], wear=smart['wear'],
+        media_errors=smart['media_errors'], reallocated=smart['reallocated'],
+        seq_read=480.0 if smart['protocol'] == 'ATA' else 2900.0)
+    results['Stress'] = StressResult(temp_delta=31.0 if name == 'linux-dual' else 18.0)
+    return results
+
+
+def varied_results(base, n, seed=1):
+    """``n`` copies of ``base`` with battery, disk and thermal values spread like a real batch"""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        results = dict(base)
+        battery = results.get('Battery')
+        if battery is not None:
+            results['Battery'] = type(battery)(health=round(rng.uniform(55, 100), 1), cycles=rng.randrange(1200))
+        results['Storage Health'] = StorageHealthResult(
+            smart_passed=rng.random() > 0.02, wear=rng.randrange(100), media_errors=rng.choice((0, 0, 0, 3)),
+            seq_read=rng.uniform(80, 3500))
+        results['Stress'] = StressResult(temp_delta=rng.uniform(5, 40))
+        out.append(results)
+    return out
+
+
+# ========================================
+# MEASUREMENT
+# ========================================
+
+def measure(func, seconds=0.3, min_calls=30):
+    """Per-call latency (µs) over at least ``seconds`` and ``min_calls``"""
+    samples = []
+    clock = time.perf_counter_ns
+    deadline = time.perf_counter() + seconds
+    while len(samples) < min_calls or time.perf_counter() < deadline:
+        t0 = clock()
+        func()
+        samples.append((clock() - t0) / 1000)
+    samples.sort()
+    median = statistics.median(samples)
+    return {'calls': len(samples), 'median_us': round(median, 2),
+            'p95_us': round(samples[int(len(samples) * 0.95) - 1], 2),
+            'per_s': round(1e6 / median, 1) if median else None}
+
+
+def measure_once(func, count):
+    t0 = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - t0
+    return {'calls': count, 'median_us': round(elapsed / count * 1e6, 2), 'p95_us': None,
+            'total_s': round(elapsed, 3), 'per_s': round(count / elapsed, 1)}
+
+
+_CALIBRATION_DATA = {'k%d' % i: [i, str(i), i / 3] for i in range(200)}
+
+
+def _calibration_work():
+    sorted(json.loads(json.dumps(_CALIBRATION_DATA)).items(), key=lambda kv: kv[1][2])
+
+
+def calibrate(seconds=0.1):
+    """Median µs of a fixed pure-Python workload, the unit baselines are stored in"""
+    return measure(_calibration_work, seconds)['median_us']
+
+
+def timed(measurement, rounds=3):
+    """Best of ``rounds`` runs of ``measurement``, each between two calibrations.
+
+    Shared and frequency-scaled CPUs drift by 2x within a minute; comparing
+    each run with the calibration taken right next to it cancels most of
+    that, and keeping the least disturbed round removes the rest.
+    """
+    best = None
+    for _ in range(rounds):
+        before = calibrate()
+        result = measurement()
+        unit = (before + calibrate()) / 2
+        result['calibration_us'] = round(unit, 2)
+        result['relative'] = result['median_us'] / unit
+        if best is None or result['relative'] < best['relative']:
+            best = result
+    return best
+
+
+def run_suite(quick=False):
+    """(cases, outputs): timings per case and the JSON of every probe result"""
+    seconds = 0.05 if quick else 0.2
+    batch = BATCH // 10 if quick else BATCH
+    cases, outputs = {}, {}
+    condition = pro.calculate_condition_score
+    for name, machine in MACHINES.items():
+        with replay(machine):
+            for probe in machine['probes']:
+                func = PROBES[probe]
+                outputs[f"{name}/{probe}"] = _output(func())
+                cases[f"{name}/{probe}"] = timed(lambda: measure(func, seconds))
+        results = scan_results(name, machine)
+        outputs[f"{name}/Condition"] = _output(condition(results))
+        cases[f"{name}/Condition"] = timed(lambda: measure(lambda: condition(results), seconds))
+
+    # Batch: ``batch`` machines, every probe of each, cycling through the recordings
+    def scan_batch():
+        names = list(MACHINES)
+        for i in range(batch):
+            machine = MACHINES[names[i % len(names)]]
+            with replay(machine):
+                for probe in machine['probes']:
+                    PROBES[probe]()
+    cases[f"batch/scan-{batch}"] = timed(lambda: measure_once(scan_batch, batch), rounds=2)
+
+    base = scan_results('linux-nvme', MACHINES['linux-nvme'])
+    population = varied_results(base, batch)
+    cases[f"batch/condition-{batch}"] = timed(lambda: measure_once(lambda: [condition(r) for r in population], batch))
+    policy = load_policy()
+    cols = columns(features(r) for r in population)
+    cases[f"batch/evaluate-{batch}"] = timed(lambda: measure_once(lambda: evaluate(policy, cols), batch))
+    return cases, outputs
+
+
+def compare(cases, outputs, baseline, tolerance):
+    """List of failure messages against a stored baseline"""
+    failures = []
+    for case, now in cases.items():
+        before = baseline['cases'].get(case)
+        if before is None:
+            continue
+        # The baseline's relative cost at the speed this machine had during the case
+        expected = before['relative'] * now['calibration_us']
+        if now['relative'] > before['relative'] * (1 + tolerance) and now['median_us'] - expected > NOISE_US:
+            failures.append(f"{case}: {now['median_us']:.1f} µs vs {expected:.1f} µs expected "
+                            f"({now['relative'] / before['relative'] - 1:+.0%})")
+    for case, value in outputs.items():
+        if case in baseline['outputs'] and baseline['outputs'][case] != value:
+            failures.append(f"{case}: output changed\n    was {json.dumps(baseline['outputs'][case])}"
+                            f"\n    now {json.dumps(value)}")
+    return failures
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--baseline', default=BASELINE, help="baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="record this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.3, help="allowed slowdown (default: 0.3 = 30%%)")
+    parser.add_argument('--quick', action='store_true', help="shorter runs and a 1k batch (timings not compared)")
+    parser.add_argument('--json', metavar='PATH', help="also write this run's results as JSON")
+    args = parser.parse_args(argv)
+
+    cases, outputs = run_suite(args.quick)
+
+    print(f"{'case':<28}{'median µs':>12}{'p95 µs':>10}{'per s':>12}{'relative':>10}")
+    for case, r in cases.items():
+        p95 = f"{r['p95_us']:.1f}" if r['p95_us'] is not None else '-'
+        print(f"{case:<28}{r['median_us']:>12.1f}{p95:>10}{r['per_s']:>12.0f}{r['relative']:>10.4f}")
+
+    record = {'python': sys.version.split()[0], 'cases': cases, 'outputs': outputs}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=1)
+    if args.save_baseline:
+        if args.quick:
+            parser.error("--save-baseline needs a full run (drop --quick)")
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if args.quick:
+        baseline = dict(baseline, cases={})
+    failures = compare(cases, outputs, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    print(f"{len(failures)} regression(s)" if failures else "no regressions")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,21 @@
 import platform
 import os
 import sys
-import subprocess
-import multiprocessing
 import time
-import tkinter as tk
-from tkinter import ttk, messagebox
-import pygame
 import datetime
 import webbrowser
-import base64
-from io import BytesIO
-import matplotlib.pyplot as plt  # For simple plots in report
+import html
+import collections
+import queue
+import threading
 
-# Initialize pygame for sound
-pygame.mixer.init()
+from laptopcheck_cmd import run
+from laptopcheck_parsers import (
+    read_meminfo, read_dmidecode, parse_dmidecode, memory_devices, read_power_supply, batteries, to_int,
+)
+
+# tkinter and the audio stack are imported where they are used so the
+# window appears quickly and a missing audio device does not stop startup.
 
 def get_os_type():
     return platform.system().lower()
@@ -29,14 +30,14 @@ def get_processor_info():
     # No direct "usage hours" for processor, approximate with system uptime
     try:
         if 'windows' in get_os_type():
-            uptime = subprocess.check_output('net stats workstation').decode()
+            uptime = run(['net', 'stats', 'workstation'])
             uptime = uptime.split('\n')[2].split()[-1]
         elif 'linux' in get_os_type():
             with open('/proc/uptime', 'r') as f:
                 uptime = float(f.read().split()[0]) / 3600  # hours
                 uptime = f"{uptime:.2f} hours"
         elif 'darwin' in get_os_type():
-            uptime = subprocess.check_output(['sysctl', '-n', 'kern.boottime']).decode().strip()
+            uptime = run(['sysctl', '-n', 'kern.boottime']).strip()
             # Simplified, actual calculation needed
             uptime = "Uptime info (Mac)"
         else:
@@ -51,20 +52,17 @@ def get_ram_info():
     info = {}
     try:
         if 'linux' in os_type:
-            total = int(subprocess.check_output("cat /proc/meminfo | grep MemTotal | awk '{print $2}'", shell=True)) / 1024 / 1024
+            total = read_meminfo()['MemTotal'] / 1024 / 1024
             info['Total RAM (GB)'] = f"{total:.2f}"
 
             # Auto sudo for dmidecode
-            cmd = "sudo -n dmidecode -t 17 2>/dev/null || dmidecode -t 17"
-            output = subprocess.check_output(cmd, shell=True).decode()
-            speeds = [line for line in output.splitlines() if "Speed:" in line and "MHz" in line]
+            speeds = [m['speed_mts'] for m in memory_devices(parse_dmidecode(read_dmidecode(17))) if m['speed_mts']]
             if speeds:
-                speed = speeds[0].split(':')[1].strip().split()[0]
-                info['Speed'] = f"{speed} MHz"
+                info['Speed'] = f"{speeds[0]} MHz"
             else:
                 info['Speed'] = "Unknown"
         # ... keep others
-    except:
+    except Exception:
         info['Speed'] = "Error (run with sudo)"
     return info
 
@@ -73,24 +71,17 @@ def get_battery_info():
     info = {}
     try:
         if 'linux' in os_type:
-            capacity_path = '/sys/class/power_supply/BAT0/capacity'
-            status_path = '/sys/class/power_supply/BAT0/status'
-            cycle_path = '/sys/class/power_supply/BAT0/cycle_count'
-            design_path = '/sys/class/power_supply/BAT0/charge_full_design'
-            full_path = '/sys/class/power_supply/BAT0/charge_full'
-
-            if os.path.exists(capacity_path):
-                capacity = int(open(capacity_path).read().strip())
-                status = open(status_path).read().strip()
-                cycle = open(cycle_path).read().strip() if os.path.exists(cycle_path) else "N/A"
-                design = int(open(design_path).read().strip()) if os.path.exists(design_path) else 0
-                full = int(open(full_path).read().strip()) if os.path.exists(full_path) else 0
+            found = batteries(read_power_supply())
+            if found:
+                bat = found[0]
+                design = to_int(bat.get('charge_full_design') or bat.get('energy_full_design')) or 0
+                full = to_int(bat.get('charge_full') or bat.get('energy_full')) or 0
 
                 health = (full / design * 100) if design > 0 else 0
 
-                info['Current Charge'] = f"{capacity}%"
-                info['Status'] = status
-                info['Cycle Count'] = cycle
+                info['Current Charge'] = f"{bat.get('capacity', 'N/A')}%"
+                info['Status'] = bat.get('status', 'Unknown')
+                info['Cycle Count'] = bat.get('cycle_count', 'N/A')
                 info['Health'] = f"{health:.1f}%"
                 if design and full:
                     info['Capacity'] = f"{design//1000} mWh → {full//1000} mWh"
@@ -102,60 +93,112 @@ def get_battery_info():
     return info
 
 
-def test_speakers():
+def test_speakers(stop_event=None):
     try:
-        pygame.mixer.quit()
-        pygame.mixer.init(frequency=44100, size=-16, channels=1, buffer=512)
-        # Generate 440 Hz tone (A4)
-        import numpy as np
-        sample_rate = 44100
-        duration = 1.5
-        freq = 440
-        t = np.linspace(0, duration, int(sample_rate * duration), False)
-        tone = np.sin(freq * t * 2 * np.pi)
-        sound = np.int16(tone * 32767)
-        sound_array = pygame.sndarray.make_sound(sound)
-        sound_array.play()
-        while pygame.mixer.get_busy():
-            time.sleep(0.1)
-        return "Played 440 Hz tone"
+        from laptopcheck_audio import run_loopback
+        # Plays and records on the scan thread; the event lets Cancel stop the stream
+        r = run_loopback(stop_event=stop_event)
+    except ImportError:
+        return "Speaker test failed (install numpy and sounddevice)"
     except Exception as e:
         return f"Speaker test failed: {e}"
+    if r is None:
+        return "Cancelled"
+    if r['problems']:
+        return "; ".join(r['problems'])
+    snr = min(c['snr_db'] for c in r['channels'])
+    return f"Both channels working (SNR {snr:.0f} dB, latency {r['latency_ms']:.0f} ms)"
 
-def test_keyboard(root):
-    def on_key(event):
-        messagebox.showinfo("Keyboard Test", f"Key '{event.keysym}' pressed successfully!")
-        root.unbind('<Key>')
-    
-    messagebox.showinfo("Keyboard Test", "Press any key to test.")
-    root.bind('<Key>', on_key)
-    return "User interaction"
+def test_keyboard(root, on_done):
+    """Open the keyboard matrix test beside the scan; ``on_done(text)`` runs on the Tk thread when finished"""
+    from laptopcheck_keyboard import KeyboardTest, summary
+    return KeyboardTest(root, lambda r: on_done(summary(r)))
 
-def stress_test(duration=30):
+def stress_test(duration=30, kernel='int', stop_event=None, on_sample=None):
     try:
-        import psutil
-        start_temp = psutil.sensors_temperatures().get('coretemp', [{}])[0].current if 'coretemp' in psutil.sensors_temperatures() else None
-
-        def worker():
-            start = time.time()
-            while time.time() - start < duration:
-                _ = [x*x for x in range(1000)]
-        
-        processes = [multiprocessing.Process(target=worker) for _ in range(os.cpu_count())]
-        for p in processes: p.start()
-        for p in processes: p.join()
-
-        end_temp = psutil.sensors_temperatures().get('coretemp', [{}])[0].current if 'coretemp' in psutil.sensors_temperatures() else None
-        temp_str = f"{start_temp}°C → {end_temp}°C" if start_temp and end_temp else "N/A"
-        return f"Completed. Temp: {temp_str}"
-    except:
+        from laptopcheck_stress import run_stress, format_rate
+        r = run_stress(duration, kernel, stop_event=stop_event, on_sample=on_sample)
+        start, end = r['start_temp'], r['steady_temp']
+        temp_str = f"{start:.1f}°C → {end:.1f}°C (peak {r['peak_temp']:.1f}°C)" if start and end else "N/A"
+        state = "Cancelled after" if r['cancelled'] else "Completed in"
+        return f"{state} {r['duration']:.0f}s. Temp: {temp_str}, throughput {format_rate(r['throughput'], r['unit'])}"
+    except ImportError:
         return "Stress test failed (install psutil)"
-    
+
+# ========================================
+# GUI
+# ========================================
+
+# Scan steps run in order on a worker thread: (name, seconds it usually takes or None)
+STEPS = (('Processor', None), ('RAM', None), ('Battery', None), ('Speakers', 2.5), ('Stress Test', 10))
+POLL_MS = 50
+# Chart redraws are capped at this rate however fast samples arrive
+CHART_FPS = 10
+CHART_POINTS = 240
+
+
+class LiveChart:
+    """Canvas line chart of CPU temperature and frequency, redrawn at most CHART_FPS times a second.
+
+    Lines are created once and moved with ``coords``, so a redraw costs the
+    same however long the scan runs.
+    """
+
+    SERIES = (('cpu_temp', '°C', '#e74c3c'), ('cpu_freq', 'MHz', '#2980b9'))
+
+    def __init__(self, parent, width=560, height=160):
+        import tkinter as tk
+        self.width, self.height, self.pad = width, height, 28
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg='white', highlightthickness=0)
+        self.points = {key: collections.deque(maxlen=CHART_POINTS) for key, _, _ in self.SERIES}
+        self.lines, self.labels = {}, {}
+        for n, (key, unit, color) in enumerate(self.SERIES):
+            self.lines[key] = self.canvas.create_line(0, 0, 0, 0, fill=color, width=2)
+            self.labels[key] = self.canvas.create_text(self.pad + n * 180, 10, anchor='w', fill=color,
+                                                       font=('Helvetica', 9), text=f"{key}: -- {unit}")
+        self.dirty = False
+        self.last_draw = 0.0
+
+    def add(self, t, values):
+        for key in self.points:
+            if values.get(key) is not None:
+                self.points[key].append((t, values[key]))
+                self.dirty = True
+
+    def clear(self):
+        for points in self.points.values():
+            points.clear()
+        self.dirty = True
+
+    def draw(self, force=False):
+        now = time.monotonic()
+        if not self.dirty or (not force and now - self.last_draw < 1 / CHART_FPS):
+            return
+        self.dirty, self.last_draw = False, now
+        pad, w, h = self.pad, self.width, self.height
+        for key, unit, _ in self.SERIES:
+            points = self.points[key]
+            if len(points) < 2:
+                self.canvas.coords(self.lines[key], 0, 0, 0, 0)
+                continue
+            t0, t1 = points[0][0], points[-1][0]
+            lo, hi = min(v for _, v in points), max(v for _, v in points)
+            span_t, span_v = (t1 - t0) or 1, (hi - lo) or 1
+            coords = []
+            for t, v in points:
+                coords += [pad + (t - t0) / span_t * (w - 2 * pad), h - pad - (v - lo) / span_v * (h - 2 * pad)]
+            self.canvas.coords(self.lines[key], *coords)
+            self.canvas.itemconfigure(self.labels[key], text=f"{key}: {points[-1][1]:.0f} {unit} "
+                                                              f"({lo:.0f}-{hi:.0f})")
+
+
 class LaptopCheckApp:
     def __init__(self, root):
+        import tkinter as tk
+        from tkinter import ttk
         self.root = root
         self.root.title("LaptopCheck AI")
-        self.root.geometry("600x400")
+        self.root.geometry("640x720")
         self.root.configure(bg='#f0f0f0')
         
         style = ttk.Style()
@@ -166,73 +209,185 @@ class LaptopCheckApp:
         self.frame = ttk.Frame(root, padding=20)
         self.frame.pack(fill='both', expand=True)
         
-        ttk.Label(self.frame, text="Laptop Diagnostics Tool").grid(row=0, column=0, columnspan=2, pady=10)
+        ttk.Label(self.frame, text="Laptop Diagnostics Tool").grid(row=0, column=0, columnspan=3, pady=10)
         
         self.run_button = ttk.Button(self.frame, text="Run Diagnostics", command=self.run_diagnostics)
         self.run_button.grid(row=1, column=0, pady=10)
+
+        self.cancel_button = ttk.Button(self.frame, text="Cancel", command=self.cancel, state='disabled')
+        self.cancel_button.grid(row=1, column=1, pady=10)
         
         self.report_button = ttk.Button(self.frame, text="Generate Report", command=self.generate_report, state='disabled')
-        self.report_button.grid(row=1, column=1, pady=10)
+        self.report_button.grid(row=1, column=2, pady=10)
+
+        # One progress bar per step, plus the keyboard check that waits on the user
+        progress = ttk.Frame(self.frame)
+        progress.grid(row=2, column=0, columnspan=3, sticky='ew', pady=5)
+        self.bars, self.states = {}, {}
+        for n, name in enumerate([s for s, _ in STEPS] + ['Keyboard']):
+            ttk.Label(progress, text=name, width=12).grid(row=n, column=0, sticky='w')
+            self.bars[name] = ttk.Progressbar(progress, length=320, maximum=100)
+            self.bars[name].grid(row=n, column=1, padx=5, pady=2)
+            self.states[name] = ttk.Label(progress, text="", width=14)
+            self.states[name].grid(row=n, column=2, sticky='w')
+
+        self.chart = LiveChart(self.frame)
+        self.chart.canvas.grid(row=3, column=0, columnspan=3, pady=10)
         
-        self.results_text = tk.Text(self.frame, height=15, width=70, font=('Courier', 10))
-        self.results_text.grid(row=2, column=0, columnspan=2, pady=10)
+        self.results_text = tk.Text(self.frame, height=10, width=70, font=('Courier', 10))
+        self.results_text.grid(row=4, column=0, columnspan=3, pady=10)
         
         self.results = {}
+        self.events = queue.Queue()
+        self.stop_event = threading.Event()
+        self.worker = None
+        self.running = {}
+        self.keyboard = None
+
+    # ----------------------------------------
+    # Scan thread (never touches Tk)
+    # ----------------------------------------
+
+    def _scan(self, stop_event, events):
+        steps = {
+            'Processor': get_processor_info,
+            'RAM': get_ram_info,
+            'Battery': get_battery_info,
+            'Speakers': lambda: test_speakers(stop_event),
+            'Stress Test': lambda: stress_test(10, stop_event=stop_event,
+                                               on_sample=lambda t, values: events.put(('sample', t, values))),
+        }
+        try:
+            for name, _ in STEPS:
+                if stop_event.is_set():
+                    events.put(('done', name, "Cancelled"))
+                    continue
+                events.put(('start', name))
+                try:
+                    result = steps[name]()
+                except Exception as e:
+                    result = f"{type(e).__name__}: {e}"
+                events.put(('done', name, result))
+        finally:
+            events.put(('finished',))
+
+    # ----------------------------------------
+    # Tk thread
+    # ----------------------------------------
 
     def run_diagnostics(self):
+        import tkinter as tk
         self.results = {}
-        self.results['Processor'] = get_processor_info()
-        self.results['RAM'] = get_ram_info()
-        self.results['Battery'] = get_battery_info()
-        self.results['Speakers'] = test_speakers()
-        self.results['Keyboard'] = test_keyboard(self.root)
-        stress_result = stress_test(10)  # Short test
-        self.results['Stress Test'] = stress_result
-        
         self.results_text.delete(1.0, tk.END)
-        for section, data in self.results.items():
-            self.results_text.insert(tk.END, f"{section}:\n")
-            if isinstance(data, dict):
-                for k, v in data.items():
-                    self.results_text.insert(tk.END, f"  {k}: {v}\n")
-            else:
-                self.results_text.insert(tk.END, f"  {data}\n")
-            self.results_text.insert(tk.END, "\n")
-        
+        self.chart.clear()
+        for name in self.bars:
+            self.bars[name].stop()
+            self.bars[name].configure(mode='determinate', value=0)
+            self.states[name].configure(text="waiting")
+        if self.keyboard is not None and not self.keyboard.finished:
+            # A test window left open from the previous scan must not report into this one
+            self.keyboard.on_done = None
+            self.keyboard.finish()
+        self.states['Keyboard'].configure(text="press every key")
+        self.keyboard = test_keyboard(self.root, lambda text: self._finish_step('Keyboard', text))
+
+        self.run_button['state'] = 'disabled'
+        self.report_button['state'] = 'disabled'
+        self.cancel_button['state'] = 'normal'
+        # Fresh event and queue per scan, so a cancelled scan's stragglers cannot leak into the next
+        self.stop_event, self.events = threading.Event(), queue.Queue()
+        self.running = {}
+        self.worker = threading.Thread(target=self._scan, args=(self.stop_event, self.events), daemon=True)
+        self.worker.start()
+        self.root.after(POLL_MS, self._poll, self.events)
+
+    def cancel(self):
+        self.stop_event.set()
+        self.cancel_button['state'] = 'disabled'
+        for name in self.running:
+            self.states[name].configure(text="cancelling...")
+
+    def _poll(self, events):
+        finished = False
+        # Bounded per tick, so a burst of samples cannot starve the event loop
+        for _ in range(500):
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == 'start':
+                self._start_step(event[1])
+            elif kind == 'done':
+                self._finish_step(event[1], event[2])
+            elif kind == 'sample':
+                self.chart.add(event[1], event[2])
+            elif kind == 'finished':
+                finished = True
+        now = time.monotonic()
+        for name, (started, expected) in self.running.items():
+            if expected:
+                self.bars[name]['value'] = min(99, (now - started) / expected * 100)
+        self.chart.draw(force=finished)
+        if finished:
+            self._scan_finished()
+        elif events is self.events:
+            self.root.after(POLL_MS, self._poll, events)
+
+    def _start_step(self, name):
+        expected = dict(STEPS).get(name)
+        self.running[name] = (time.monotonic(), expected)
+        self.states[name].configure(text="running")
+        if not expected:
+            self.bars[name].configure(mode='indeterminate')
+            self.bars[name].start(15)
+
+    def _finish_step(self, name, result):
+        import tkinter as tk
+        self.running.pop(name, None)
+        self.results[name] = result
+        bar = self.bars[name]
+        bar.stop()
+        bar.configure(mode='determinate', value=100)
+        self.states[name].configure(text="cancelled" if result == "Cancelled" else "done")
+        self.results_text.insert(tk.END, f"{name}:\n")
+        if isinstance(result, dict):
+            for k, v in result.items():
+                self.results_text.insert(tk.END, f"  {k}: {v}\n")
+        else:
+            self.results_text.insert(tk.END, f"  {result}\n")
+        self.results_text.insert(tk.END, "\n")
+        self.results_text.see(tk.END)
+
+    def _scan_finished(self):
+        if 'Keyboard' not in self.results:
+            # The keyboard test goes on at the tester's pace; its result is added when they click Finish
+            self.states['Keyboard'].configure(text="click Finish")
+        self.run_button['state'] = 'normal'
+        self.cancel_button['state'] = 'disabled'
         self.report_button['state'] = 'normal'
 
     def generate_report(self):
-        html = "<html><body><h1>LaptopCheck AI Report</h1>"
-        html += f"<p>Date: {datetime.datetime.now()}</p>"
-        for section, data in self.results.items():
-            html += f"<h2>{section}</h2><ul>"
-            if isinstance(data, dict):
-                for k, v in data.items():
-                    html += f"<li><b>{k}:</b> {v}</li>"
-            else:
-                html += f"<li>{data}</li>"
-            html += "</ul>"
-        
-        # Add a simple plot for visualization
-        fig, ax = plt.subplots()
-        ax.plot([0, 1], [0, 1])  # Dummy plot, replace with real data like CPU load
-        ax.set_title("Sample Diagnostic Plot")
-        buffer = BytesIO()
-        fig.savefig(buffer, format='png')
-        buffer.seek(0)
-        image_png = buffer.getvalue()
-        graphic = base64.b64encode(image_png).decode('utf-8')
-        html += f'<img src="data:image/png;base64,{graphic}"/>'
-        
-        html += "</body></html>"
-        
-        with open('laptop_report.html', 'w') as f:
-            f.write(html)
-        
+        from tkinter import messagebox
+        # Written section by section; no plot until there is real data to chart
+        with open('laptop_report.html', 'w', encoding='utf-8') as f:
+            f.write("<html><head><meta charset=\"utf-8\"></head><body><h1>LaptopCheck AI Report</h1>")
+            f.write(f"<p>Date: {datetime.datetime.now()}</p>")
+            for section, data in self.results.items():
+                f.write(f"<h2>{html.escape(section)}</h2><ul>")
+                if isinstance(data, dict):
+                    for k, v in data.items():
+                        f.write(f"<li><b>{html.escape(str(k))}:</b> {html.escape(str(v))}</li>")
+                else:
+                    f.write(f"<li>{html.escape(str(data))}</li>")
+                f.write("</ul>")
+            f.write("</body></html>")
+
         webbrowser.open('laptop_report.html')
         messagebox.showinfo("Report", "Report generated and opened. Print from browser.")
 
 if __name__ == "__main__":
+    import tkinter as tk
     root = tk.Tk()
     app = LaptopCheckApp(root)
     root.mainloop()
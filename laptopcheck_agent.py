@@ -0,0 +1,518 @@
+"""Scan agent and collector service for supervising many bench machines.
+
+Each bench machine runs the probes as an agent and streams typed results to
+one collector over TCP, one JSON object per line:
+
+    agent -> {"kind": "hello", "agent": "...", "hostname": "...", "probes": [...], "token": "..."}
+    agent -> {"kind": "result", "name": "Battery", "result": {"type": "BatteryResult", ...}}
+    agent -> {"kind": "done", "key": "...", "scan": {"type": "ScanResult", ...}}
+    agent <- {"kind": "stored", "scan_id": 1234}
+
+The collector serves every agent from one asyncio loop, queues finished
+scans and writes them to the fleet database in batches (one transaction
+per batch), and keeps a live table of every agent's progress:
+
+    python laptopcheck_agent.py collect --db fleet.db --host 0.0.0.0
+    python laptopcheck_agent.py agent --collector 10.0.0.5:47800
+    python laptopcheck_agent.py status --collector 10.0.0.5:47800
+
+A ``{"kind": "status"}`` line on a fresh connection returns the same
+progress table as JSON. The collector listens on localhost unless told
+otherwise; set a shared ``--token`` (or $LAPTOPCHECK_TOKEN) before exposing
+it on a bench network.
+
+Every scan carries an idempotency ``key`` (machine identity, hostname and
+start time), so a resend after a lost reply is stored only once. A scan
+the collector cannot take is spooled to disk and sent again by the next
+agent run on that machine (or ``agent --flush``).
+"""
+import asyncio
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import platform
+import socket
+import sys
+import time
+import uuid
+
+from laptopcheck_inventory import CACHE_PATH
+from laptopcheck_model import Status, from_dict, to_dict
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 47800
+TOKEN_ENV = 'LAPTOPCHECK_TOKEN'
+# Scans are written when this many are queued or the oldest has waited this long
+BATCH_SIZE = 32
+BATCH_INTERVAL = 1.0
+# Largest accepted line; a full scan with telemetry series is well below this
+MAX_LINE = 16 * 1024 * 1024
+REFRESH = 1.0
+SPOOL_DIR = os.path.join(os.path.dirname(CACHE_PATH), 'spool')
+
+
+def encode(message):
+    return (json.dumps(message, ensure_ascii=False, separators=(',', ':'), default=str) + "\n").encode()
+
+
+def parse_address(text):
+    host, _, port = (text or '').rpartition(':')
+    return host or DEFAULT_HOST, int(port or DEFAULT_PORT)
+
+
+def scan_key(scan):
+    """Idempotency key of a scan: the same machine, host and start time is the same scan"""
+    blob = json.dumps([scan.machine, scan.hostname, scan.started], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+# ========================================
+# COLLECTOR
+# ========================================
+
+class AgentState:
+    """What the collector knows about one connected (or finished) agent."""
+
+    __slots__ = ('agent', 'hostname', 'address', 'expected', 'done', 'problems', 'state', 'grade',
+                 'score', 'scan_id', 'connected', 'last_seen')
+
+    def __init__(self, agent, hostname, address, expected):
+        self.agent = agent
+        self.hostname = hostname
+        self.address = address
+        self.expected = expected
+        self.done = []
+        self.problems = []
+        self.state = 'scanning'
+        self.grade = self.score = self.scan_id = None
+        self.connected = self.last_seen = time.time()
+
+    def snapshot(self):
+        return {
+            'agent': self.agent, 'hostname': self.hostname, 'address': self.address, 'state': self.state,
+            'done': len(self.done), 'expected': self.expected, 'last': self.done[-1] if self.done else None,
+            'problems': self.problems, 'grade': self.grade, 'score': self.score, 'scan_id': self.scan_id,
+            'elapsed': round(self.last_seen - self.connected, 1),
+        }
+
+
+class Collector:
+    """Asyncio TCP service that receives agent scans and batches them into a FleetDB."""
+
+    def __init__(self, db_path, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None,
+                 batch_size=BATCH_SIZE, batch_interval=BATCH_INTERVAL):
+        self.db_path = db_path
+        self.host, self.port = host, port
+        self.token = token
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.agents = {}
+        self.stored = 0
+        self.batches = 0
+        self._queue = None
+        self._server = None
+        self._writer_task = None
+
+    # ----------------------------------------
+    # Connections
+    # ----------------------------------------
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        address = f"{peer[0]}:{peer[1]}" if peer else None
+        state = None
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            hello = json.loads(line)
+            if hello.get('kind') == 'status':
+                writer.write(encode({'kind': 'status', **self.status()}))
+                await writer.drain()
+                return
+            if hello.get('kind') != 'hello':
+                raise ValueError("expected hello")
+            token = str(hello.get('token') or '').encode()
+            if self.token and not hmac.compare_digest(token, self.token.encode()):
+                writer.write(encode({'kind': 'error', 'message': "bad token"}))
+                await writer.drain()
+                return
+            state = AgentState(hello.get('agent') or uuid.uuid4().hex, hello.get('hostname'), address,
+                               len(hello.get('probes') or ()))
+            self.agents[state.agent] = state
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                state.last_seen = time.time()
+                kind = message.get('kind')
+                if kind == 'result':
+                    self._progress(state, message['name'], message.get('result'))
+                elif kind == 'done':
+                    scan = from_dict(message['scan'])
+                    state.state = 'storing'
+                    condition = scan.condition
+                    state.grade, state.score = getattr(condition, 'grade', None), getattr(condition, 'score', None)
+                    stored = asyncio.get_running_loop().create_future()
+                    await self._queue.put((scan, message.get('key'), stored))
+                    state.scan_id = await stored
+                    state.state = 'stored'
+                    writer.write(encode({'kind': 'stored', 'scan_id': state.scan_id}))
+                    await writer.drain()
+                    break
+        except (ValueError, KeyError, TypeError) as e:
+            if state is not None:
+                state.state = 'error'
+                state.problems.append(f"protocol: {e}")
+            writer.write(encode({'kind': 'error', 'message': str(e)}))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            # A failed batch write reaches the agent through its future
+            if state is not None:
+                state.state = 'error'
+                state.problems.append(f"{type(e).__name__}: {e}")
+            writer.write(encode({'kind': 'error', 'message': f"{type(e).__name__}: {e}"}))
+        finally:
+            if state is not None and state.state == 'scanning':
+                state.state = 'disconnected'
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    def _progress(state, name, data):
+        state.done.append(name)
+        status = (data or {}).get('status') if isinstance(data, dict) else None
+        if status in (Status.FAIL.value, Status.ERROR.value, Status.WARN.value):
+            state.problems.append(f"{name}: {status}")
+
+    # ----------------------------------------
+    # Storage
+    # ----------------------------------------
+
+    async def _writer(self):
+        from laptopcheck_db import FleetDB
+        db = await asyncio.to_thread(FleetDB, self.db_path)
+        try:
+            closing = False
+            while not closing:
+                item = await self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.batch_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), deadline - time.monotonic())
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        closing = True
+                        break
+                    batch.append(item)
+                scans = [scan for scan, _, _ in batch]
+                keys = [key for _, key, _ in batch]
+                try:
+                    # sqlite blocks; keep the loop serving agents meanwhile
+                    ids = await asyncio.to_thread(db.add_scans, scans, keys)
+                except Exception as e:
+                    for _, _, stored in batch:
+                        if not stored.done():
+                            stored.set_exception(e)
+                    continue
+                self.stored += len(ids)
+                self.batches += 1
+                for (_, _, stored), scan_id in zip(batch, ids):
+                    if not stored.done():
+                        stored.set_result(scan_id)
+        finally:
+            await asyncio.to_thread(db.close)
+
+    # ----------------------------------------
+    # Lifecycle and view
+    # ----------------------------------------
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        # The writer stores whatever is still queued, then exits
+        await self._queue.put(None)
+        await self._writer_task
+
+    async def serve(self, view=None):
+        """Serve until cancelled, calling ``view(status)`` every REFRESH seconds"""
+        await self.start()
+        try:
+            while True:
+                if view:
+                    view(self.status())
+                await asyncio.sleep(REFRESH)
+        finally:
+            await self.stop()
+
+    def status(self):
+        agents = [a.snapshot() for a in self.agents.values()]
+        return {'agents': agents, 'stored': self.stored, 'batches': self.batches,
+                'queued': self._queue.qsize() if self._queue else 0}
+
+
+def format_status(status):
+    """Fixed-width progress table of every agent"""
+    lines = [f"{'HOST':<20}{'STATE':<14}{'PROBES':>8}  {'GRADE':<7}{'TIME':>7}  LAST / PROBLEMS"]
+    for a in sorted(status['agents'], key=lambda a: (a['state'] in ('stored',), a['hostname'] or '')):
+        grade = f"{a['grade'] or ''}" + (f" {a['score']}" if a['score'] is not None else '')
+        detail = ", ".join(a['problems'][-2:]) or a['last'] or ''
+        lines.append(f"{(a['hostname'] or a['agent'])[:19]:<20}{a['state']:<14}"
+                     f"{a['done']:>4}/{a['expected']:<3}  {grade:<7}{a['elapsed']:>6.0f}s  {detail}")
+    counts = {}
+    for a in status['agents']:
+        counts[a['state']] = counts.get(a['state'], 0) + 1
+    lines.append(f"{len(status['agents'])} agents ({', '.join(f'{n} {s}' for s, n in sorted(counts.items()))}); "
+                 f"{status['stored']} scans stored in {status['batches']} batches, {status['queued']} queued")
+    return "\n".join(lines)
+
+
+def _live_view(status):
+    # Home the cursor and clear, so the table redraws in place
+    sys.stdout.write("\x1b[H\x1b[2J" + format_status(status) + "\n")
+    sys.stdout.flush()
+
+
+# ========================================
+# AGENT
+# ========================================
+
+class AgentLink:
+    """Blocking line-oriented connection from an agent to the collector.
+
+    Progress messages are best effort: if the collector goes away the scan
+    carries on, and ``deliver`` reconnects to hand over the finished scan.
+    """
+
+    def __init__(self, host, port, token=None, timeout=10.0):
+        self.host, self.port = host, port
+        self.token = token
+        self.timeout = timeout
+        self.agent = uuid.uuid4().hex
+        self.sock = None
+        self._file = None
+
+    def connect(self, probes=()):
+        self.close()
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self.sock.makefile('rb')
+        self.sock.sendall(encode({'kind': 'hello', 'agent': self.agent, 'hostname': platform.node(),
+                                  'probes': list(probes), 'token': self.token}))
+
+    def send(self, message):
+        if self.sock is None:
+            return False
+        try:
+            self.sock.sendall(encode(message))
+            return True
+        except OSError:
+            self.close()
+            return False
+
+    def deliver(self, scan, probes=(), attempts=5, key=None):
+        """Send the finished scan and wait for the collector's scan id.
+
+        Every attempt carries the same idempotency key, so a retry after a
+        lost reply returns the id of the scan already stored.
+        """
+        key = key or scan_key(scan)
+        delay = 1.0
+        for attempt in range(attempts):
+            try:
+                if self.sock is None:
+                    self.connect(probes)
+                self.sock.sendall(encode({'kind': 'done', 'key': key, 'scan': to_dict(scan)}))
+                # Storing waits for the next batch write
+                self.sock.settimeout(max(self.timeout, BATCH_INTERVAL * 10))
+                reply = json.loads(self._file.readline() or 'null')
+                if isinstance(reply, dict) and reply.get('kind') == 'stored':
+                    # The collector ends the connection after each scan
+                    self.close()
+                    return reply['scan_id']
+                raise ConnectionError((reply or {}).get('message', "collector closed the connection"))
+            except (OSError, ValueError) as e:
+                self.close()
+                if attempt == attempts - 1:
+                    raise ConnectionError(f"Could not deliver scan to {self.host}:{self.port}: {e}") from e
+                time.sleep(delay)
+                delay *= 2
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+# ----------------------------------------
+# Spool: scans the collector could not take
+# ----------------------------------------
+
+def spool(scan, key=None, spool_dir=None):
+    """Write an undelivered scan to the spool directory (atomically); returns its path"""
+    spool_dir = spool_dir or SPOOL_DIR
+    os.makedirs(spool_dir, exist_ok=True)
+    key = key or scan_key(scan)
+    path = os.path.join(spool_dir, f"{key}.json")
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'scan': to_dict(scan)}, f)
+    os.replace(tmp, path)
+    return path
+
+
+def flush_spool(link, spool_dir=None):
+    """Send every spooled scan, oldest first, removing each once stored; returns the scan ids"""
+    spool_dir = spool_dir or SPOOL_DIR
+    try:
+        names = [n for n in os.listdir(spool_dir) if n.endswith('.json')]
+    except OSError:
+        return []
+    paths = sorted((os.path.join(spool_dir, n) for n in names), key=os.path.getmtime)
+    ids = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            entry = json.load(f)
+        # One attempt each: the collector is known to be up or the next run tries again
+        ids.append(link.deliver(from_dict(entry['scan']), attempts=1, key=entry['key']))
+        os.remove(path)
+    return ids
+
+
+def run_agent(host=DEFAULT_HOST, port=DEFAULT_PORT, token=None, names=None, progress=None, **scan_options):
+    """Run a headless scan, streaming each result to the collector; returns (scan, scan id).
+
+    When the collector cannot be reached the scan is spooled and the id is
+    None; spooled scans of earlier runs are sent after this one is stored.
+    """
+    import laptopcheck_pro  # noqa: F401  (registers the probes)
+    from laptopcheck_cli import run_headless
+    from laptopcheck_probes import build_probes
+    expected = [p.name for p in build_probes(names=names,
+                                             include_interactive=scan_options.get('include_interactive', False))]
+    link = AgentLink(host, port, token)
+    try:
+        link.connect(expected)
+    except OSError:
+        pass  # Scan anyway; deliver() retries the connection at the end
+
+    def on_result(name, value):
+        link.send({'kind': 'result', 'name': name, 'result': to_dict(value)})
+        if progress:
+            progress(name, value)
+
+    try:
+        scan = run_headless(names=names, progress=on_result, **scan_options)
+        try:
+            scan_id = link.deliver(scan, expected)
+        except ConnectionError:
+            spool(scan)
+            return scan, None
+        try:
+            flush_spool(link)
+        except (ConnectionError, OSError, ValueError):
+            pass  # Left in the spool for the next run
+        return scan, scan_id
+    finally:
+        link.close()
+
+
+def request_status(host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=5.0):
+    """The collector's progress table as a dict"""
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(encode({'kind': 'status'}))
+        with sock.makefile('rb') as f:
+            return json.loads(f.readline())
+
+
+def main(argv=None):
+    import argparse
+    from laptopcheck_db import DEFAULT_DB_PATH
+    parser = argparse.ArgumentParser(description="LaptopCheck scan agent and collector")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    collect = sub.add_parser('collect', help="receive scans from agents into a fleet database")
+    collect.add_argument('--db', default=DEFAULT_DB_PATH, help=f"fleet database (default: {DEFAULT_DB_PATH})")
+    collect.add_argument('--host', default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    collect.add_argument('--port', type=int, default=DEFAULT_PORT)
+    collect.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    collect.add_argument('--quiet', action='store_true', help="no live progress table")
+
+    agent = sub.add_parser('agent', help="scan this machine and send the results to a collector")
+    agent.add_argument('--probe', action='append', dest='probes', metavar='NAME',
+                       help="run only this probe (repeatable); Condition is always added")
+    agent.add_argument('--stress-duration', type=float, default=30, metavar='SECONDS')
+    agent.add_argument('--storage-bench-mb', type=int, default=256, metavar='MB')
+    agent.add_argument('--memtest-fraction', type=float, default=0.25, metavar='F')
+    agent.add_argument('--flush', action='store_true', help="only send scans spooled while the collector was down")
+
+    status = sub.add_parser('status', help="print a collector's progress table")
+    status.add_argument('--json', action='store_true')
+
+    for command in (agent, status):
+        command.add_argument('--collector', default=f"{DEFAULT_HOST}:{DEFAULT_PORT}", metavar='HOST:PORT')
+    for command in (collect, agent):
+        command.add_argument('--token', default=os.environ.get(TOKEN_ENV), help=f"shared secret (${TOKEN_ENV})")
+    args = parser.parse_args(argv)
+
+    if args.command == 'collect':
+        collector = Collector(args.db, args.host, args.port, token=args.token, batch_size=args.batch_size)
+        print(f"Collecting on {args.host}:{args.port} into {args.db}", file=sys.stderr)
+        try:
+            asyncio.run(collector.serve(view=None if args.quiet else _live_view))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    host, port = parse_address(args.collector)
+    if args.command == 'status':
+        result = request_status(host, port)
+        print(json.dumps(result, indent=2) if args.json else format_status(result))
+        return 0
+
+    if args.command == 'agent' and args.flush:
+        link = AgentLink(host, port, args.token)
+        try:
+            ids = flush_spool(link)
+        finally:
+            link.close()
+        print(f"Sent {len(ids)} spooled scans", file=sys.stderr)
+        return 0
+
+    names = set(args.probes) | {'Condition'} if args.probes else None
+    started = datetime.datetime.now()
+    scan, scan_id = run_agent(host, port, args.token, names=names,
+                              progress=lambda name, value: print(f"{name} done", file=sys.stderr),
+                              stress_duration=args.stress_duration, storage_bench_mb=args.storage_bench_mb,
+                              memtest_fraction=args.memtest_fraction)
+    grade = getattr(scan.condition, 'grade', None)
+    if scan_id is None:
+        print(f"Collector unreachable; scan ({grade}) spooled in {SPOOL_DIR}", file=sys.stderr)
+        return 1
+    print(f"Stored as scan {scan_id} ({grade}, {(datetime.datetime.now() - started).seconds}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
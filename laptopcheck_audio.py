@@ -0,0 +1,334 @@
+"""Speaker/microphone loopback test graded by FFT.
+
+A fixed stimulus is played through each output channel in turn while the
+built-in microphone records:
+
+    silence   noise floor of the room and the mic
+    sweep     log chirp, used to find the loopback latency
+    tones     stepped sine tones at TEST_FREQS
+
+The recording is aligned to the stimulus with one FFT cross-correlation,
+then every tone segment of every channel is cut out, windowed and
+transformed in a single ``rfft`` over a (segments, samples) matrix. From
+the spectra come per-channel level, SNR against the silent segment,
+total harmonic distortion and the frequency response relative to 1 kHz:
+
+    dead        median SNR below MIN_SNR (no sound from that side)
+    distorted   THD above MAX_THD (rattle, blown cone, clipping)
+    uneven      response in RESPONSE_BAND off by more than MAX_DEVIATION
+    imbalance   channel levels differing by more than MAX_IMBALANCE
+
+Stimulus buffers are built once per sample rate and kept as .npy files in
+the cache directory, so later runs only map them from disk. Grading works
+the same on a live recording and on a WAV file, so it is checked offline
+against the fixtures in fixtures/audio:
+
+    python laptopcheck_audio.py fixtures/audio/loopback_ok.wav
+"""
+import hashlib
+import os
+import sys
+import wave
+
+import numpy as np
+
+from laptopcheck_inventory import CACHE_PATH
+
+AUDIO_CACHE = os.path.join(os.path.dirname(CACHE_PATH), 'audio')
+RATE = 48000
+LEVEL = 0.5
+TEST_FREQS = (250, 500, 1000, 2000, 4000, 8000)
+SILENCE_S = 0.15
+SWEEP_S = 0.2
+SWEEP_BAND = (200, 10000)
+TONE_S = 0.1
+# Each tone fades in and out over this long, and only its steady middle is analysed
+RAMP_S = 0.01
+TAIL_S = 0.5
+MAX_LATENCY = TAIL_S
+HARMONICS = 5
+
+MIN_SNR = 12.0
+MAX_THD = 10.0
+RESPONSE_BAND = (500, 8000)
+MAX_DEVIATION = 20.0
+MAX_IMBALANCE = 10.0
+
+_buffers = {}
+
+
+# ========================================
+# STIMULUS
+# ========================================
+
+def _ramp(n, rate):
+    """Raised-cosine fade in/out envelope, so tone edges do not click"""
+    env = np.ones(n, dtype=np.float32)
+    k = min(int(RAMP_S * rate), n // 2)
+    if k:
+        fade = 0.5 - 0.5 * np.cos(np.linspace(0, np.pi, k, dtype=np.float32))
+        env[:k], env[n - k:] = fade, fade[::-1]
+    return env
+
+
+def _build_sweep(rate):
+    n = int(SWEEP_S * rate)
+    t = np.arange(n) / rate
+    f0, f1 = SWEEP_BAND
+    k = np.log(f1 / f0)
+    phase = 2 * np.pi * f0 * SWEEP_S / k * (np.exp(t / SWEEP_S * k) - 1)
+    return (LEVEL * np.sin(phase) * _ramp(n, rate)).astype(np.float32)
+
+
+def _build_tones(rate):
+    n = int(TONE_S * rate)
+    t = np.arange(n) / rate
+    freqs = np.array(TEST_FREQS, dtype=np.float64)[:, None]
+    return (LEVEL * np.sin(2 * np.pi * freqs * t) * _ramp(n, rate)).astype(np.float32).ravel()
+
+
+def cached(name, rate, build, params=(), cache_dir=AUDIO_CACHE):
+    """Buffer ``name`` at ``rate``: from memory, else the .npy cache, else ``build(rate)`` (then saved).
+
+    ``params`` are the constants ``build`` depends on; they are hashed into
+    the key and file name, so changing the stimulus never serves a stale buffer.
+    """
+    digest = hashlib.sha1(repr(params).encode()).hexdigest()[:12]
+    key = (name, rate, digest)
+    if key in _buffers:
+        return _buffers[key]
+    path = os.path.join(cache_dir, f"{name}-{rate}-{digest}.npy")
+    buf = None
+    try:
+        buf = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        pass
+    if buf is None:
+        buf = build(rate)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                np.save(f, buf)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    _buffers[key] = buf
+    return buf
+
+
+def stimulus(channels=2, rate=RATE, cache_dir=AUDIO_CACHE):
+    """(frames x channels) float32 buffer and its layout in samples.
+
+    The layout holds ``silence`` (start, length), the sweep start of each
+    channel and the start of each channel's first tone.
+    """
+    sweep = cached('sweep', rate, _build_sweep, (SWEEP_S, SWEEP_BAND, LEVEL, RAMP_S), cache_dir)
+    tones = cached('tones', rate, _build_tones, (TONE_S, TEST_FREQS, LEVEL, RAMP_S), cache_dir)
+    silence = int(SILENCE_S * rate)
+    block = len(sweep) + silence + len(tones)
+    total = silence + channels * block + int(TAIL_S * rate)
+    out = np.zeros((total, channels), dtype=np.float32)
+    layout = {'rate': rate, 'silence': (0, silence), 'sweeps': [], 'tones': [], 'tone_len': int(TONE_S * rate)}
+    pos = silence
+    for c in range(channels):
+        out[pos:pos + len(sweep), c] = sweep
+        layout['sweeps'].append(pos)
+        pos += len(sweep) + silence
+        out[pos:pos + len(tones), c] = tones
+        layout['tones'].append(pos)
+        pos += len(tones)
+    return out, layout
+
+
+# ========================================
+# ANALYSIS
+# ========================================
+
+def find_latency(recording, reference, rate, max_latency=MAX_LATENCY):
+    """Delay in samples of ``reference`` within ``recording`` (FFT cross-correlation)"""
+    n = len(recording) + len(reference)
+    size = 1 << (n - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(recording, size) * np.conj(np.fft.rfft(reference, size)), size)
+    window = corr[:min(int(max_latency * rate), len(recording) - 1) + 1]
+    return int(np.argmax(window))
+
+
+def _band_power(spectra, bins, width=2):
+    """Power summed over ``bins`` +/- ``width`` (Hann leakage) for each row; bins is (rows, k)"""
+    offsets = np.arange(-width, width + 1)
+    idx = np.clip(bins[..., None] + offsets, 0, spectra.shape[1] - 1)
+    rows = np.arange(spectra.shape[0])[:, None, None]
+    return spectra[rows, idx].sum(axis=-1)
+
+
+def analyze(recording, layout):
+    """Grade a mono ``recording`` of ``stimulus``; returns per-channel measurements and problems"""
+    rate, tone_len = layout['rate'], layout['tone_len']
+    recording = np.asarray(recording, dtype=np.float32)
+    if recording.ndim > 1:
+        recording = recording.mean(axis=1)
+    channels = len(layout['tones'])
+    reference, _ = stimulus(channels, rate)
+    lag = find_latency(recording, reference.sum(axis=1), rate)
+
+    # Steady middle of each tone, the same length everywhere so one rfft covers them all
+    trim = int(RAMP_S * rate) * 2
+    seg = tone_len - 2 * trim
+    starts = [lag + layout['tones'][c] + i * tone_len + trim for c in range(channels) for i in range(len(TEST_FREQS))]
+    silence_start = lag + layout['silence'][0] + (layout['silence'][1] - seg) // 2
+    starts.append(max(silence_start, 0))
+    padded = np.pad(recording, (0, max(0, max(starts) + seg - len(recording))))
+    frames = padded[np.array(starts)[:, None] + np.arange(seg)]
+    window = np.hanning(seg).astype(np.float32)
+    spectra = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+
+    freqs = np.array(TEST_FREQS, dtype=np.float64)
+    nyquist = rate / 2
+    harmonics = freqs[:, None] * np.arange(1, HARMONICS + 1)
+    bins = np.rint(harmonics * seg / rate).astype(int)
+    valid = harmonics < nyquist * 0.95
+
+    power = _band_power(spectra[:-1], np.tile(bins, (channels, 1))) * np.tile(valid, (channels, 1))
+    # Noise in the same bins as each fundamental, taken from the silent segment
+    noise_power = _band_power(spectra[-1:], bins[:, 0][None, :])
+    tiny = np.finfo(np.float64).tiny
+
+    fundamental = power[:, 0].reshape(channels, len(TEST_FREQS))
+    level = 10 * np.log10(fundamental + tiny)
+    snr = level - 10 * np.log10(noise_power + tiny)
+    thd = 100 * np.sqrt(power[:, 1:].sum(axis=1) / (power[:, 0] + tiny)).reshape(channels, len(TEST_FREQS))
+
+    ref_i = TEST_FREQS.index(1000) if 1000 in TEST_FREQS else len(TEST_FREQS) // 2
+    band = (freqs >= RESPONSE_BAND[0]) & (freqs <= RESPONSE_BAND[1])
+    results, problems = [], []
+    for c in range(channels):
+        audible = snr[c] >= MIN_SNR
+        dead = bool(np.median(snr[c]) < MIN_SNR)
+        response = level[c] - level[c, ref_i]
+        deviation = float(np.max(np.abs(response[band & audible]))) if np.any(band & audible) else None
+        # Distortion is only meaningful where the tone stands well clear of the noise
+        worst_thd = float(np.max(thd[c][audible])) if np.any(audible) else None
+        name = channel_name(c, channels)
+        results.append({
+            'channel': c, 'name': name, 'dead': dead,
+            'level_db': float(np.mean(level[c][band])),
+            'snr_db': float(np.median(snr[c])),
+            'thd_pct': worst_thd,
+            'deviation_db': deviation,
+            'response_db': {int(f): round(float(r), 1) for f, r in zip(TEST_FREQS, response)},
+        })
+        if dead:
+            problems.append(f"{name} channel silent")
+            continue
+        if worst_thd is not None and worst_thd > MAX_THD:
+            problems.append(f"{name} channel distorted ({worst_thd:.0f}% THD)")
+        if deviation is not None and deviation > MAX_DEVIATION:
+            problems.append(f"{name} channel response uneven ({deviation:.0f} dB)")
+    live = [r['level_db'] for r in results if not r['dead']]
+    imbalance = max(live) - min(live) if len(live) > 1 else None
+    if imbalance is not None and imbalance > MAX_IMBALANCE:
+        problems.append(f"Channel imbalance {imbalance:.0f} dB")
+    return {
+        'latency_ms': lag / rate * 1000,
+        'channels': results,
+        'dead': [r['channel'] for r in results if r['dead']],
+        'imbalance_db': imbalance,
+        'problems': problems,
+    }
+
+
+def channel_name(index, channels):
+    if channels == 2:
+        return ('Left', 'Right')[index]
+    return f"Channel {index + 1}"
+
+
+# ========================================
+# PLAYBACK / WAV
+# ========================================
+
+def play_and_record(buffer, rate=RATE, stop_event=None, device=None):
+    """Play ``buffer`` and record the default microphone for the same length; None if cancelled"""
+    import sounddevice as sd
+    recording = sd.playrec(buffer, samplerate=rate, channels=1, dtype='float32', device=device)
+    if stop_event is None:
+        sd.wait()
+        return recording[:, 0]
+    stream = sd.get_stream()
+    while stream.active:
+        if stop_event.wait(0.05):
+            sd.stop()
+            return None
+    return recording[:, 0]
+
+
+def run_loopback(channels=2, rate=RATE, stop_event=None, device=None):
+    """Play the stimulus on each channel while recording; graded result, or None if cancelled"""
+    buffer, layout = stimulus(channels, rate)
+    recording = play_and_record(buffer, rate, stop_event, device)
+    if recording is None:
+        return None
+    return analyze(recording, layout)
+
+
+def read_wav(path):
+    """(samples as float32 mono, sample rate) of a 16-bit or 32-bit PCM WAV file"""
+    with wave.open(path, 'rb') as w:
+        rate, width, nch = w.getframerate(), w.getsampwidth(), w.getnchannels()
+        raw = w.readframes(w.getnframes())
+    if width == 2:
+        data = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    elif width == 4:
+        data = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2**31
+    else:
+        raise ValueError(f"{path}: {8 * width}-bit WAV not supported")
+    return data.reshape(-1, nch).mean(axis=1), rate
+
+
+def write_wav(path, samples, rate):
+    """Write float samples in [-1, 1] as 16-bit mono PCM"""
+    data = (np.clip(samples, -1, 1) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(data.tobytes())
+
+
+def grade_wav(path, channels=2):
+    """Grade a loopback recording saved as WAV"""
+    samples, rate = read_wav(path)
+    _, layout = stimulus(channels, rate)
+    return analyze(samples, layout)
+
+
+def main(argv=None):
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Grade a speaker/microphone loopback recording")
+    parser.add_argument('wav', nargs='?', help="recording to grade (default: play and record now)")
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--save', metavar='PATH', help="also save the live recording as WAV")
+    parser.add_argument('--stimulus', metavar='PATH', help="write the stimulus (mixed to mono) as WAV and exit")
+    args = parser.parse_args(argv)
+
+    if args.stimulus:
+        buffer, _ = stimulus(args.channels)
+        write_wav(args.stimulus, buffer.sum(axis=1), RATE)
+        return 0
+    if args.wav:
+        result = grade_wav(args.wav, args.channels)
+    else:
+        buffer, layout = stimulus(args.channels)
+        recording = play_and_record(buffer)
+        if args.save:
+            write_wav(args.save, recording, RATE)
+        result = analyze(recording, layout)
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if result['problems'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Headless batch CLI for LaptopCheck AI Pro.
+
+Runs the same probes and condition scoring as the GUI without a display and
+writes one JSON line per machine, e.g. from a PXE-booted intake image:
+
+    python laptopcheck_cli.py --output /mnt/results/scans.jsonl
+
+The exit code reflects the grade so scripts can branch on it.
+"""
+import argparse
+import datetime
+import platform
+import sys
+
+import laptopcheck_pro  # noqa: F401  (registers the probes)
+from laptopcheck_cmd import new_scan
+from laptopcheck_db import FleetDB
+from laptopcheck_instrument import CAPTURES, Instrument, slowest
+from laptopcheck_inventory import get_inventory
+from laptopcheck_journal import JOURNAL_PATH, ScanJournal, run_checkpointed
+from laptopcheck_model import ScanResult, Status, describe, dumps
+from laptopcheck_probes import build_probes, print_import_profile
+from laptopcheck_scheduler import ProbeScheduler
+from laptopcheck_stress import KERNELS
+
+EXIT_CODES = {"GOOD": 0, "FAIR": 1, "POOR": 2, "AVOID": 3}
+EXIT_SCAN_FAILED = 4
+
+
+def run_headless(include_interactive=False, names=None, progress=None, stress_duration=30, stress_kernel='int',
+                 storage_bench_mb=256, memtest_fraction=0.25, journal=None, resume=False, battery_test=None,
+                 instrument=None):
+    """Run a scan without a GUI and return it as a ScanResult.
+
+    With a ``journal`` (ScanJournal) every result is checkpointed, and
+    ``resume=True`` reuses still-valid results of an interrupted scan.
+    ``battery_test`` (seconds per phase) adds the on-demand discharge test.
+    Every probe is timed by ``instrument`` (a fresh Instrument by default).
+    """
+    options = {'Stress': {'duration': stress_duration, 'kernel': stress_kernel},
+               'Storage Health': {'size_mb': storage_bench_mb},
+               'Memory Test': {'fraction': memtest_fraction}}
+    extra = ()
+    if battery_test:
+        options['Battery Test'] = {'idle': battery_test, 'load': battery_test, 'kernel': stress_kernel}
+        extra = ('Battery Test',)
+    probes = build_probes(names=names, include_interactive=include_interactive, options=options, extra=extra)
+    for probe in probes:
+        if probe.name == 'Stress':
+            probe.timeout = max(probe.timeout, stress_duration + 60)
+        elif probe.name == 'Battery Test' and battery_test:
+            # Idle and load phases back to back, plus start-up of the load workers
+            probe.timeout = max(probe.timeout, 2 * battery_test + 120)
+    instrument = instrument or Instrument()
+    probes = instrument.wrap(probes)
+    new_scan()
+    started = datetime.datetime.now()
+    if journal is not None:
+        results, _ = run_checkpointed(probes, journal, resume=resume, on_result=progress)
+    else:
+        results = ProbeScheduler(probes, on_result=progress).run()
+    timings = instrument.finish(results)
+    return ScanResult(
+        hostname=platform.node(),
+        started=started.isoformat(timespec='seconds'),
+        finished=datetime.datetime.now().isoformat(timespec='seconds'),
+        condition=results.pop('Condition', None),
+        probes=results,
+        timings=timings,
+    )
+
+
+def exit_code_for(scan):
+    condition = scan.condition
+    if condition is None or condition.status is not Status.OK:
+        return EXIT_SCAN_FAILED
+    return EXIT_CODES.get(condition.grade, EXIT_SCAN_FAILED)
+
+
+def write_record(scan, path=None):
+    line = dumps(scan) + "\n"
+    if path in (None, '-'):
+        sys.stdout.write(line)
+        sys.stdout.flush()
+    else:
+        # Single write in append mode so concurrent writers do not interleave lines
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless LaptopCheck AI Pro scan (JSONL output)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="append the JSON line to this file (default: stdout)")
+    parser.add_argument('--interactive', action='store_true',
+                        help="also run interactive probes (keyboard, speakers)")
+    parser.add_argument('--probe', action='append', dest='probes', metavar='NAME',
+                        help="run only this probe (repeatable); Condition is always added")
+    parser.add_argument('--stress-duration', type=float, default=30, metavar='SECONDS',
+                        help="length of the sustained stress test (default: 30)")
+    parser.add_argument('--stress-kernel', choices=sorted(KERNELS), default='int',
+                        help="stress workload: integer ALU, NumPy FMA or memory stream (default: int)")
+    parser.add_argument('--storage-bench-mb', type=int, default=256, metavar='MB',
+                        help="scratch file size for the disk benchmark; 0 reads SMART only (default: 256)")
+    parser.add_argument('--memtest-fraction', type=float, default=0.25, metavar='F',
+                        help="share of available RAM the memory test covers (default: 0.25)")
+    parser.add_argument('--battery-test', type=float, metavar='MINUTES',
+                        help="also run the discharge test, MINUTES idle then MINUTES under load (on battery power)")
+    parser.add_argument('--journal', metavar='PATH',
+                        help=f"checkpoint each probe result to this journal (default with --resume: {JOURNAL_PATH})")
+    parser.add_argument('--resume', action='store_true',
+                        help="reuse still-valid results of an interrupted scan on this machine")
+    parser.add_argument('--max-age', type=float, metavar='SECONDS',
+                        help="with --resume, never reuse results older than this")
+    parser.add_argument('--db', metavar='PATH',
+                        help="also store the scan in this fleet database (SQLite)")
+    parser.add_argument('--refresh-inventory', action='store_true',
+                        help="ignore cached static hardware facts and collect them again")
+    parser.add_argument('--profile', choices=CAPTURES,
+                        help="also capture a per-probe cProfile or tracemalloc allocation profile")
+    parser.add_argument('--timings', metavar='PATH', help="write per-probe timings as JSON")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="write a Chrome trace of the scan (chrome://tracing, ui.perfetto.dev)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="no progress on stderr")
+    parser.add_argument('--import-profile', action='store_true',
+                        help="report per-module import time and a startup benchmark, then exit")
+    args = parser.parse_args(argv)
+
+    if args.import_profile:
+        print_import_profile()
+        return 0
+
+    if args.refresh_inventory:
+        get_inventory(refresh=True)
+
+    names = None
+    if args.probes:
+        names = set(args.probes) | {'Condition'}
+
+    def progress(name, value):
+        if not args.quiet:
+            sys.stderr.write(describe(name, value) + "\n")
+
+    journal = None
+    if args.journal or args.resume:
+        journal = ScanJournal(args.journal or JOURNAL_PATH, max_age=args.max_age)
+
+    instrument = Instrument(capture=args.profile)
+    scan = run_headless(include_interactive=args.interactive, names=names, progress=progress,
+                        stress_duration=args.stress_duration, stress_kernel=args.stress_kernel,
+                        storage_bench_mb=args.storage_bench_mb, memtest_fraction=args.memtest_fraction,
+                        journal=journal, resume=args.resume,
+                        battery_test=args.battery_test * 60 if args.battery_test else None,
+                        instrument=instrument)
+    write_record(scan, args.output)
+    if args.timings:
+        instrument.write_json(args.timings)
+    if args.trace:
+        instrument.write_trace(args.trace)
+    if not args.quiet:
+        slow = ', '.join(f"{p['name']} {p['wall']:.1f}s" for p in slowest(scan.timings, 3))
+        sys.stderr.write(f"Scan took {scan.timings['wall']:.1f}s; slowest: {slow}\n")
+    if args.db:
+        with FleetDB(args.db) as db:
+            db.add_scan(scan)
+    return exit_code_for(scan)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Asynchronous runner for the external tools probes call.
+
+Commands run on one asyncio event loop in a background thread, so probe
+threads block only on their own command while every tool in flight
+overlaps. Each command gets a timeout, a cap on how much output is kept,
+and a slot from a concurrency limit. Results are memoized for the scan:
+two probes asking for the same command share one process, and a tool
+that hung once is not started again.
+
+    out = run(['lsblk', '-d', '-n', '-P'])                  # blocking, from any thread
+    out = run_first(['sudo', '-n', 'dmidecode', '-t', '17'], ['dmidecode', '-t', '17'])
+    for chunk in stream(['journalctl', '-o', 'json']):      # output too big to hold, not memoized
+    new_scan()                                              # forget memoized output
+
+No command goes through a shell; arguments are passed as a list.
+"""
+import asyncio
+import subprocess
+import threading
+
+DEFAULT_TIMEOUT = 20
+STREAM_TIMEOUT = 300
+MAX_CONCURRENT = 4
+MAX_OUTPUT = 8 * 1024 * 1024
+STDERR_LIMIT = 64 * 1024
+READ_CHUNK = 64 * 1024
+# Chunks a stream reads ahead of its consumer
+STREAM_AHEAD = 8
+
+
+class CommandError(RuntimeError):
+    """A command exited non-zero (or timed out, see CommandTimeout)."""
+
+    def __init__(self, argv, message, returncode=None, stderr=''):
+        super().__init__(message)
+        self.argv = list(argv)
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+class CommandTimeout(CommandError):
+    pass
+
+
+async def _read_capped(stream, limit, proc=None):
+    """Read ``stream`` to EOF keeping at most ``limit`` bytes.
+
+    With ``proc`` given, the process is killed once the limit is passed
+    instead of draining the rest; returns (data, truncated).
+    """
+    chunks, size = [], 0
+    while True:
+        chunk = await stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        if size < limit:
+            chunks.append(chunk[:limit - size])
+        size += len(chunk)
+        if size > limit and proc is not None:
+            proc.kill()
+            break
+    return b''.join(chunks), size > limit
+
+
+class CommandRunner:
+    """Event loop thread plus per-scan memo of command output."""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT, timeout=DEFAULT_TIMEOUT, max_output=MAX_OUTPUT):
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.max_output = max_output
+        # Only touched on the loop thread, so it needs no lock
+        self.spawned = 0
+        self._memo = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="cmd-runner", daemon=True).start()
+            return self._loop
+
+    async def run(self, argv, timeout=None, check=True):
+        """Run ``argv`` on the runner's loop and return its decoded stdout.
+
+        Output beyond ``max_output`` is cut off and the process killed; what
+        was read so far is returned. ``check=False`` returns stdout whatever
+        the exit status (for tools like smartctl that report through it).
+        """
+        timeout = timeout or self.timeout
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        async with self._semaphore:
+            proc = await asyncio.create_subprocess_exec(
+                *argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.spawned += 1
+
+            async def communicate():
+                (out, truncated), (err, _) = await asyncio.gather(
+                    _read_capped(proc.stdout, self.max_output, proc),
+                    _read_capped(proc.stderr, STDERR_LIMIT))
+                await proc.wait()
+                return out, truncated, err
+
+            try:
+                out, truncated, err = await asyncio.wait_for(communicate(), timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise CommandTimeout(argv, f"{argv[0]} timed out after {timeout}s") from None
+        stderr = err.decode(errors='replace').strip()
+        if check and proc.returncode != 0 and not truncated:
+            detail = stderr.splitlines()[0] if stderr else f"exit status {proc.returncode}"
+            raise CommandError(argv, f"{argv[0]}: {detail}", proc.returncode, stderr)
+        return out.decode(errors='replace')
+
+    def run_sync(self, argv, timeout=None, check=True, memo=True):
+        """Blocking ``run`` for probe threads; memoized until ``clear()``"""
+        key = (tuple(argv), timeout, check)
+        loop = self._ensure_loop()
+        with self._lock:
+            future = self._memo.get(key) if memo else None
+            started = future is None
+            if started:
+                future = asyncio.run_coroutine_threadsafe(self.run(argv, timeout, check), loop)
+                if memo:
+                    self._memo[key] = future
+        local = self._local
+        local.started = getattr(local, 'started', 0) + started
+        local.shared = getattr(local, 'shared', 0) + (not started)
+        return future.result()
+
+    async def _pump(self, argv, chunks, timeout):
+        """Feed the stdout of ``argv`` into ``chunks``, ending with None or the exception to raise"""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            await chunks.put(e)
+            return
+        self.spawned += 1
+        try:
+            async def pump():
+                # stderr is drained alongside: a full pipe nobody reads would stall the tool
+                errors = asyncio.ensure_future(_read_capped(proc.stderr, STDERR_LIMIT))
+                while True:
+                    chunk = await proc.stdout.read(READ_CHUNK)
+                    if not chunk:
+                        break
+                    await chunks.put(chunk)
+                await proc.wait()
+                return (await errors)[0]
+
+            try:
+                err = await asyncio.wait_for(pump(), timeout)
+            except asyncio.TimeoutError:
+                await chunks.put(CommandTimeout(argv, f"{argv[0]} timed out after {timeout}s"))
+                return
+        finally:
+            # Timed out, or cancelled because the consumer stopped early
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+        if proc.returncode != 0:
+            stderr = err.decode(errors='replace').strip()
+            detail = stderr.splitlines()[0] if stderr else f"exit status {proc.returncode}"
+            await chunks.put(CommandError(argv, f"{argv[0]}: {detail}", proc.returncode, stderr))
+            return
+        await chunks.put(None)
+
+    def stream(self, argv, timeout=STREAM_TIMEOUT):
+        """Yield the stdout of ``argv`` in chunks as it is produced, in the calling thread.
+
+        For output too large to keep (event logs); not memoized and not
+        capped. The process runs on the runner's loop and is read a few
+        chunks ahead of the consumer; it is killed when the consumer stops
+        early or ``timeout`` passes.
+        """
+        loop = self._ensure_loop()
+        chunks = asyncio.Queue(STREAM_AHEAD)
+        pump = asyncio.run_coroutine_threadsafe(self._pump(argv, chunks, timeout), loop)
+        self._local.started = getattr(self._local, 'started', 0) + 1
+        try:
+            while True:
+                item = asyncio.run_coroutine_threadsafe(chunks.get(), loop).result()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            pump.cancel()
+
+    def thread_counts(self):
+        """(commands started, memoized results reused) by the calling thread so far"""
+        return getattr(self._local, 'started', 0), getattr(self._local, 'shared', 0)
+
+    def run_first(self, *commands, timeout=None):
+        """Output of the first command that succeeds, like ``a || b`` in a shell"""
+        error = None
+        for argv in commands:
+            try:
+                return self.run_sync(argv, timeout)
+            except (OSError, CommandError) as e:
+                error = e
+        raise error
+
+    def clear(self):
+        with self._lock:
+            self._memo = {}
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Process-wide runner shared by every probe"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = CommandRunner()
+        return _runner
+
+
+def run(argv, timeout=None, check=True):
+    return get_runner().run_sync(argv, timeout, check)
+
+
+def run_first(*commands, timeout=None):
+    return get_runner().run_first(*commands, timeout=timeout)
+
+
+def stream(argv, timeout=STREAM_TIMEOUT):
+    return get_runner().stream(argv, timeout)
+
+
+def new_scan():
+    """Drop memoized output so the next scan sees fresh results"""
+    get_runner().clear()
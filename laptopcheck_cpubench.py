@@ -0,0 +1,318 @@
+"""CPU microbenchmark scored against other units of the same model.
+
+Two of the stress engine's kernels are timed, each on one core and then on
+all cores, in spawned worker processes (so the scan's own threads and the
+GIL do not get in the way):
+
+    int   pure integer ALU work, Mop/s
+    fma   NumPy vectorised multiply-add on cache-sized arrays, GFLOP/s
+
+Workers build their kernel, run it once to warm up and wait on a barrier,
+so process start-up and imports are not timed. The single-core figure is
+the best of ROUNDS windows.
+
+Scores are kept in a small SQLite baseline database keyed by the
+normalised CPU model string (``Intel(R) Core(TM) i7-8650U CPU @ 1.90GHz``
+and ``Intel Core i7-8650U`` are the same model), one row per machine and
+metric with its latest score. A unit is compared with the other machines
+of its model: its percentile among them and its score as a percentage of
+their median. Well below the median usually means throttling, dried
+thermal paste or a bad power state.
+
+    python laptopcheck_cpubench.py --db SHARED      # run, compare, record
+    python laptopcheck_cpubench.py --show MODEL     # stored peer figures
+    python laptopcheck_cpubench.py --export FILE / --import FILE
+
+A unit only has peers in a database other units write to as well, so a run
+is compared and recorded only against a shared baseline: ``--db`` or
+LAPTOPCHECK_CPU_BASELINE pointing at a shared file (or one kept in step by
+export and import). Without one the scores are reported with no comparison;
+a per-machine database would only ever hold the machine itself.
+"""
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from laptopcheck_inventory import CACHE_PATH
+from laptopcheck_stress import KERNELS
+
+BASELINE_ENV = 'LAPTOPCHECK_CPU_BASELINE'
+BASELINE_PATH = os.path.join(os.path.dirname(CACHE_PATH), 'cpu_baseline.db')
+
+# kernel -> (display unit, scale from the kernel's work units per second)
+BENCH_KERNELS = {'int': ('Mop/s', 1e-6), 'fma': ('GFLOP/s', 1e-9)}
+SECONDS = 1.0
+ROUNDS = 3
+# Percentiles are only reported once this many other machines of the model are known
+MIN_PEERS = 5
+# Below this percentage of the peer median the probe warns
+SLOW_RELATIVE = 85
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cpu_scores (
+    model       TEXT NOT NULL,
+    metric      TEXT NOT NULL,
+    machine     TEXT NOT NULL,
+    value       REAL NOT NULL,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (model, metric, machine)
+) WITHOUT ROWID;
+"""
+
+# Marketing and clock-speed noise that differs between OS reports of the same part
+_NOISE = re.compile(r"\((?:r|tm|c)\)|\bcpu\b|\bprocessor\b|@.*$|\bwith .*$|\b\d+(?:st|nd|rd|th) gen\b|"
+                    r"\b(?:\d+|dual|quad|six|eight)-core\b", re.I)
+
+
+def normalize_model(text):
+    """Canonical CPU model key, e.g. 'intel core i7-8650u'"""
+    if not text:
+        return None
+    key = _NOISE.sub(' ', text)
+    key = re.sub(r'\s+', ' ', key).strip().lower()
+    return key or None
+
+
+def default_path():
+    return os.environ.get(BASELINE_ENV) or BASELINE_PATH
+
+
+# ========================================
+# BENCHMARK (kernels run inside worker processes)
+# ========================================
+
+def _worker(kernel, slot, seconds, rounds, barrier, rates):
+    chunk = KERNELS[kernel]()
+    chunk()
+    barrier.wait()
+    best = 0.0
+    for _ in range(rounds):
+        done, t0 = 0.0, time.perf_counter()
+        while True:
+            done += chunk()
+            elapsed = time.perf_counter() - t0
+            if elapsed >= seconds:
+                break
+        best = max(best, done / elapsed)
+    rates[slot] = best
+
+
+def measure(kernel, workers=1, seconds=SECONDS, rounds=1):
+    """Summed work per second of ``workers`` processes running ``kernel`` together"""
+    # spawn, not fork, for the same reason as the stress engine: probes run in threads
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(workers + 1)
+    rates = ctx.Array('d', workers, lock=False)
+    procs = [ctx.Process(target=_worker, args=(kernel, i, seconds, rounds, barrier, rates), daemon=True)
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+    try:
+        barrier.wait(timeout=60)
+        for p in procs:
+            p.join(timeout=seconds * rounds + 30)
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+    return sum(rates)
+
+
+def run_bench(kernels=tuple(BENCH_KERNELS), seconds=SECONDS, workers=None):
+    """Scores {'<kernel>_single': ..., '<kernel>_multi': ...} in each kernel's display unit"""
+    workers = workers or os.cpu_count() or 1
+    scores = {}
+    for kernel in kernels:
+        _, scale = BENCH_KERNELS[kernel]
+        scores[f'{kernel}_single'] = measure(kernel, 1, seconds, ROUNDS) * scale
+        scores[f'{kernel}_multi'] = measure(kernel, workers, seconds) * scale
+    return scores
+
+
+# ========================================
+# BASELINE DATABASE
+# ========================================
+
+def machine_key():
+    """Stable anonymous key of this machine (hash of its hardware identity)"""
+    from laptopcheck_journal import machine_identity
+    blob = json.dumps(machine_identity(), sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def percentile_of(value, peers):
+    """Mid-rank percentile of ``value`` among ``peers`` (ties count half)"""
+    below = sum(1 for p in peers if p < value)
+    equal = sum(1 for p in peers if p == value)
+    return 100.0 * (below + 0.5 * equal) / len(peers)
+
+
+class BaselineDB:
+    """Expected CPU scores per normalised model; use as a context manager or call close()."""
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, model, scores, machine, when=None):
+        """Store ``scores`` as the latest of ``machine`` for ``model``"""
+        when = when or datetime.datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cpu_scores (model, metric, machine, value, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                [(model, metric, machine, value, when) for metric, value in scores.items() if value])
+
+    def peers(self, model, exclude=None):
+        """{metric: [scores of other machines]} for ``model``"""
+        out = {}
+        rows = self.conn.execute("SELECT metric, value FROM cpu_scores WHERE model = ? AND machine != ?",
+                                 (model, exclude or ''))
+        for metric, value in rows:
+            out.setdefault(metric, []).append(value)
+        return out
+
+    def compare(self, model, scores, machine=None, min_peers=MIN_PEERS):
+        """{metric: {'percentile', 'relative', 'median', 'peers'}} of ``scores`` against the model's peers"""
+        import statistics
+        peers = self.peers(model, exclude=machine)
+        out = {}
+        for metric, value in scores.items():
+            values = peers.get(metric, [])
+            median = statistics.median(values) if values else None
+            enough = len(values) >= min_peers
+            out[metric] = {
+                'peers': len(values),
+                'median': median,
+                'percentile': percentile_of(value, values) if enough else None,
+                'relative': 100.0 * value / median if enough and median else None,
+            }
+        return out
+
+    def models(self):
+        """[(model, machines)] known to the database"""
+        return self.conn.execute("SELECT model, COUNT(DISTINCT machine) FROM cpu_scores GROUP BY model "
+                                 "ORDER BY model").fetchall()
+
+    def export_rows(self):
+        cur = self.conn.execute("SELECT model, metric, machine, value, recorded_at FROM cpu_scores "
+                                "ORDER BY model, metric")
+        return [dict(zip(('model', 'metric', 'machine', 'value', 'recorded_at'), row)) for row in cur]
+
+    def import_rows(self, rows):
+        """Merge exported rows, keeping the newer score where a machine is already known"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO cpu_scores (model, metric, machine, value, recorded_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (model, metric, machine) DO UPDATE SET value = excluded.value, "
+                "recorded_at = excluded.recorded_at WHERE excluded.recorded_at > cpu_scores.recorded_at",
+                [(normalize_model(r['model']), r['metric'], r['machine'], float(r['value']), r['recorded_at'])
+                 for r in rows])
+        return len(rows)
+
+
+def bench_and_compare(model, db_path=None, seconds=SECONDS, record=True):
+    """Run the benchmark, compare with peers of ``model`` and (by default) record this machine's scores.
+
+    Only a shared baseline is used: ``db_path`` or $LAPTOPCHECK_CPU_BASELINE;
+    without either the scores come back uncompared, with a ``note`` saying why.
+
+    A run below SLOW_RELATIVE of its peers is not recorded: a throttling or
+    faulty unit would lower the median later units are judged against.
+    """
+    key = normalize_model(model)
+    scores = run_bench(seconds=seconds)
+    db_path = db_path or os.environ.get(BASELINE_ENV)
+    comparison, ranked, relative, recorded = {}, [], None, False
+    if db_path and key:
+        machine = machine_key()
+        with BaselineDB(db_path) as db:
+            comparison = db.compare(key, scores, machine)
+            ranked = [c for c in comparison.values() if c['percentile'] is not None]
+            # The weakest metric decides: one slow kernel is enough to point at a problem
+            relative = min(c['relative'] for c in ranked) if ranked else None
+            recorded = record and (relative is None or relative >= SLOW_RELATIVE)
+            if recorded:
+                db.record(key, scores, machine)
+    peers = min((c['peers'] for c in comparison.values()), default=0)
+    if not key:
+        note = "CPU model unknown; not compared"
+    elif not db_path:
+        note = f"No shared baseline (set ${BASELINE_ENV}); not compared with other units"
+    elif not ranked:
+        note = f"{peers} other units of this model in the baseline; {MIN_PEERS} needed to compare"
+    else:
+        note = None
+    return {
+        'model': key,
+        'scores': scores,
+        'comparison': comparison,
+        'peers': peers,
+        'percentile': min(c['percentile'] for c in ranked) if ranked else None,
+        'relative': relative,
+        'recorded': recorded,
+        'note': note,
+    }
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="CPU benchmark compared with other units of the same model")
+    parser.add_argument('--db', help=f"shared baseline database (default ${BASELINE_ENV}; "
+                                     f"{BASELINE_PATH} for --show/--export/--import)")
+    parser.add_argument('--model', help="CPU model string (default: detected)")
+    parser.add_argument('--seconds', type=float, default=SECONDS, help="length of each timed window")
+    parser.add_argument('--no-record', action='store_true', help="compare only, do not store this run")
+    parser.add_argument('--show', metavar='MODEL', nargs='?', const='', help="list stored models or peer figures")
+    parser.add_argument('--export', metavar='FILE', help="write the baseline database as JSON")
+    parser.add_argument('--import', dest='import_', metavar='FILE', help="merge baselines from a JSON export")
+    args = parser.parse_args(argv)
+
+    with BaselineDB(args.db) as db:
+        if args.export:
+            with open(args.export, 'w', encoding='utf-8') as f:
+                json.dump(db.export_rows(), f, indent=1)
+            return 0
+        if args.import_:
+            with open(args.import_, encoding='utf-8') as f:
+                print(f"Imported {db.import_rows(json.load(f))} scores")
+            return 0
+        if args.show is not None:
+            if not args.show:
+                result = dict(db.models())
+            else:
+                result = {metric: sorted(values) for metric, values in db.peers(normalize_model(args.show)).items()}
+            json.dump(result, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+            return 0
+    model = args.model
+    if model is None:
+        from laptopcheck_parsers import cpu_summary, read_cpuinfo
+        import platform
+        model = cpu_summary(read_cpuinfo())['model'] if sys.platform.startswith('linux') else platform.processor()
+    result = bench_and_compare(model, args.db, args.seconds, record=not args.no_record)
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""Persistent fleet database of scans, keyed by machine identity.
+
+Scans are stored in a local SQLite database (WAL mode) so history survives
+the report being overwritten. A machine is recognised by its storage
+serial, WiFi MAC or any of its RAM serials, whichever matches first, so a
+unit that comes back with a swapped part is still found.
+
+    with FleetDB('laptopcheck_fleet.db') as db:
+        db.add_scans(scans)                 # one transaction, batched inserts
+        db.grade_distribution()             # {'GOOD': 812, 'FAIR': 90, ...}
+        db.repeat_units()                   # machines scanned more than once
+        db.battery_trend(machine_id)        # health and cycles per scan
+        db.feature_columns()                # scoring features for bulk re-grading
+
+Run ``python laptopcheck_db.py fleet.db grades|repeats|trend SERIAL`` for
+the same queries from a shell.
+"""
+import datetime
+import json
+import sqlite3
+import sys
+
+from laptopcheck_model import dumps, loads
+from laptopcheck_scoring import FEATURE_VERSION, features
+
+DEFAULT_DB_PATH = 'laptopcheck_fleet.db'
+
+# Placeholder strings firmware reports instead of a real serial
+JUNK_SERIALS = {'', 'n/a', 'none', 'unknown', 'not specified', 'to be filled by o.e.m.',
+                'default string', 'system serial number', '0', '00000000', '0000000000000000'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS machines (
+    id             INTEGER PRIMARY KEY,
+    storage_serial TEXT,
+    wifi_mac       TEXT,
+    hostname       TEXT,
+    first_seen     TEXT NOT NULL,
+    last_seen      TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ram_modules (
+    machine_id INTEGER NOT NULL REFERENCES machines(id),
+    serial     TEXT NOT NULL,
+    PRIMARY KEY (machine_id, serial)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scans (
+    id             INTEGER PRIMARY KEY,
+    machine_id     INTEGER NOT NULL REFERENCES machines(id),
+    scanned_at     TEXT NOT NULL,
+    score          INTEGER,
+    grade          TEXT,
+    battery_health REAL,
+    battery_cycles INTEGER,
+    temp_delta     REAL,
+    payload        TEXT NOT NULL,
+    features       TEXT,
+    feature_version INTEGER,
+    rules          TEXT,
+    scan_key       TEXT
+);
+CREATE INDEX IF NOT EXISTS machines_storage ON machines(storage_serial);
+CREATE INDEX IF NOT EXISTS machines_mac ON machines(wifi_mac);
+CREATE INDEX IF NOT EXISTS ram_modules_serial ON ram_modules(serial);
+CREATE INDEX IF NOT EXISTS scans_machine_date ON scans(machine_id, scanned_at);
+CREATE INDEX IF NOT EXISTS scans_grade ON scans(grade);
+CREATE INDEX IF NOT EXISTS scans_date ON scans(scanned_at);
+CREATE UNIQUE INDEX IF NOT EXISTS scans_key ON scans(scan_key);
+"""
+
+# Columns added after the first release: (table, column, type)
+MIGRATIONS = (
+    ('scans', 'features', 'TEXT'),
+    ('scans', 'rules', 'TEXT'),
+    ('scans', 'feature_version', 'INTEGER'),
+    ('scans', 'scan_key', 'TEXT'),
+)
+
+
+def clean_serial(value):
+    if value is None or str(value).strip().lower() in JUNK_SERIALS:
+        return None
+    return str(value).strip()
+
+
+class FleetDB:
+    """SQLite-backed scan history; use as a context manager or call close()."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _migrate(self):
+        for table, column, kind in MIGRATIONS:
+            existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            if existing and column not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    # ----------------------------------------
+    # Writes
+    # ----------------------------------------
+
+    def _find_machine(self, storage, mac, ram):
+        cur = self.conn.cursor()
+        if storage:
+            row = cur.execute("SELECT id FROM machines WHERE storage_serial = ?", (storage,)).fetchone()
+            if row:
+                return row[0]
+        if mac:
+            row = cur.execute("SELECT id FROM machines WHERE wifi_mac = ?", (mac,)).fetchone()
+            if row:
+                return row[0]
+        if ram:
+            marks = ','.join('?' * len(ram))
+            row = cur.execute(f"SELECT machine_id FROM ram_modules WHERE serial IN ({marks}) LIMIT 1",
+                              ram).fetchone()
+            if row:
+                return row[0]
+        return None
+
+    def _resolve_machine(self, scan, when):
+        identity = scan.machine
+        storage = clean_serial(identity['storage_serial'])
+        mac = clean_serial(identity['wifi_mac'])
+        ram = sorted({s for s in map(clean_serial, identity['ram_serials']) if s})
+        machine_id = self._find_machine(storage, mac, ram)
+        if machine_id is None:
+            cur = self.conn.execute(
+                "INSERT INTO machines (storage_serial, wifi_mac, hostname, first_seen, last_seen)"
+                " VALUES (?, ?, ?, ?, ?)", (storage, mac, scan.hostname, when, when))
+            machine_id = cur.lastrowid
+        else:
+            # Keep the newest identity so swapped parts are found next time
+            self.conn.execute(
+                "UPDATE machines SET storage_serial = COALESCE(?, storage_serial),"
+                " wifi_mac = COALESCE(?, wifi_mac), hostname = COALESCE(?, hostname),"
+                " last_seen = MAX(last_seen, ?) WHERE id = ?",
+                (storage, mac, scan.hostname, when, machine_id))
+        if ram:
+            self.conn.executemany("INSERT OR IGNORE INTO ram_modules (machine_id, serial) VALUES (?, ?)",
+                                  [(machine_id, s) for s in ram])
+        return machine_id
+
+    def add_scans(self, scans, keys=None):
+        """Store many ScanResults in one transaction; returns their scan ids.
+
+        ``keys`` are optional idempotency keys, one per scan: a scan whose key
+        is already stored is not added again and gets the existing id.
+        """
+        keys = keys or [None] * len(scans)
+        ids = []
+        with self.conn:
+            for scan, key in zip(scans, keys):
+                if key is not None:
+                    found = self.conn.execute("SELECT id FROM scans WHERE scan_key = ?", (key,)).fetchone()
+                    if found is not None:
+                        ids.append(found[0])
+                        continue
+                when = scan.finished or scan.started or datetime.datetime.now().isoformat(timespec='seconds')
+                machine_id = self._resolve_machine(scan, when)
+                battery, stress, condition = scan.get('Battery'), scan.get('Stress'), scan.condition
+                row = (
+                    machine_id, when,
+                    getattr(condition, 'score', None), getattr(condition, 'grade', None),
+                    getattr(battery, 'health', None), getattr(battery, 'cycles', None),
+                    getattr(stress, 'temp_delta', None),
+                    dumps(scan),
+                    json.dumps(features(scan.probes), separators=(',', ':')),
+                    FEATURE_VERSION,
+                    json.dumps(getattr(condition, 'rules', None) or []),
+                    key,
+                )
+                # Ids from each insert: other writers (the collector) share the WAL database
+                ids.append(self.conn.execute(
+                    "INSERT INTO scans (machine_id, scanned_at, score, grade, battery_health,"
+                    " battery_cycles, temp_delta, payload, features, feature_version, rules, scan_key)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row).lastrowid)
+        return ids
+
+    def add_scan(self, scan):
+        return self.add_scans([scan])[0]
+
+    # ----------------------------------------
+    # Queries
+    # ----------------------------------------
+
+    def find_machine(self, key):
+        """Machine id for a storage serial, WiFi MAC or RAM serial, or None"""
+        key = clean_serial(key)
+        if not key:
+            return None
+        return self._find_machine(key, key.upper(), [key])
+
+    def repeat_units(self, min_scans=2):
+        """Machines scanned at least ``min_scans`` times, most-scanned first"""
+        rows = self.conn.execute(
+            "SELECT m.id, m.storage_serial, m.wifi_mac, m.hostname, s.n, s.first, s.last"
+            " FROM (SELECT machine_id, COUNT(*) AS n, MIN(scanned_at) AS first, MAX(scanned_at) AS last"
+            "       FROM scans GROUP BY machine_id HAVING COUNT(*) >= ?) AS s"
+            " JOIN machines m ON m.id = s.machine_id ORDER BY s.n DESC, s.last DESC", (min_scans,))
+        keys = ('machine_id', 'storage_serial', 'wifi_mac', 'hostname', 'scans', 'first_scan', 'last_scan')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def battery_trend(self, machine_id):
+        """(scanned_at, health %, cycle count) for every scan of one machine, oldest first"""
+        return self.conn.execute(
+            "SELECT scanned_at, battery_health, battery_cycles FROM scans"
+            " WHERE machine_id = ? ORDER BY scanned_at", (machine_id,)).fetchall()
+
+    def grade_distribution(self, since=None, until=None):
+        """Scan count per grade, optionally limited to a date range (ISO strings)"""
+        sql, args = "SELECT grade, COUNT(*) FROM scans", []
+        if since or until:
+            sql += " WHERE scanned_at >= ? AND scanned_at < ?"
+            args = [since or '0000', until or '9999']
+        return dict(self.conn.execute(sql + " GROUP BY grade ORDER BY COUNT(*) DESC", args).fetchall())
+
+    def compare(self, machine_id):
+        """Differences between a machine's last two scans as {field: (before, after)}"""
+        rows = self.conn.execute(
+            "SELECT scanned_at, score, grade, battery_health, battery_cycles, temp_delta FROM scans"
+            " WHERE machine_id = ? ORDER BY scanned_at DESC LIMIT 2", (machine_id,)).fetchall()
+        if len(rows) < 2:
+            return {}
+        keys = ('scanned_at', 'score', 'grade', 'battery_health', 'battery_cycles', 'temp_delta')
+        after, before = rows
+        return {k: (b, a) for k, b, a in zip(keys, before, after) if a != b}
+
+    def feature_columns(self):
+        """(scan ids, {feature: float64 array}, stored grades) for every scan.
+
+        Scans stored before features were recorded, or under an older
+        FEATURE_VERSION, are decoded once and backfilled, so later calls only
+        read the small feature column.
+        """
+        from laptopcheck_scoring import columns
+        ids, rows, grades, backfill = [], [], [], []
+        cur = self.conn.execute("SELECT id, features, feature_version, grade FROM scans ORDER BY id")
+        for scan_id, feats, version, grade in cur:
+            if feats is None or version != FEATURE_VERSION:
+                payload = self.conn.execute("SELECT payload FROM scans WHERE id = ?", (scan_id,)).fetchone()[0]
+                row = features(loads(payload).probes)
+                backfill.append((json.dumps(row, separators=(',', ':')), FEATURE_VERSION, scan_id))
+            else:
+                row = json.loads(feats)
+            ids.append(scan_id)
+            rows.append(row)
+            grades.append(grade)
+        if backfill:
+            with self.conn:
+                self.conn.executemany("UPDATE scans SET features = ?, feature_version = ? WHERE id = ?", backfill)
+        return ids, columns(rows), grades
+
+    def store_grades(self, ids, result):
+        """Write the scores, grades and fired rules of a scoring ``evaluate`` result"""
+        from laptopcheck_scoring import fired_rules
+        rows = [(int(result['score'][i]), str(result['grade'][i]), json.dumps(fired_rules(result, i)), scan_id)
+                for i, scan_id in enumerate(ids)]
+        with self.conn:
+            self.conn.executemany("UPDATE scans SET score = ?, grade = ?, rules = ? WHERE id = ?", rows)
+
+    def iter_scans(self, machine_id=None, batch=500):
+        """Stored ScanResults, oldest first, fetched ``batch`` rows at a time"""
+        sql, args = "SELECT payload FROM scans", ()
+        if machine_id is not None:
+            sql, args = sql + " WHERE machine_id = ?", (machine_id,)
+        cur = self.conn.execute(sql + " ORDER BY scanned_at, id", args)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                return
+            for (payload,) in rows:
+                yield loads(payload)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Query the LaptopCheck fleet database")
+    parser.add_argument('db', help="path to the fleet database")
+    parser.add_argument('query', choices=('grades', 'repeats', 'trend'))
+    parser.add_argument('key', nargs='?', help="storage/RAM serial or MAC (for trend)")
+    args = parser.parse_args(argv)
+
+    with FleetDB(args.db) as db:
+        if args.query == 'grades':
+            result = db.grade_distribution()
+        elif args.query == 'repeats':
+            result = db.repeat_units()
+        else:
+            machine_id = db.find_machine(args.key)
+            if machine_id is None:
+                parser.error(f"no machine matches {args.key!r}")
+            result = {'machine_id': machine_id, 'battery': db.battery_trend(machine_id),
+                      'last_change': db.compare(machine_id)}
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
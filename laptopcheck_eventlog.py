@@ -0,0 +1,417 @@
+"""Streaming event-log analytics: firmware updates, lid, suspend, crashes, heat.
+
+Logs are parsed record by record from a stream of byte chunks, so memory
+stays flat however long the history is. Three formats are understood, live
+or as exported files:
+
+    wevtutil XML     ``wevtutil qe System /f:RenderedXml`` (or /f:xml)
+    wevtutil text    ``wevtutil qe System /f:text``
+    journald JSON    ``journalctl -o json``
+
+Records are classified into CATEGORIES by the rule tables below. On Linux
+two things are inferred across records rather than matched: a firmware
+update is a change in the BIOS version the kernel prints at every boot
+(``DMI: ... BIOS N2HET70W (1.52 ) ...``), and an unexpected shutdown is a
+boot that ended without journald stopping cleanly.
+
+A bookmark index (JSON, next to the inventory cache) remembers per source
+where the last scan stopped (journald cursor, Windows EventRecordID, or a
+byte offset into an export) together with the running counts, recent
+timeline and inference state, so a repeated scan only reads new records:
+
+    python laptopcheck_eventlog.py                      # this machine's logs
+    python laptopcheck_eventlog.py fixtures/eventlog/journal.json [--no-bookmark]
+"""
+import collections
+import datetime
+import hashlib
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+
+from laptopcheck_cmd import stream
+from laptopcheck_inventory import CACHE_PATH
+
+BOOKMARK_PATH = os.path.join(os.path.dirname(CACHE_PATH), 'eventlog.json')
+CATEGORIES = ('firmware_update', 'lid_open', 'lid_close', 'suspend', 'resume', 'unexpected_shutdown', 'thermal')
+# Most recent events kept per category
+TIMELINE = 50
+READ_SIZE = 64 * 1024
+MESSAGE_LIMIT = 500
+
+# Windows System log: (provider name suffix, event id, message pattern or None, categories)
+WINDOWS_RULES = (
+    # 19 is a successful install; failed ones (20) and TPM-WMI 1796 (a Secure Boot
+    # variable update that failed) left the firmware as it was and are not counted
+    ('WindowsUpdateClient', 19, r'firmware', ('firmware_update',)),
+    ('Kernel-Power', 42, r'Reason:\s*(?:Button or )?Lid', ('suspend', 'lid_close')),
+    ('Kernel-Power', 42, None, ('suspend',)),
+    ('Kernel-Power', 506, r'Reason:\s*Lid', ('suspend', 'lid_close')),
+    ('Kernel-Power', 506, None, ('suspend',)),
+    ('Kernel-Power', 507, r'Reason:\s*Lid', ('resume', 'lid_open')),
+    ('Kernel-Power', 507, None, ('resume',)),
+    ('Kernel-Power', 107, None, ('resume',)),
+    # 41 is written at the next boot; EventLog 6008 reports the same crash and is not counted
+    ('Kernel-Power', 41, None, ('unexpected_shutdown',)),
+    ('Kernel-Processor-Power', 37, None, ('thermal',)),
+)
+WINDOWS_EVENT_IDS = sorted({rule[1] for rule in WINDOWS_RULES})
+
+# journald: (SYSLOG_IDENTIFIER, or 'kernel' for the kernel transport; message pattern; category)
+JOURNAL_RULES = (
+    ('systemd-logind', r'^Lid opened', 'lid_open'),
+    ('systemd-logind', r'^Lid closed', 'lid_close'),
+    ('kernel', r'^PM: (?:suspend|hibernation) entry', 'suspend'),
+    ('kernel', r'^PM: (?:suspend|hibernation) exit', 'resume'),
+    ('kernel', r'temperature above threshold|critical temperature reached|thermal.*shutdown', 'thermal'),
+)
+# Messages that mean the boot ended on purpose
+CLEAN_SHUTDOWN = (('systemd-journald', r'^Journal stopped'), ('systemd-logind', r'^System is (?:powering down|rebooting)'))
+# Only these sources are read from the live journal
+JOURNAL_MATCHES = ('_TRANSPORT=kernel', '+', 'SYSLOG_IDENTIFIER=systemd-logind', '+',
+                   'SYSLOG_IDENTIFIER=systemd-journald')
+JOURNAL_FIELDS = 'MESSAGE,SYSLOG_IDENTIFIER,_TRANSPORT'
+
+_WINDOWS = [(provider, event_id, re.compile(pattern, re.I) if pattern else None, categories)
+            for provider, event_id, pattern, categories in WINDOWS_RULES]
+_JOURNAL = [(source, re.compile(pattern), category) for source, pattern, category in JOURNAL_RULES]
+_CLEAN = [(source, re.compile(pattern)) for source, pattern in CLEAN_SHUTDOWN]
+_DMI_BIOS = re.compile(r'^DMI: .*\bBIOS (.+?)\s+\d\d/\d\d/\d{4}')
+_XML_START = re.compile(rb'<Event[\s>]')
+_NS = '{http://schemas.microsoft.com/win/2004/08/events/event}'
+
+
+# ========================================
+# PARSERS (byte chunks in, (record, end offset) out)
+# ========================================
+
+def _lines(chunks, offset):
+    """(line, offset after it) for each line; a final unterminated line is yielded too"""
+    buf = b''
+    for chunk in chunks:
+        buf += chunk
+        start = 0
+        while True:
+            end = buf.find(b'\n', start)
+            if end < 0:
+                break
+            offset += end + 1 - start
+            yield buf[start:end + 1], offset
+            start = end + 1
+        buf = buf[start:]
+    if buf:
+        yield buf, offset + len(buf)
+
+
+def _iso(dt):
+    return dt.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def parse_journal(chunks, offset=0):
+    """Records of ``journalctl -o json`` output"""
+    for line, end in _lines(chunks, offset):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # Last line of an export still being written; no record, so the bookmark stays before it
+            continue
+        message = entry.get('MESSAGE') or ''
+        if isinstance(message, list):
+            message = bytes(message).decode(errors='replace')
+        stamp = entry.get('__REALTIME_TIMESTAMP')
+        when = (_iso(datetime.datetime.fromtimestamp(int(stamp) / 1e6, datetime.timezone.utc))
+                if stamp else None)
+        source = 'kernel' if entry.get('_TRANSPORT') == 'kernel' else entry.get('SYSLOG_IDENTIFIER', '')
+        yield {'time': when, 'source': source, 'id': None, 'message': message[:MESSAGE_LIMIT],
+               'boot': entry.get('_BOOT_ID'), 'position': entry.get('__CURSOR')}, end
+
+
+def parse_wevtutil_text(chunks, offset=0):
+    """Records of ``wevtutil qe ... /f:text`` output"""
+    record, message, in_description, end = None, [], False, offset
+    for raw, after in _lines(chunks, offset):
+        line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+        if re.match(r'^Event\[\d+\]:', line):
+            if record is not None:
+                record['message'] = ' '.join(message)[:MESSAGE_LIMIT]
+                yield record, end
+            record, message, in_description = {'time': None, 'source': '', 'id': None, 'boot': None,
+                                               'position': None}, [], False
+        elif record is not None:
+            if in_description:
+                if line.strip():
+                    message.append(line.strip())
+            else:
+                key, _, value = line.strip().partition(':')
+                value = value.strip()
+                if key == 'Source':
+                    record['source'] = value
+                elif key == 'Date':
+                    record['time'] = value[:19]
+                elif key == 'Event ID' and value.isdigit():
+                    record['id'] = int(value)
+                elif key == 'Description':
+                    in_description = True
+        end = after
+    if record is not None:
+        record['message'] = ' '.join(message)[:MESSAGE_LIMIT]
+        yield record, end
+
+
+def parse_wevtutil_xml(chunks, offset=0):
+    """Records of ``wevtutil qe ... /f:xml`` or ``/f:RenderedXml`` output (one <Event> at a time)"""
+    buf, base = b'', offset
+    for chunk in chunks:
+        buf += chunk
+        while True:
+            close = buf.find(b'</Event>')
+            if close < 0:
+                break
+            close += len(b'</Event>')
+            start = _XML_START.search(buf, 0, close)
+            piece = buf[start.start():close] if start else b''
+            buf, base = buf[close:], base + close
+            if piece:
+                yield _xml_record(ET.fromstring(piece)), base
+
+
+def _xml_record(event):
+    system = event.find(f'{_NS}System')
+    provider = system.find(f'{_NS}Provider')
+    created = system.find(f'{_NS}TimeCreated')
+    record_id = system.findtext(f'{_NS}EventRecordID')
+    message = event.findtext(f'{_NS}RenderingInfo/{_NS}Message')
+    if message is None:
+        data = event.findall(f'{_NS}EventData/{_NS}Data')
+        message = ' '.join(f"{d.get('Name')}: {d.text or ''}" for d in data)
+    event_id = system.findtext(f'{_NS}EventID')
+    return {
+        'time': created.get('SystemTime', '')[:19] if created is not None else None,
+        'source': provider.get('Name', '') if provider is not None else '',
+        'id': int(event_id) if event_id and event_id.isdigit() else None,
+        'message': ' '.join(message.split())[:MESSAGE_LIMIT],
+        'boot': None,
+        'position': int(record_id) if record_id and record_id.isdigit() else None,
+    }
+
+
+PARSERS = {'journal': parse_journal, 'text': parse_wevtutil_text, 'xml': parse_wevtutil_xml}
+
+
+def detect_format(head):
+    """'journal', 'xml' or 'text' from the first bytes of a log"""
+    head = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    if head.startswith(b'{'):
+        return 'journal'
+    if head.startswith(b'<'):
+        return 'xml'
+    return 'text'
+
+
+# ========================================
+# CLASSIFICATION
+# ========================================
+
+class EventCounter:
+    """Running counts, recent timeline and cross-record state; survives in the bookmark index."""
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.counts = collections.Counter(state.get('counts', {}))
+        self.timeline = {c: collections.deque(state.get('timeline', {}).get(c, []), maxlen=TIMELINE)
+                         for c in CATEGORIES}
+        self.records = state.get('records', 0)
+        self.first = state.get('first')
+        self.last = state.get('last')
+        self.boot = state.get('boot')
+        self.clean = state.get('clean', True)
+        self.bios = state.get('bios')
+
+    def add(self, category, when, detail=None):
+        self.counts[category] += 1
+        self.timeline[category].append([when, detail])
+
+    def feed(self, record, kind):
+        self.records += 1
+        when = record['time']
+        if when:
+            self.first = min(self.first, when) if self.first else when
+        if kind == 'journal':
+            self._journal(record)
+        else:
+            self._windows(record)
+        if when:
+            self.last = max(self.last, when) if self.last else when
+
+    def _windows(self, record):
+        for provider, event_id, pattern, categories in _WINDOWS:
+            if record['id'] == event_id and record['source'].endswith(provider):
+                if pattern is None or pattern.search(record['message']):
+                    for category in categories:
+                        self.add(category, record['time'], record['message'][:120] or None)
+                    return
+
+    def _journal(self, record):
+        source, message = record['source'], record['message']
+        if record['boot'] and record['boot'] != self.boot:
+            if self.boot is not None and not self.clean:
+                self.add('unexpected_shutdown', self.last, f"boot {self.boot[:8]} ended without a clean shutdown")
+            self.boot, self.clean = record['boot'], False
+        if source == 'kernel':
+            match = _DMI_BIOS.match(message)
+            if match:
+                bios = ' '.join(match.group(1).split())
+                if self.bios and bios != self.bios:
+                    self.add('firmware_update', record['time'], f"BIOS {self.bios} -> {bios}")
+                self.bios = bios
+                return
+        for clean_source, pattern in _CLEAN:
+            if source == clean_source and pattern.search(message):
+                self.clean = True
+                return
+        for rule_source, pattern, category in _JOURNAL:
+            if source == rule_source and pattern.search(message):
+                self.add(category, record['time'], message[:120])
+                return
+
+    def state(self):
+        return {'counts': dict(self.counts), 'timeline': {c: list(t) for c, t in self.timeline.items() if t},
+                'records': self.records, 'first': self.first, 'last': self.last, 'boot': self.boot,
+                'clean': self.clean, 'bios': self.bios}
+
+    def summary(self, new=0):
+        return {'counts': {c: self.counts.get(c, 0) for c in CATEGORIES},
+                'timeline': {c: list(t) for c, t in self.timeline.items() if t},
+                'records': self.records, 'new': new, 'first': self.first, 'last': self.last, 'bios': self.bios}
+
+
+# ========================================
+# BOOKMARKS
+# ========================================
+
+class BookmarkIndex:
+    """Per-source resume position and counter state, kept in one JSON file (None: memory only)."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        if path:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key) or {}
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+
+def _consume(index, key, kind, records, saved=None):
+    """Feed ``records`` [(record, position)] into the saved counter of ``key`` and bookmark the last position"""
+    saved = saved if saved is not None else index.get(key)
+    counter = EventCounter(saved.get('counter'))
+    position, new = saved.get('position'), 0
+    for record, end in records:
+        counter.feed(record, kind)
+        position, new = end, new + 1
+    entry = dict(saved, position=position, counter=counter.state(),
+                 updated=datetime.datetime.now().isoformat(timespec='seconds'))
+    index.put(key, entry)
+    return counter.summary(new)
+
+
+def _signature(path):
+    """Identity of an export file, so a replaced or rewritten file is read from the start"""
+    st = os.stat(path)
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+    return [st.st_dev, st.st_ino, hashlib.sha1(head[:1024]).hexdigest()]
+
+
+def scan_file(path, index=None):
+    """Counts and timeline of an exported log, reading only what was appended since the last scan"""
+    index = index if index is not None else BookmarkIndex(BOOKMARK_PATH)
+    key = 'file:' + os.path.abspath(path)
+    saved = index.get(key)
+    signature, size = _signature(path), os.path.getsize(path)
+    if saved.get('signature') != signature or (saved.get('position') or 0) > size:
+        saved = {}
+    offset = saved.get('position') or 0
+    with open(path, 'rb') as f:
+        kind = detect_format(f.read(256))
+        f.seek(offset)
+        chunks = iter(lambda: f.read(READ_SIZE), b'')
+        records = PARSERS[kind](chunks, offset)
+        summary = _consume(index, key, 'journal' if kind == 'journal' else 'windows', records,
+                           dict(saved, signature=signature))
+    return dict(summary, source=path, format=kind)
+
+
+def scan_journal(index=None):
+    """Counts and timeline of the live systemd journal, new entries only"""
+    index = index if index is not None else BookmarkIndex(BOOKMARK_PATH)
+    key = 'journald'
+    cursor = index.get(key).get('position')
+    argv = ['journalctl', '-o', 'json', '--no-pager', '-q', f'--output-fields={JOURNAL_FIELDS}']
+    if cursor:
+        argv.append(f'--after-cursor={cursor}')
+    argv.extend(JOURNAL_MATCHES)
+    records = ((record, record['position']) for record, _ in parse_journal(stream(argv)))
+    return dict(_consume(index, key, 'journal', records), source='journald', format='journal')
+
+
+def scan_windows(index=None, log='System'):
+    """Counts and timeline of a live Windows event log, records after the bookmarked EventRecordID"""
+    index = index if index is not None else BookmarkIndex(BOOKMARK_PATH)
+    key = f'wevtutil:{log}'
+    last = index.get(key).get('position') or 0
+    ids = ' or '.join(f'EventID={i}' for i in WINDOWS_EVENT_IDS)
+    query = f'*[System[(EventRecordID>{last}) and ({ids})]]'
+    argv = ['wevtutil', 'qe', log, f'/q:{query}', '/f:RenderedXml']
+    records = ((record, record['position'] or last) for record, _ in parse_wevtutil_xml(stream(argv)))
+    return dict(_consume(index, key, 'windows', records), source=f'wevtutil {log}', format='xml')
+
+
+def scan_system(os_type, index=None):
+    """This machine's logs: the journal on Linux, the System log on Windows (None elsewhere)"""
+    if 'linux' in os_type:
+        return scan_journal(index)
+    if 'windows' in os_type:
+        return scan_windows(index)
+    return None
+
+
+def main(argv=None):
+    import argparse
+    import platform
+    parser = argparse.ArgumentParser(description="Count firmware, lid, suspend, crash and thermal events")
+    parser.add_argument('paths', nargs='*', help="exported logs (default: this machine's live log)")
+    parser.add_argument('--no-bookmark', action='store_true', help="read everything, do not update the index")
+    args = parser.parse_args(argv)
+
+    index = BookmarkIndex(None if args.no_bookmark else BOOKMARK_PATH)
+    if args.paths:
+        result = [scan_file(path, index) for path in args.paths]
+    else:
+        result = scan_system(platform.system().lower(), index)
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
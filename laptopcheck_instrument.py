@@ -0,0 +1,272 @@
+"""Per-probe timing, resource and error instrumentation for scans.
+
+``Instrument.wrap`` puts a thin timer around every scheduler probe and
+records, for each one:
+
+    wall        seconds from start to return
+    cpu         CPU seconds of the probe's own thread
+    child_cpu   CPU seconds of child processes reaped while it ran (stress
+                and memory-test workers); process-wide, so probes running
+                side by side share it
+    commands    external tools started through laptopcheck_cmd, plus
+                ``shared`` memoized results reused from other probes
+    peak_rss    highest resident memory of this process and its children
+                while the probe ran (sampled)
+    error       exception type and message when the probe raised, or the
+                scheduler's timeout / skip message
+
+One capture mode can be switched on for a closer look:
+
+    cprofile     a profiler per probe thread; the top functions by
+                 cumulative time are kept with the probe
+    tracemalloc  Python allocations made while each probe ran, and the
+                 top allocation sites of the whole scan
+
+    inst = Instrument(capture='cprofile')
+    results = ProbeScheduler(inst.wrap(probes)).run()
+    scan.timings = inst.finish(results)
+    inst.write_json('timings.json'); inst.write_trace('scan.trace.json')
+
+The trace file opens in chrome://tracing or ui.perfetto.dev. The summary is
+stored with the scan and shown at the foot of its report.
+"""
+import json
+import os
+import threading
+import time
+
+from laptopcheck_cmd import get_runner
+from laptopcheck_scheduler import Probe
+
+CAPTURES = ('cprofile', 'tracemalloc')
+SAMPLE_INTERVAL = 0.1
+TOP = 15
+MB = 1024 * 1024
+
+
+def _child_cpu():
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+def _rss_reader():
+    """Function returning resident bytes of this process and its children"""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        me = psutil.Process()
+
+        def rss():
+            total = me.memory_info().rss
+            for child in me.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        return rss
+    page = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def rss():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * page
+        except OSError:
+            return 0
+    return rss
+
+
+def _top_functions(profiler, top=TOP):
+    import pstats
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({'function': f"{os.path.basename(filename)}:{line}({func})", 'calls': calls,
+                     'own': round(own, 4), 'cumulative': round(cumulative, 4)})
+    rows.sort(key=lambda r: -r['cumulative'])
+    return rows[:top]
+
+
+class Instrument:
+    """Collects per-probe measurements for one scan."""
+
+    def __init__(self, capture=None, interval=SAMPLE_INTERVAL, top=TOP):
+        if capture not in (None,) + CAPTURES:
+            raise ValueError(f"Unknown capture {capture!r}; choose from {', '.join(CAPTURES)}")
+        self.capture = capture
+        self.interval = interval
+        self.top = top
+        self.records = {}
+        self.samples = []
+        self.summary = None
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._rss = _rss_reader()
+        self._t0 = time.perf_counter()
+
+    def wrap(self, probes):
+        """Copies of scheduler ``probes`` whose functions are measured"""
+        self._t0 = time.perf_counter()
+        if self.capture == 'tracemalloc':
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        self._sampler = threading.Thread(target=self._sample, name="instrument", daemon=True)
+        self._sampler.start()
+        return [Probe(p.name, self._timed(p.name, p.func), p.deps, p.timeout, p.on_error) for p in probes]
+
+    def _read_rss(self):
+        try:
+            return self._rss()
+        except Exception:
+            return 0
+
+    def _sample(self):
+        while not self._stop.is_set():
+            rss = self._read_rss()
+            with self._lock:
+                self.samples.append((time.perf_counter() - self._t0, rss))
+                for record in self._running.values():
+                    record['peak_rss'] = max(record['peak_rss'], rss)
+            self._stop.wait(self.interval)
+
+    def _timed(self, name, func):
+        runner = get_runner()
+
+        def timed(*args):
+            record = {'name': name, 'thread': threading.current_thread().name, 'tid': threading.get_ident(),
+                      'start': time.perf_counter() - self._t0, 'peak_rss': self._read_rss()}
+            started, shared = runner.thread_counts()
+            cpu, child = time.thread_time(), _child_cpu()
+            with self._lock:
+                self._running[name] = record
+            profiler = traced = None
+            if self.capture == 'cprofile':
+                import cProfile
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Python 3.12+ allows one active profiler at a time
+                    profiler, record['profile_error'] = None, "another probe was being profiled"
+            elif self.capture == 'tracemalloc':
+                import tracemalloc
+                traced = tracemalloc.get_traced_memory()[0]
+            try:
+                return func(*args)
+            except BaseException as e:
+                record['error'] = type(e).__name__
+                record['message'] = str(e)[:300]
+                raise
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    record['profile'] = _top_functions(profiler, self.top)
+                if traced is not None:
+                    import tracemalloc
+                    record['py_alloc_mb'] = round((tracemalloc.get_traced_memory()[0] - traced) / MB, 2)
+                record['peak_rss'] = max(record['peak_rss'], self._read_rss())
+                now_started, now_shared = runner.thread_counts()
+                record.update(wall=time.perf_counter() - self._t0 - record['start'],
+                              cpu=time.thread_time() - cpu, child_cpu=_child_cpu() - child,
+                              commands=now_started - started, shared=now_shared - shared)
+                with self._lock:
+                    self._running.pop(name, None)
+                    self.records[name] = record
+        return timed
+
+    def finish(self, results):
+        """Stop sampling and return the summary for ``ScanResult.timings``.
+
+        ``results`` (the scheduler's) supplies each probe's final status, so
+        timeouts, skips and results carried over from a resumed scan are
+        listed alongside the probes that ran.
+        """
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        end = time.perf_counter() - self._t0
+        probes = []
+        with self._lock:
+            running = dict(self._running)
+        for name, value in results.items():
+            record = self.records.get(name)
+            if record is None and name in running:
+                # Abandoned after its timeout; still running in its thread
+                record = dict(running[name], wall=end - running[name]['start'])
+            if record is None:
+                record = {'name': name, 'ran': False}
+            status = getattr(value, 'status', None)
+            record['status'] = getattr(status, 'value', None)
+            if 'error' not in record and getattr(value, 'error', None) and record['status'] in ('error', 'skipped'):
+                record['error'] = 'Timeout' if value.error.startswith('Timed out') else record['status'].capitalize()
+                record['message'] = value.error
+            probes.append(_rounded(record))
+        probes.sort(key=lambda r: r.get('start', -1))
+        self.summary = {
+            'wall': round(end, 3),
+            'cpu': round(sum(r.get('cpu', 0) for r in probes), 3),
+            'commands': sum(r.get('commands', 0) for r in probes),
+            'peak_rss_mb': round(max((rss for _, rss in self.samples), default=0) / MB, 1),
+            'capture': self.capture,
+            'probes': probes,
+        }
+        if self.capture == 'tracemalloc':
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            self.summary['top_allocations'] = [
+                {'site': str(stat.traceback[0]), 'size_mb': round(stat.size / MB, 3), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:self.top]]
+            tracemalloc.stop()
+        return self.summary
+
+    # ----------------------------------------
+    # Export
+    # ----------------------------------------
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary, f, indent=2)
+
+    def trace_events(self):
+        """Chrome trace events: one slice per probe plus a memory counter track"""
+        pid = os.getpid()
+        events, threads = [], {}
+        for r in self.summary['probes']:
+            if 'start' not in r:
+                continue
+            threads.setdefault(r['tid'], r['thread'])
+            args = {k: r[k] for k in ('cpu', 'child_cpu', 'commands', 'shared', 'peak_rss_mb', 'status',
+                                      'error', 'message') if r.get(k) is not None}
+            events.append({'name': r['name'], 'cat': 'probe', 'ph': 'X', 'pid': pid, 'tid': r['tid'],
+                           'ts': round(r['start'] * 1e6), 'dur': round(r['wall'] * 1e6), 'args': args})
+        for tid, name in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+        for t, rss in self.samples:
+            events.append({'name': 'RSS', 'ph': 'C', 'pid': pid, 'ts': round(t * 1e6),
+                           'args': {'MB': round(rss / MB, 1)}})
+        return events
+
+    def write_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f)
+
+
+def _rounded(record):
+    out = {k: v for k, v in record.items() if k != 'peak_rss'}
+    for key in ('start', 'wall', 'cpu', 'child_cpu'):
+        if key in out:
+            out[key] = round(out[key], 4)
+    if 'peak_rss' in record:
+        out['peak_rss_mb'] = round(record['peak_rss'] / MB, 1)
+    return out
+
+
+def slowest(timings, n=5):
+    """The ``n`` probes with the longest wall time in a stored summary"""
+    ran = [p for p in (timings or {}).get('probes', []) if p.get('wall') is not None]
+    return sorted(ran, key=lambda p: -p['wall'])[:n]
@@ -0,0 +1,139 @@
+"""Cached hardware inventory, collected once per boot.
+
+Static facts (CPU model, the dmidecode memory dump, the lsblk disk list)
+only change when the machine reboots or its hardware changes, yet every
+scan used to fetch them again through subprocesses. The inventory keeps
+them on disk next to a fingerprint of the boot id and hashes of the DMI
+and PCI/block device trees, and throws the cache away when any of those
+change. Re-scans then only pay for the dynamic probes.
+
+    inventory = get_inventory()
+    text = inventory.get('dmidecode-17', lambda: run_dmidecode())
+
+Set LAPTOPCHECK_NO_INVENTORY_CACHE=1 to bypass the cache entirely.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+
+CACHE_PATH = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                          'laptopcheck', 'inventory.json')
+
+# World-readable DMI attributes that identify the board and firmware
+DMI_FIELDS = ('sys_vendor', 'product_name', 'product_version', 'board_vendor', 'board_name',
+              'bios_vendor', 'bios_version', 'bios_date', 'chassis_type')
+
+# Virtual block devices that come and go without any hardware change
+VIRTUAL_BLOCK = ('loop', 'ram', 'zram', 'dm-', 'sr')
+
+
+def _read(path):
+    try:
+        with open(path, errors='replace') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def _digest(parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode())
+        h.update(b'\0')
+    return h.hexdigest()[:16]
+
+
+def boot_id():
+    value = _read('/proc/sys/kernel/random/boot_id')
+    if value:
+        return value
+    try:
+        import psutil
+        return f"boot-{int(psutil.boot_time())}"
+    except (ImportError, OSError):
+        return None
+
+
+def fingerprint():
+    """Identity of this boot and hardware configuration"""
+    dmi = [f"{k}={_read(f'/sys/class/dmi/id/{k}')}" for k in DMI_FIELDS]
+    pci = [f"{os.path.basename(d)}:{_read(f'{d}/vendor')}:{_read(f'{d}/device')}"
+           for d in sorted(glob.glob('/sys/bus/pci/devices/*'))]
+    block = [f"{os.path.basename(d)}:{_read(f'{d}/size')}:{_read(f'{d}/device/serial')}"
+             for d in sorted(glob.glob('/sys/block/*'))
+             if not os.path.basename(d).startswith(VIRTUAL_BLOCK)]
+    return {'boot_id': boot_id(), 'dmi': _digest(dmi), 'pci': _digest(pci), 'block': _digest(block)}
+
+
+class HardwareInventory:
+    """Disk-backed cache of static hardware facts, valid for one fingerprint."""
+
+    def __init__(self, path=CACHE_PATH, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.fingerprint = fingerprint() if enabled else None
+        self.facts = self._load() if enabled else {}
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('fingerprint') != self.fingerprint:
+            return {}
+        return data.get('facts', {})
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'facts': self.facts}, f)
+        os.replace(tmp, self.path)
+
+    def get(self, key, collect):
+        """Cached value for ``key``, calling ``collect()`` on a miss.
+
+        Failures are not cached: the exception propagates and the next scan
+        tries again.
+        """
+        if not self.enabled:
+            return collect()
+        with self._lock:
+            if key in self.facts:
+                return self.facts[key]
+        value = collect()
+        with self._lock:
+            self.facts[key] = value
+            try:
+                self._save()
+            except OSError:
+                pass  # read-only media (PXE image): keep the in-memory copy
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.facts = {}
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+_inventory = None
+_inventory_lock = threading.Lock()
+
+
+def get_inventory(refresh=False):
+    """Process-wide inventory; ``refresh=True`` discards cached facts first"""
+    global _inventory
+    with _inventory_lock:
+        if _inventory is None:
+            enabled = not os.environ.get('LAPTOPCHECK_NO_INVENTORY_CACHE')
+            _inventory = HardwareInventory(enabled=enabled)
+        if refresh:
+            _inventory.clear()
+        return _inventory
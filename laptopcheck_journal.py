@@ -0,0 +1,159 @@
+"""Checkpoint journal that lets an interrupted scan resume.
+
+Every finished probe result is appended to a small JSON-lines file and
+fsync-ed before the scan moves on, so a crash, a closed window or a reboot
+(for example after a battery run-down) loses at most the probe that was
+running. The next scan on the same machine reuses results that are still
+valid and only runs the rest:
+
+    {"kind": "scan", "id": "...", "started": "...", "machine": {...}}
+    {"kind": "probe", "name": "RAM SPD", "at": 1760000000.0, "result": {...}}
+    {"kind": "done", "finished": "..."}
+
+A result is reused when the journal belongs to this machine (same DMI, PCI
+and disk fingerprint, any boot), the scan never reached "done", the result
+is not an error, skip or unavailable, and it is younger than the probe's
+``valid_for`` (and the caller's ``max_age``). A probe with dependencies is
+reused only when everything it depends on is; Condition (``deps=ALL``)
+always runs again on the combined results.
+"""
+import datetime
+import json
+import os
+import platform
+import threading
+import time
+import uuid
+
+from laptopcheck_inventory import CACHE_PATH, fingerprint
+from laptopcheck_model import Status, from_dict, to_dict
+from laptopcheck_probes import ALL
+
+JOURNAL_PATH = os.path.join(os.path.dirname(CACHE_PATH), 'journal.jsonl')
+
+# Results with these statuses are always retried; UNAVAILABLE covers an
+# interactive test that was closed or not finished in time
+RETRY = (Status.ERROR, Status.SKIPPED, Status.UNAVAILABLE)
+
+
+def machine_identity():
+    """Hardware identity that survives a reboot (the boot id is left out)"""
+    identity = fingerprint()
+    identity.pop('boot_id', None)
+    identity['hostname'] = platform.node()
+    return identity
+
+
+class ScanJournal:
+    """Append-only, fsync-ed record of one scan's probe results."""
+
+    def __init__(self, path=JOURNAL_PATH, max_age=None):
+        self.path = path
+        self.max_age = max_age
+        self.scan_id = None
+        self._identity = None
+        self._lock = threading.Lock()
+
+    @property
+    def identity(self):
+        if self._identity is None:
+            self._identity = machine_identity()
+        return self._identity
+
+    def _append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _read(self):
+        """Entries of the journal, stopping at a line torn by a crash"""
+        entries = []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break
+        except OSError:
+            pass
+        return entries
+
+    def unfinished(self):
+        """{name: (timestamp, result)} of an interrupted scan on this machine, else {}"""
+        entries = self._read()
+        if not entries or entries[0].get('kind') != 'scan' or entries[0].get('machine') != self.identity:
+            return {}
+        if any(e.get('kind') == 'done' for e in entries):
+            return {}
+        self.scan_id = entries[0].get('id')
+        return {e['name']: (e['at'], from_dict(e['result'])) for e in entries if e.get('kind') == 'probe'}
+
+    def resume(self, specs):
+        """Reusable results for ``specs`` (registry ProbeSpecs) from an interrupted scan"""
+        saved = self.unfinished()
+        now = time.time()
+        reusable = {}
+        # Probes without dependencies first, so theirs are known when the rest are checked
+        for spec in sorted(specs, key=lambda spec: bool(spec.deps)):
+            if spec.name not in saved or spec.deps == ALL:
+                continue
+            if not all(dep in reusable for dep in spec.deps):
+                continue
+            at, result = saved[spec.name]
+            limit = min(spec.valid_for, self.max_age) if self.max_age is not None else spec.valid_for
+            if getattr(result, 'status', None) in RETRY or now - at > limit:
+                continue
+            reusable[spec.name] = result
+        return reusable
+
+    def begin(self, carried=None):
+        """Start a scan record; ``carried`` results (from ``resume``) are written into it again"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        header = {'kind': 'scan', 'id': uuid.uuid4().hex,
+                  'started': datetime.datetime.now().isoformat(timespec='seconds'), 'machine': self.identity}
+        # Rewrite rather than append: the journal only ever holds the current scan
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        saved = self.unfinished() if carried else {}
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, separators=(',', ':')) + "\n")
+            for name in carried or ():
+                at = saved[name][0] if name in saved else time.time()
+                entry = {'kind': 'probe', 'name': name, 'at': at, 'result': to_dict(carried[name])}
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.scan_id = header['id']
+
+    def record(self, name, result):
+        self._append({'kind': 'probe', 'name': name, 'at': time.time(), 'result': to_dict(result)})
+
+    def finish(self):
+        self._append({'kind': 'done', 'finished': datetime.datetime.now().isoformat(timespec='seconds')})
+
+
+def run_checkpointed(probes, journal, resume=True, on_result=None, **scheduler_options):
+    """Run scheduler ``probes`` while journalling each result.
+
+    Returns (results, carried) where ``carried`` are the results reused from
+    an interrupted scan instead of being run again.
+    """
+    from laptopcheck_probes import get_probe
+    from laptopcheck_scheduler import ProbeScheduler
+    specs = {p.name: get_probe(p.name) for p in probes}
+    carried = journal.resume(specs.values()) if resume else {}
+    journal.begin(carried)
+
+    def checkpoint(name, value):
+        if name not in carried and specs[name].deps != ALL:
+            journal.record(name, value)
+        if on_result:
+            on_result(name, value)
+
+    results = ProbeScheduler(probes, on_result=checkpoint, completed=carried, **scheduler_options).run()
+    journal.finish()
+    return results, carried
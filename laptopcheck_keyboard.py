@@ -0,0 +1,330 @@
+"""Keyboard matrix test: every key of the layout, with chatter, stuck and slow-release detection.
+
+A window shows the keyboard layout; the tester presses every key once and
+each one turns green. The Tk handlers do nothing but append
+``(perf_counter_ns, press/release, keysym, event.time)`` to a list, so a
+burst of keystrokes is never dropped behind drawing; the layout is redrawn
+from the new events on a timer. When the tester clicks Finish (or closes the
+window) the whole event list is analysed per key:
+
+    chatter        a new press less than CHATTER_MS after the key was released,
+                   when the key had not been held long enough to auto-repeat
+    stuck          held for STUCK_MS or more, or still down at the end
+    slow release   median hold more than SLOW_FACTOR times the median of all
+                   keys (a key that comes back up sluggishly)
+    missing        keys of the layout never pressed
+
+Auto-repeat is folded into one hold: X11 repeats as release/press pairs
+with no gap after REPEAT_MIN_MS, Windows as presses without releases; such
+holds count towards stuck keys but not towards slow release.
+
+The per-key event delay is the time from the window system's timestamp
+(``event.time``, ms) to the handler running, relative to the quickest
+event of the session, i.e. how long input waited in the queue.
+"""
+import statistics
+import time
+
+CHATTER_MS = 15
+REPEAT_MIN_MS = 150
+STUCK_MS = 3000
+SLOW_FACTOR = 2.5
+SLOW_MIN_MS = 250
+REDRAW_MS = 30
+PRESS, RELEASE = 1, 0
+
+# Rows of (keysym, label, width in key units)
+LAYOUT = (
+    (('Escape', 'Esc', 1),) + tuple((f'F{n}', f'F{n}', 1) for n in range(1, 13)) + (('Delete', 'Del', 1),),
+    (('grave', '`', 1),) + tuple((str(n % 10), str(n % 10), 1) for n in range(1, 11))
+    + (('minus', '-', 1), ('equal', '=', 1), ('BackSpace', 'Bksp', 2)),
+    (('Tab', 'Tab', 1.5),) + tuple((c, c.upper(), 1) for c in 'qwertyuiop')
+    + (('bracketleft', '[', 1), ('bracketright', ']', 1), ('backslash', '\\', 1.5)),
+    (('Caps_Lock', 'Caps', 1.75),) + tuple((c, c.upper(), 1) for c in 'asdfghjkl')
+    + (('semicolon', ';', 1), ('apostrophe', "'", 1), ('Return', 'Enter', 2.25)),
+    (('Shift_L', 'Shift', 2.25),) + tuple((c, c.upper(), 1) for c in 'zxcvbnm')
+    + (('comma', ',', 1), ('period', '.', 1), ('slash', '/', 1), ('Shift_R', 'Shift', 2.75)),
+    (('Control_L', 'Ctrl', 1.5), ('Super_L', 'Win', 1.25), ('Alt_L', 'Alt', 1.25), ('space', '', 6),
+     ('Alt_R', 'Alt', 1.25), ('Control_R', 'Ctrl', 1.25), ('Left', '←', 1), ('Up', '↑', 1), ('Down', '↓', 1),
+     ('Right', '→', 1)),
+)
+EXPECTED = tuple(key for row in LAYOUT for key, _, _ in row)
+
+# Keysyms Tk reports with Shift (or AltGr) held, mapped back to the physical key
+SHIFTED = {
+    'exclam': '1', 'at': '2', 'numbersign': '3', 'dollar': '4', 'percent': '5', 'asciicircum': '6',
+    'ampersand': '7', 'asterisk': '8', 'parenleft': '9', 'parenright': '0', 'underscore': 'minus',
+    'plus': 'equal', 'braceleft': 'bracketleft', 'braceright': 'bracketright', 'bar': 'backslash',
+    'colon': 'semicolon', 'quotedbl': 'apostrophe', 'less': 'comma', 'greater': 'period',
+    'question': 'slash', 'asciitilde': 'grave', 'ISO_Left_Tab': 'Tab', 'Meta_L': 'Alt_L',
+    'Meta_R': 'Alt_R', 'ISO_Level3_Shift': 'Alt_R', 'Win_L': 'Super_L', 'Caps_lock': 'Caps_Lock',
+}
+
+
+def normalize(keysym):
+    """Physical key of a Tk keysym (letters lower-cased, shifted symbols mapped back)"""
+    if len(keysym) == 1 and keysym.isalpha():
+        return keysym.lower()
+    return SHIFTED.get(keysym, keysym)
+
+
+# ========================================
+# ANALYSIS
+# ========================================
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def analyze(events, expected=EXPECTED, end_ns=None):
+    """Per-key statistics and problems from recorded ``(ns, kind, keysym, event_ms)`` events"""
+    keys = {}
+    # Offset between our clock and the window system's; the smallest one is "no queueing"
+    offsets = [ns / 1e6 - ms for ns, _, _, ms in events if ms]
+    base = min(offsets) if offsets else None
+    for ns, kind, keysym, ms in events:
+        key = normalize(keysym)
+        k = keys.get(key)
+        if k is None:
+            k = keys[key] = {'presses': 0, 'chatter': 0, 'repeats': 0, 'holds': [], 'repeated': [], 'delays': [],
+                             'down': None, 'piece': None, 'released': None, 'repeating': False}
+        if base is not None and ms:
+            k['delays'].append(ns / 1e6 - ms - base)
+        if kind == PRESS:
+            if k['down'] is not None:
+                # Windows auto-repeat: presses with no release in between
+                k['repeating'] = True
+                k['repeats'] += 1
+                continue
+            gap = (ns - k['released']) / 1e6 if k['released'] is not None else None
+            if gap is not None and gap < CHATTER_MS:
+                held = (k['released'] - k['piece']) / 1e6
+                if k['repeating'] or held >= REPEAT_MIN_MS:
+                    # X11 auto-repeat: a release/press pair with no gap; the hold goes on
+                    k['repeating'] = True
+                    k['repeats'] += 1
+                    k['down'], k['piece'] = k['run'], ns
+                    k['holds'].pop()
+                    k['repeated'].pop()
+                    continue
+                k['chatter'] += 1
+            k['presses'] += 1
+            k['repeating'] = False
+            k['down'] = k['piece'] = k['run'] = ns
+        else:
+            if k['down'] is None:
+                continue
+            k['holds'].append((ns - k['down']) / 1e6)
+            k['repeated'].append(k['repeating'])
+            k['down'], k['released'] = None, ns
+
+    end_ns = end_ns or (events[-1][0] if events else 0)
+    # Held-down keys that auto-repeated were held on purpose and say nothing about the release
+    plain = {key: [h for h, rep in zip(k['holds'], k['repeated']) if not rep] for key, k in keys.items()}
+    all_holds = [h for holds in plain.values() for h in holds]
+    typical = statistics.median(all_holds) if all_holds else None
+    per_key, problems = {}, {'chatter': [], 'stuck': [], 'slow': []}
+    for key, k in keys.items():
+        still_down = k['down'] is not None
+        holds = k['holds'] + ([(end_ns - k['down']) / 1e6] if still_down else [])
+        hold = statistics.median(plain[key]) if plain[key] else None
+        stuck = still_down or any(h >= STUCK_MS for h in holds)
+        slow = (hold is not None and typical is not None and not stuck
+                and hold > max(SLOW_MIN_MS, SLOW_FACTOR * typical))
+        per_key[key] = {
+            'presses': k['presses'], 'chatter': k['chatter'], 'repeats': k['repeats'],
+            'hold_ms': round(hold, 1) if hold is not None else None,
+            'hold_max_ms': round(max(holds), 1) if holds else None,
+            'delay_ms': round(statistics.median(k['delays']), 2) if k['delays'] else None,
+            'delay_p95_ms': round(_pct(k['delays'], 95), 2) if k['delays'] else None,
+            'stuck': stuck, 'slow_release': slow,
+        }
+        if k['chatter']:
+            problems['chatter'].append(key)
+        if stuck:
+            problems['stuck'].append(key)
+        if slow:
+            problems['slow'].append(key)
+    delays = [d for k in keys.values() for d in k['delays']]
+    return {
+        'expected': len(expected),
+        'tested': sum(1 for key in expected if key in keys),
+        'missing': [key for key in expected if key not in keys],
+        'extra': sorted(key for key in keys if key not in expected),
+        'chatter': problems['chatter'],
+        'stuck': problems['stuck'],
+        'slow': problems['slow'],
+        'hold_ms': round(typical, 1) if typical is not None else None,
+        'delay_p95_ms': round(_pct(delays, 95), 2) if delays else None,
+        'events': len(events),
+        'keys': per_key,
+    }
+
+
+def live_update(s, kind, ns):
+    """Advance one key's live state ``s`` by an event; the same hold and repeat rules as analyze()"""
+    if kind != PRESS:
+        s['down'], s['released'] = False, ns
+    elif s['down']:
+        # Windows auto-repeat
+        s['repeating'] = True
+    else:
+        quick = s['released'] is not None and (ns - s['released']) / 1e6 < CHATTER_MS
+        if quick and (s['repeating'] or (s['released'] - s['piece']) / 1e6 >= REPEAT_MIN_MS):
+            # X11 auto-repeat: a release/press pair with no gap; the hold that began at 'pressed' goes on
+            s['repeating'] = True
+        else:
+            s['chatter'] = s['chatter'] or quick
+            s['repeating'], s['pressed'] = False, ns
+        s['down'], s['piece'] = True, ns
+    return s
+
+
+# ========================================
+# TEST WINDOW
+# ========================================
+
+class KeyboardTest:
+    """Toplevel window showing the layout; ``on_done(analysis)`` runs on the Tk thread when finished."""
+
+    UNIT = 44
+    COLORS = {'idle': '#3a3a3a', 'down': '#f1c40f', 'ok': '#27ae60', 'chatter': '#e74c3c', 'stuck': '#e67e22'}
+
+    def __init__(self, root, on_done=None, layout=LAYOUT):
+        import tkinter as tk
+        from tkinter import ttk
+        self.on_done = on_done
+        self.layout = layout
+        self.expected = tuple(key for row in layout for key, _, _ in row)
+        self.events = []
+        self.seen = 0
+        self.state = {}
+        self.finished = False
+
+        self.win = tk.Toplevel(root)
+        self.win.title("Keyboard test")
+        self.win.protocol('WM_DELETE_WINDOW', self.finish)
+        width = max(sum(w for _, _, w in row) for row in layout) * self.UNIT + 20
+        self.canvas = tk.Canvas(self.win, width=width, height=len(layout) * self.UNIT + 20, bg='#1a1a1a',
+                                highlightthickness=0)
+        self.canvas.pack(padx=10, pady=10)
+        self.status = ttk.Label(self.win, text="Press every key once; hold none down.")
+        self.status.pack()
+        ttk.Button(self.win, text="Finish", command=self.finish, takefocus=False).pack(pady=8)
+        self.rects = {}
+        for r, row in enumerate(layout):
+            x = 10
+            for key, text, w in row:
+                x1, y1 = x + 2, 10 + r * self.UNIT + 2
+                x2, y2 = x + w * self.UNIT - 2, 10 + (r + 1) * self.UNIT - 2
+                self.rects[key] = self.canvas.create_rectangle(x1, y1, x2, y2, fill=self.COLORS['idle'],
+                                                               outline='#555')
+                self.canvas.create_text((x1 + x2) / 2, (y1 + y2) / 2, text=text, fill='white',
+                                        font=('Helvetica', 10))
+                x += w * self.UNIT
+
+        # Tab and Alt would otherwise move focus or open menus instead of being recorded
+        for sequence in ('<KeyPress>', '<KeyRelease>'):
+            self.win.bind(sequence, self._press if sequence == '<KeyPress>' else self._release)
+        self.win.bind('<Tab>', lambda e: (self._press(e), 'break')[1])
+        self.win.bind('<Alt_L>', lambda e: (self._press(e), 'break')[1])
+        self.win.focus_force()
+        self.win.after(REDRAW_MS, self._redraw)
+
+    # Handlers only record; everything else happens in _redraw and analyze
+    def _press(self, event):
+        self.events.append((time.perf_counter_ns(), PRESS, event.keysym, event.time))
+
+    def _release(self, event):
+        self.events.append((time.perf_counter_ns(), RELEASE, event.keysym, event.time))
+
+    def _redraw(self):
+        if self.finished:
+            return
+        new, self.seen = self.events[self.seen:], len(self.events)
+        for ns, kind, keysym, _ in new:
+            key = normalize(keysym)
+            if key not in self.rects:
+                continue
+            s = self.state.setdefault(key, {'down': False, 'pressed': None, 'piece': None, 'released': None,
+                                            'repeating': False, 'chatter': False})
+            live_update(s, kind, ns)
+            color = 'down' if s['down'] else ('chatter' if s['chatter'] else 'ok')
+            self.canvas.itemconfigure(self.rects[key], fill=self.COLORS[color])
+        now = time.perf_counter_ns()
+        for key, s in self.state.items():
+            if s['down'] and (now - s['pressed']) / 1e6 > STUCK_MS:
+                self.canvas.itemconfigure(self.rects[key], fill=self.COLORS['stuck'])
+        if new:
+            done = sum(1 for key in self.expected if key in self.state)
+            self.status.configure(text=f"{done}/{len(self.expected)} keys")
+        self.win.after(REDRAW_MS, self._redraw)
+
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        result = analyze(self.events, self.expected, time.perf_counter_ns())
+        self.win.destroy()
+        if self.on_done:
+            self.on_done(result)
+        return result
+
+
+def run_keyboard_test(layout=LAYOUT, timeout=None):
+    """Run the test in a window of its own (no app window); returns the analysis.
+
+    With ``timeout`` the test finishes by itself after that many seconds,
+    with whatever keys were pressed by then.
+    """
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    out = {}
+
+    def done(result):
+        out['result'] = result
+        root.quit()
+
+    test = KeyboardTest(root, done, layout)
+    if timeout is not None:
+        root.after(int(timeout * 1000), test.finish)
+    root.mainloop()
+    root.destroy()
+    return out.get('result')
+
+
+def summary(result):
+    """One-line description of an analysis for logs and the simple GUI"""
+    parts = [f"{result['tested']}/{result['expected']} keys"]
+    for name, label in (('chatter', "chatter"), ('stuck', "stuck"), ('slow', "slow release"),
+                        ('missing', "not pressed")):
+        if result[name]:
+            keys = ', '.join(result[name][:8]) + (' ...' if len(result[name]) > 8 else '')
+            parts.append(f"{label}: {keys}")
+    if result['delay_p95_ms'] is not None:
+        parts.append(f"event delay p95 {result['delay_p95_ms']:.1f} ms")
+    return '; '.join(parts)
+
+
+def main(argv=None):
+    import argparse
+    import json
+    import sys
+    parser = argparse.ArgumentParser(description="Keyboard matrix test with chatter and stuck-key detection")
+    parser.add_argument('--keys', action='store_true', help="include per-key statistics in the output")
+    args = parser.parse_args(argv)
+    result = run_keyboard_test()
+    if result is None:
+        return 1
+    if not args.keys:
+        result = {k: v for k, v in result.items() if k != 'keys'}
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0 if not (result['chatter'] or result['stuck'] or result['missing']) else 2
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""User-space memory integrity and bandwidth test.
+
+A configurable fraction of available RAM is split across a process pool:
+one worker per NUMA node (pinned to that node's CPUs, so first-touch puts
+its buffer in local memory) or, on single-node machines, one per core.
+Each worker maps an anonymous buffer and runs vectorised write/verify
+passes over it in cache-busting chunks:
+
+    walking   every word holds one set bit, rotated across bit positions
+              (and the inverse, walking zeros)
+    address   every word holds its own index (address-in-address)
+    random    seeded random words, xor-ed with the chunk number
+
+Mismatches are counted as words and as flipped bits, with the first few
+kept as (offset, expected, actual). Write and verify passes are timed
+separately for bandwidth. This catches a bad DIMM at intake; it is not a
+replacement for memtest86's cache-disabled and refresh tests.
+"""
+import mmap
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CHUNK_WORDS = 1 << 20          # 8 MiB per vectorised step
+WALK_SHIFTS = (0, 7, 21, 42)   # rotations of the walking-ones pattern
+RANDOM_SEEDS = (0x5EED, 0xC0FFEE)
+PATTERNS = ('walking', 'address', 'random')
+MAX_SAMPLES = 16
+
+
+def numa_nodes():
+    """CPU sets of the online NUMA nodes that have CPUs ([] when unknown)"""
+    nodes = []
+    base = '/sys/devices/system/node'
+    try:
+        names = sorted(n for n in os.listdir(base) if n.startswith('node') and n[4:].isdigit())
+    except OSError:
+        return nodes
+    for name in names:
+        try:
+            with open(os.path.join(base, name, 'cpulist')) as f:
+                text = f.read().strip()
+        except OSError:
+            continue
+        cpus = set()
+        for part in filter(None, text.split(',')):
+            lo, _, hi = part.partition('-')
+            cpus.update(range(int(lo), int(hi or lo) + 1))
+        if cpus:
+            nodes.append(cpus)
+    return nodes
+
+
+# ========================================
+# PATTERNS (run inside worker processes)
+# ========================================
+
+# Each pattern is a fill(start, out) that writes the expected words for
+# buffer index ``start`` onwards into ``out``; it is used both to write the
+# buffer in place and to rebuild the expectation in a scratch chunk.
+
+def _walking(shift, inverse):
+    # CHUNK_WORDS is a multiple of 64, so every chunk has the same pattern
+    bits = (np.arange(CHUNK_WORDS, dtype=np.uint64) + np.uint64(shift)) & np.uint64(63)
+    pattern = np.left_shift(np.uint64(1), bits)
+    if inverse:
+        pattern = ~pattern
+
+    def fill(start, out):
+        np.copyto(out, pattern[:out.size])
+    return fill
+
+
+def _address():
+    index = np.arange(CHUNK_WORDS, dtype=np.uint64)
+
+    def fill(start, out):
+        np.add(index[:out.size], np.uint64(start), out=out)
+    return fill
+
+
+def _random(seed):
+    base = np.random.default_rng(seed).integers(0, 2**64, CHUNK_WORDS, dtype=np.uint64, endpoint=False)
+
+    def fill(start, out):
+        np.bitwise_xor(base[:out.size], np.uint64(start // CHUNK_WORDS), out=out)
+    return fill
+
+
+def _passes(patterns):
+    for pattern in patterns:
+        if pattern == 'walking':
+            for shift in WALK_SHIFTS:
+                yield f"walking1+{shift}", _walking(shift, False)
+                yield f"walking0+{shift}", _walking(shift, True)
+        elif pattern == 'address':
+            yield 'address', _address()
+        elif pattern == 'random':
+            for seed in RANDOM_SEEDS:
+                yield f"random-{seed:x}", _random(seed)
+        else:
+            raise ValueError(f"Unknown pattern {pattern!r}; choose from {', '.join(PATTERNS)}")
+
+
+def _worker(words, patterns, cpus=None):
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    buf = mmap.mmap(-1, words * 8)
+    mem = np.frombuffer(buf, dtype=np.uint64)
+    scratch = np.empty(CHUNK_WORDS, dtype=np.uint64)
+    out = {'bytes': words * 8, 'written': 0, 'write_s': 0.0, 'read': 0, 'read_s': 0.0,
+           'errors': 0, 'bit_errors': 0, 'samples': [], 'passes': []}
+    for name, fill in _passes(patterns):
+        t0 = time.perf_counter()
+        for start in range(0, words, CHUNK_WORDS):
+            fill(start, mem[start:start + CHUNK_WORDS])
+        out['write_s'] += time.perf_counter() - t0
+        out['written'] += words * 8
+
+        t0 = time.perf_counter()
+        for start in range(0, words, CHUNK_WORDS):
+            view = mem[start:start + CHUNK_WORDS]
+            expected = scratch[:view.size]
+            fill(start, expected)
+            bad = np.flatnonzero(view != expected)
+            if bad.size:
+                flipped = view[bad] ^ expected[bad]
+                out['errors'] += int(bad.size)
+                out['bit_errors'] += int(np.unpackbits(flipped.view(np.uint8)).sum())
+                for i in bad[:max(0, MAX_SAMPLES - len(out['samples']))]:
+                    out['samples'].append({'pass': name, 'offset': int((start + i) * 8),
+                                           'expected': f"{int(expected[i]):016x}",
+                                           'actual': f"{int(view[i]):016x}"})
+        out['read_s'] += time.perf_counter() - t0
+        out['read'] += words * 8
+        out['passes'].append(name)
+    # The mapping is released with the last view when the function returns
+    return out
+
+
+# ========================================
+# ENGINE
+# ========================================
+
+def run_memtest(fraction=0.25, patterns=PATTERNS, workers=None, max_bytes=None):
+    """Test ``fraction`` of available memory; returns totals, bandwidth and errors.
+
+    Bandwidth is total bytes moved over the slowest worker's time for that
+    phase, since the workers run concurrently.
+    """
+    import psutil
+    if not 0 < fraction <= 0.9:
+        raise ValueError("fraction must be in (0, 0.9]")
+    total = int(psutil.virtual_memory().available * fraction)
+    if max_bytes:
+        total = min(total, max_bytes)
+    nodes = numa_nodes()
+    if workers is None:
+        workers = len(nodes) if len(nodes) > 1 else os.cpu_count() or 1
+    affinity = nodes if len(nodes) > 1 and workers == len(nodes) else [None] * workers
+    words = max(CHUNK_WORDS, total // 8 // workers)
+
+    # spawn, as in the stress engine: the caller is usually a probe thread
+    ctx = multiprocessing.get_context('spawn')
+    t0 = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        results = list(pool.map(_worker, [words] * workers, [tuple(patterns)] * workers, affinity))
+    elapsed = time.monotonic() - t0
+
+    written = sum(r['written'] for r in results)
+    read = sum(r['read'] for r in results)
+    write_s = max(r['write_s'] for r in results)
+    read_s = max(r['read_s'] for r in results)
+    samples = [s for r in results for s in r['samples']][:MAX_SAMPLES]
+    return {
+        'bytes': sum(r['bytes'] for r in results),
+        'workers': workers,
+        'numa_nodes': len(nodes) or 1,
+        'passes': results[0]['passes'],
+        'duration': round(elapsed, 2),
+        'write_gbs': written / write_s / 1e9 if write_s else None,
+        'read_gbs': read / read_s / 1e9 if read_s else None,
+        'errors': sum(r['errors'] for r in results),
+        'bit_errors': sum(r['bit_errors'] for r in results),
+        'samples': samples,
+    }
@@ -0,0 +1,417 @@
+"""Typed results model for LaptopCheck scans.
+
+Every probe returns one of the slotted dataclasses below with numeric fields
+and a Status, instead of pre-formatted strings. Units live in the field
+metadata and are applied only when a value is displayed, so scoring, the
+report, the scan log and batch aggregation never parse text back.
+
+Serialization walks each class's cached field names directly (no
+``dataclasses.asdict`` deep copy) and round-trips through JSON or msgpack:
+
+    blob = dumps(scan)                  # JSON text
+    scan = loads(blob)                  # ScanResult again
+    blob = dumps(scan, fmt='msgpack')   # needs the msgpack package
+"""
+import enum
+import json
+from dataclasses import dataclass, field, fields
+from typing import Optional
+
+
+class Status(enum.Enum):
+    OK = 'ok'
+    WARN = 'warn'
+    FAIL = 'fail'
+    UNAVAILABLE = 'unavailable'
+    ERROR = 'error'
+    SKIPPED = 'skipped'
+
+
+def unit(symbol, label=None):
+    return field(default=None, metadata={'unit': symbol, 'label': label})
+
+
+def label(text):
+    return field(default=None, metadata={'label': text})
+
+
+def hidden(factory=dict):
+    """Raw data kept for scoring and charts but left out of the scan log"""
+    return field(default_factory=factory, metadata={'hidden': True})
+
+
+@dataclass(slots=True)
+class Result:
+    status: Status = Status.OK
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ProcessorResult(Result):
+    model: Optional[str] = None
+    architecture: Optional[str] = None
+    cores: Optional[int] = None
+
+
+@dataclass(slots=True)
+class MemoryResult(Result):
+    total_gb: Optional[float] = unit('GB', 'Total')
+
+
+@dataclass(slots=True)
+class RamModule:
+    part: Optional[str] = None
+    serial: Optional[str] = None
+    speed_mts: Optional[int] = unit('MT/s', 'Speed')
+
+
+@dataclass(slots=True)
+class RamSpdResult(Result):
+    modules: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class MemTestResult(Result):
+    tested_gb: Optional[float] = unit('GB', 'Tested')
+    workers: Optional[int] = None
+    numa_nodes: Optional[int] = label('NUMA nodes')
+    passes: Optional[int] = None
+    duration: Optional[float] = unit('s', 'Duration')
+    write_bw: Optional[float] = unit('GB/s', 'Write bandwidth')
+    read_bw: Optional[float] = unit('GB/s', 'Verify bandwidth')
+    errors: Optional[int] = label('Bad words')
+    bit_errors: Optional[int] = label('Flipped bits')
+    samples: list = hidden(list)
+
+
+@dataclass(slots=True)
+class BatteryResult(Result):
+    health: Optional[float] = unit('%', 'Health')
+    charge: Optional[float] = unit('%', 'Charge')
+    cycles: Optional[int] = label('Cycle count')
+    design_capacity: Optional[float] = unit('mWh', 'Design capacity')
+    full_capacity: Optional[float] = unit('mWh', 'Full capacity')
+    manufacturer: Optional[str] = None
+    manufacture_date: Optional[str] = label('MFD')
+    batteries: Optional[int] = None
+
+
+@dataclass(slots=True)
+class BatteryTestResult(Result):
+    batteries: Optional[int] = None
+    duration: Optional[float] = unit('s', 'Duration')
+    energy: Optional[float] = unit('Wh', 'Remaining energy')
+    full_energy: Optional[float] = unit('Wh', 'Full energy')
+    used: Optional[float] = unit('Wh', 'Used during test')
+    idle_drain: Optional[float] = unit('W', 'Idle drain')
+    load_drain: Optional[float] = unit('W', 'Load drain')
+    idle_runtime: Optional[float] = unit('h', 'Runtime left at idle')
+    load_runtime: Optional[float] = unit('h', 'Runtime left under load')
+    full_idle_runtime: Optional[float] = unit('h', 'Full-charge runtime at idle')
+    full_load_runtime: Optional[float] = unit('h', 'Full-charge runtime under load')
+    phases: dict = hidden()
+    series: dict = hidden()
+
+
+@dataclass(slots=True)
+class WifiResult(Result):
+    mac: Optional[str] = label('MAC')
+    interface: Optional[str] = None
+    driver: Optional[str] = None
+    pci_id: Optional[str] = label('PCI ID')
+    subsystem: Optional[str] = label('PCI subsystem')
+    # True when the card carries another laptop maker's subsystem ID; None when that cannot be told
+    replaced: Optional[bool] = label('Card from another vendor')
+
+
+@dataclass(slots=True)
+class NetworkResult(Result):
+    interfaces: Optional[int] = None
+    server: Optional[str] = label('Bench server')
+    interface: Optional[str] = label('Tested interface')
+    link_speed: Optional[int] = unit('Mbit/s', 'Link speed')
+    upload: Optional[float] = unit('Mbit/s', 'Upload')
+    download: Optional[float] = unit('Mbit/s', 'Download')
+    latency_p50: Optional[float] = unit('µs', 'Latency p50')
+    latency_p99: Optional[float] = unit('µs', 'Latency p99')
+    new_errors: Optional[int] = label('New errors/drops')
+    details: dict = hidden()
+
+
+@dataclass(slots=True)
+class StorageResult(Result):
+    name: Optional[str] = None
+    serial: Optional[str] = None
+    model: Optional[str] = None
+
+
+@dataclass(slots=True)
+class StorageHealthResult(Result):
+    device: Optional[str] = None
+    protocol: Optional[str] = None
+    smart_passed: Optional[bool] = label('SMART passed')
+    wear: Optional[float] = unit('%', 'Wear')
+    spare: Optional[float] = unit('%', 'Available spare')
+    power_on_hours: Optional[int] = unit('h', 'Power-on')
+    media_errors: Optional[int] = None
+    reallocated: Optional[int] = label('Reallocated/pending sectors')
+    written_tb: Optional[float] = unit('TB', 'Written')
+    seq_read: Optional[float] = unit('MB/s', 'Sequential read')
+    seq_write: Optional[float] = unit('MB/s', 'Sequential write')
+    iops_qd1: Optional[float] = label('4K IOPS QD1')
+    iops_peak: Optional[float] = label('4K IOPS peak')
+    latency_p99: Optional[float] = unit('µs', '4K p99 latency QD1')
+    direct_io: Optional[bool] = label('O_DIRECT')
+    random: dict = hidden()
+    smart: dict = hidden()
+
+
+@dataclass(slots=True)
+class CounterResult(Result):
+    count: Optional[int] = None
+    note: Optional[str] = None
+
+
+@dataclass(slots=True)
+class EventLogResult(Result):
+    source: Optional[str] = None
+    since: Optional[str] = label('Log starts')
+    firmware_updates: Optional[int] = None
+    lid_opens: Optional[int] = None
+    suspends: Optional[int] = None
+    unexpected_shutdowns: Optional[int] = None
+    thermal_events: Optional[int] = None
+    new_records: Optional[int] = label('New records read')
+    timeline: dict = hidden()
+
+
+@dataclass(slots=True)
+class StressResult(Result):
+    kernel: Optional[str] = None
+    workers: Optional[int] = None
+    duration: Optional[float] = unit('s', 'Duration')
+    throughput: Optional[float] = None
+    throughput_unit: Optional[str] = None
+    throttle_onset: Optional[float] = unit('s', 'Throttling after')
+    temp_delta: Optional[float] = unit('°C', 'Delta temp')
+    peak_temp: Optional[float] = unit('°C', 'Peak temp')
+    steady_temp: Optional[float] = unit('°C', 'Steady temp')
+    fan_drop: Optional[float] = unit('RPM', 'Fan drop')
+    stats: dict = hidden()
+    series: dict = hidden()
+
+
+@dataclass(slots=True)
+class CpuBenchResult(Result):
+    model: Optional[str] = None
+    int_single: Optional[float] = unit('Mop/s', 'Integer, 1 core')
+    int_multi: Optional[float] = unit('Mop/s', 'Integer, all cores')
+    fma_single: Optional[float] = unit('GFLOP/s', 'FMA, 1 core')
+    fma_multi: Optional[float] = unit('GFLOP/s', 'FMA, all cores')
+    percentile: Optional[float] = label('Percentile vs same model')
+    relative: Optional[float] = unit('%', 'Of same-model median')
+    peers: Optional[int] = label('Same-model units')
+    note: Optional[str] = None
+    comparison: dict = hidden()
+
+
+@dataclass(slots=True)
+class AudioResult(Result):
+    channels: Optional[int] = None
+    dead: Optional[str] = label('Dead channels')
+    snr: Optional[float] = unit('dB', 'Worst SNR')
+    thd: Optional[float] = unit('%', 'Worst THD')
+    deviation: Optional[float] = unit('dB', 'Response deviation')
+    imbalance: Optional[float] = unit('dB', 'Channel imbalance')
+    latency: Optional[float] = unit('ms', 'Loopback latency')
+    response: dict = hidden()
+
+
+@dataclass(slots=True)
+class KeyboardResult(Result):
+    tested: Optional[int] = label('Keys tested')
+    expected: Optional[int] = label('Keys in layout')
+    missing: Optional[str] = label('Not pressed')
+    chatter: Optional[str] = label('Chattering keys')
+    stuck: Optional[str] = label('Stuck keys')
+    slow: Optional[str] = label('Slow release')
+    hold: Optional[float] = unit('ms', 'Median hold')
+    delay_p95: Optional[float] = unit('ms', 'Input delay p95')
+    keys: dict = hidden()
+
+
+@dataclass(slots=True)
+class Condition(Result):
+    score: Optional[int] = None
+    grade: Optional[str] = None
+    color: Optional[str] = None
+    reasons: list = field(default_factory=list)
+    rules: list = hidden(list)
+    policy: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ScanResult:
+    hostname: Optional[str] = None
+    started: Optional[str] = None
+    finished: Optional[str] = None
+    probes: dict = field(default_factory=dict)
+    condition: Optional[Condition] = None
+    # Per-probe wall/CPU time, commands and memory (laptopcheck_instrument)
+    timings: dict = field(default_factory=dict)
+
+    def get(self, name, default=None):
+        return self.probes.get(name, default)
+
+    @property
+    def machine(self):
+        """Identity fields used to recognise the same unit across scans"""
+        storage, wifi, spd = self.get('Storage'), self.get('WiFi MAC'), self.get('RAM SPD')
+        return {
+            'storage_serial': getattr(storage, 'serial', None),
+            'wifi_mac': getattr(wifi, 'mac', None),
+            'ram_serials': [m.serial for m in getattr(spd, 'modules', [])],
+        }
+
+
+# ========================================
+# DISPLAY
+# ========================================
+
+def format_rate(value, unit):
+    """Human-readable throughput, e.g. ``11.86 GB/s``"""
+    if value is None:
+        return "N/A"
+    base = unit.split('/')[0]
+    for prefix, scale in (('T', 1e12), ('G', 1e9), ('M', 1e6), ('k', 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f} {prefix}{base}/s"
+    return f"{value:.0f} {unit}"
+
+
+def format_value(value, symbol=None):
+    if value is None:
+        return "N/A"
+    if isinstance(value, Status):
+        return value.value
+    if isinstance(value, float):
+        value = f"{value:.1f}"
+    if not symbol:
+        return str(value)
+    return f"{value}{symbol}" if symbol in ('%', '°C') else f"{value} {symbol}"
+
+
+def display_items(result):
+    """(label, text) pairs for the log and report, units applied, raw data skipped"""
+    items = []
+    failed = getattr(result, 'status', Status.OK) in (Status.UNAVAILABLE, Status.ERROR, Status.SKIPPED)
+    for f in fields(result):
+        if f.metadata.get('hidden') or f.name == 'error' and result.error is None:
+            continue
+        value = getattr(result, f.name)
+        if failed and value in (None, []):
+            continue
+        if f.name == 'status' and value is Status.OK:
+            continue
+        text = f.metadata.get('label') or f.name.replace('_', ' ').capitalize()
+        if f.name == 'throughput':
+            items.append((text, format_rate(value, result.throughput_unit or '')))
+        elif f.name == 'throughput_unit':
+            continue
+        elif isinstance(value, list):
+            items.append((text, [display_items(v) if is_result(v) else v for v in value]))
+        else:
+            items.append((text, format_value(value, f.metadata.get('unit'))))
+    return items
+
+
+def describe(name, result):
+    """Multi-line text block for the scan log"""
+    if not is_result(result):
+        return f"{name}: {result}"
+    lines = [f"{name}:"]
+
+    def add(items, indent):
+        for text, value in items:
+            if isinstance(value, list):
+                lines.append(f"{indent}{text}:")
+                for n, entry in enumerate(value):
+                    if isinstance(entry, list):
+                        if n:
+                            lines.append("")
+                        add(entry, indent + "    ")
+                    else:
+                        lines.append(f"{indent}  - {entry}")
+            else:
+                lines.append(f"{indent}{text}: {value}")
+    add(display_items(result), "  ")
+    return "\n".join(lines)
+
+
+# ========================================
+# SERIALIZATION
+# ========================================
+
+_TYPES = {cls.__name__: cls for cls in (
+    ProcessorResult, MemoryResult, MemTestResult, RamModule, RamSpdResult, BatteryResult, BatteryTestResult,
+    WifiResult, NetworkResult, StorageResult, StorageHealthResult, CounterResult, EventLogResult, StressResult,
+    AudioResult, CpuBenchResult, KeyboardResult, Condition, ScanResult, Result)}
+
+
+_field_names = {}
+
+
+def _names(cls):
+    names = _field_names.get(cls)
+    if names is None:
+        names = _field_names[cls] = tuple(f.name for f in fields(cls))
+    return names
+
+
+def is_result(obj):
+    return _TYPES.get(type(obj).__name__) is type(obj)
+
+
+def to_dict(obj):
+    """Plain dict/list tree with a ``type`` tag on every result object"""
+    if is_result(obj):
+        out = {'type': type(obj).__name__}
+        for name in _names(type(obj)):
+            out[name] = to_dict(getattr(obj, name))
+        return out
+    if isinstance(obj, Status):
+        return obj.value
+    if isinstance(obj, dict):
+        return {k: to_dict(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_dict(v) for v in obj]
+    return obj
+
+
+def from_dict(data):
+    """Inverse of ``to_dict``"""
+    if isinstance(data, dict):
+        cls = _TYPES.get(data.get('type'))
+        if cls is None:
+            return {k: from_dict(v) for k, v in data.items()}
+        kwargs = {k: from_dict(v) for k, v in data.items() if k != 'type' and k in cls.__dataclass_fields__}
+        if 'status' in kwargs:
+            kwargs['status'] = Status(kwargs['status'])
+        return cls(**kwargs)
+    if isinstance(data, list):
+        return [from_dict(v) for v in data]
+    return data
+
+
+def dumps(obj, fmt='json'):
+    if fmt == 'msgpack':
+        import msgpack
+        return msgpack.packb(to_dict(obj), use_bin_type=True)
+    return json.dumps(to_dict(obj), ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def loads(blob, fmt='json'):
+    if fmt == 'msgpack':
+        import msgpack
+        return from_dict(msgpack.unpackb(blob, raw=False))
+    return from_dict(json.loads(blob))
@@ -0,0 +1,456 @@
+"""Network interfaces, and throughput and latency against a bundled echo/sink server.
+
+The server is a single thread over non-blocking sockets. Each connection
+opens with a 9-byte header (mode, length):
+
+    E   echo: every byte read is sent back (latency pings)
+    S   sink: bytes are counted and thrown away; on EOF the count is sent back
+    D   source: ``length`` bytes are sent, straight from a file with sendfile
+
+The client side is non-blocking too. Uploads go out with ``os.sendfile``
+from the same kind of payload file, so the data is never copied through
+Python. Downloads are read with ``recv_into`` into one preallocated
+buffer. Platforms without sendfile (Windows) send memoryview slices of
+that buffer instead.
+
+Without a bench server, the server runs in-process on 127.0.0.1 and the
+loopback interface is measured. That exercises the stack and the CPU, not
+the NIC, and is what the tests use. On a bench station, run
+
+    python laptopcheck_network.py --serve 0.0.0.0:7654
+
+and point LAPTOPCHECK_BENCH_SERVER (or ``--server``) at it. Each interface
+that is up and has an IPv4 address is then tested in turn, with the
+client bound to that address. The interface that actually carried the
+traffic is read back from the counter deltas, since a source address
+alone does not pin the route. Its error and drop counter deltas over the
+run are reported alongside.
+"""
+import os
+import selectors
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from laptopcheck_parsers import NET_STATS, read_net_interfaces, read_net_stats
+
+SERVER_ENV = 'LAPTOPCHECK_BENCH_SERVER'
+DEFAULT_PORT = 7654
+HEADER = struct.Struct('!cQ')
+ECHO, SINK, SOURCE = b'E', b'S', b'D'
+BUFFER = 1 << 20
+SECONDS = 1.0
+PINGS = 200
+PING_SIZE = 64
+IO_TIMEOUT = 5.0
+# Counters whose growth during the run means the link lost or mangled frames
+ERROR_STATS = tuple(c for c in NET_STATS if not c.endswith(('_bytes', '_packets')))
+
+# PCI subsystem vendor IDs of laptop makers; a card keeps its maker's ID wherever it is fitted
+OEM_PCI_VENDORS = {
+    'lenovo': '17aa', 'dell': '1028', 'hp': '103c', 'hewlett-packard': '103c', 'acer': '1025',
+    'asustek': '1043', 'toshiba': '1179', 'apple': '106b', 'microsoft': '1414', 'samsung': '144d',
+    'fujitsu': '1734', 'sony': '104d', 'micro-star': '1462', 'panasonic': '10f7', 'huawei': '19e5',
+    'gigabyte': '1458', 'clevo': '1558', 'framework': 'f111',
+}
+
+
+def card_replaced(subsystem, sys_vendor):
+    """True when a card carries another laptop maker's PCI subsystem ID, False when its own, else None.
+
+    Retail cards carry the chip maker's ID and OEMs ship those too, so only
+    a different laptop maker's ID is taken as proof of a swap.
+    """
+    if not subsystem or not sys_vendor:
+        return None
+    words = sys_vendor.lower().replace(',', ' ').split()
+    own = OEM_PCI_VENDORS.get(words[0]) if words else None
+    card = subsystem.split(':')[0].lower()
+    if own is None:
+        return None
+    if card == own:
+        return False
+    return True if card in OEM_PCI_VENDORS.values() else None
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    host, sep, port = text.rpartition(':')
+    return (host, int(port)) if sep and host else (text, default_port)
+
+
+def _payload_file(size=BUFFER):
+    """Temporary file of ``size`` incompressible bytes to sendfile from"""
+    f = tempfile.TemporaryFile()
+    f.write(os.urandom(size))
+    f.flush()
+    return f
+
+
+def _send_payload(sock, payload, view, offset, count):
+    """Bytes sent of ``count`` from ``offset`` of the payload (sendfile where the OS has it)"""
+    if hasattr(os, 'sendfile'):
+        return os.sendfile(sock.fileno(), payload.fileno(), offset, count)
+    return sock.send(view[offset:offset + count])
+
+
+# ========================================
+# SERVER
+# ========================================
+
+class _Conn:
+    __slots__ = ('sock', 'header', 'mode', 'count', 'remaining', 'offset', 'pending')
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.header = bytearray()
+        self.mode = None
+        self.count = 0
+        self.remaining = 0
+        self.offset = 0
+        self.pending = None
+
+
+class BenchServer:
+    """Echo / sink / source server on one background thread; use as a context manager or call close()."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.sock = socket.create_server((host, port))
+        self.sock.setblocking(False)
+        self.address = self.sock.getsockname()[:2]
+        self.sel = selectors.DefaultSelector()
+        self.sel.register(self.sock, selectors.EVENT_READ)
+        self.buffer = bytearray(BUFFER)
+        self.view = memoryview(self.buffer)
+        self.payload = _payload_file()
+        self.payload.seek(0)
+        self.payload.readinto(self.buffer)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='bench-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        while not self.stop_event.is_set():
+            for key, events in self.sel.select(timeout=0.2):
+                if key.fileobj is self.sock:
+                    self._accept()
+                    continue
+                conn = key.data
+                try:
+                    if events & selectors.EVENT_READ:
+                        self._read(conn)
+                    if events & selectors.EVENT_WRITE and conn.sock.fileno() != -1:
+                        self._write(conn)
+                except (BlockingIOError, InterruptedError):
+                    pass
+                except OSError:
+                    # Client went away mid-transfer (download stopped, reset): normal end of a test
+                    self._drop(conn)
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        for key in list(self.sel.get_map().values()):
+            key.fileobj.close()
+        self.sel.close()
+        self.payload.close()
+
+    def _accept(self):
+        try:
+            sock, _ = self.sock.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sel.register(sock, selectors.EVENT_READ, _Conn(sock))
+
+    def _drop(self, conn):
+        try:
+            self.sel.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        conn.sock.close()
+
+    def _read(self, conn):
+        if conn.mode is None:
+            data = conn.sock.recv(HEADER.size - len(conn.header))
+            if not data:
+                return self._drop(conn)
+            conn.header += data
+            if len(conn.header) < HEADER.size:
+                return
+            conn.mode, conn.remaining = HEADER.unpack(conn.header)
+            if conn.mode == SOURCE:
+                self.sel.modify(conn.sock, selectors.EVENT_WRITE, conn)
+            elif conn.mode not in (ECHO, SINK):
+                self._drop(conn)
+            return
+        n = conn.sock.recv_into(self.view)
+        if conn.mode == SINK:
+            if n:
+                conn.count += n
+                return
+            # Sender is done: the 8-byte count always fits an empty send buffer
+            conn.sock.send(struct.pack('!Q', conn.count))
+            return self._drop(conn)
+        if not n:
+            return self._drop(conn)
+        conn.pending = memoryview(bytes(self.view[:n]))
+        self._write(conn)
+
+    def _write(self, conn):
+        if conn.mode == SOURCE:
+            while conn.remaining:
+                count = min(conn.remaining, BUFFER - conn.offset)
+                sent = _send_payload(conn.sock, self.payload, self.view, conn.offset, count)
+                conn.remaining -= sent
+                conn.offset = (conn.offset + sent) % BUFFER
+            return self._drop(conn)
+        sent = conn.sock.send(conn.pending)
+        conn.pending = conn.pending[sent:] if sent < len(conn.pending) else None
+        # Echo: wait for writability only while a reply is half-sent
+        self.sel.modify(conn.sock, selectors.EVENT_WRITE if conn.pending else selectors.EVENT_READ, conn)
+
+
+# ========================================
+# CLIENT
+# ========================================
+
+def _connect(address, mode, length=0, source=None):
+    sock = socket.create_connection(address, timeout=IO_TIMEOUT,
+                                    source_address=(source, 0) if source else None)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.sendall(HEADER.pack(mode, length))
+    sock.setblocking(False)
+    return sock
+
+
+def _wait(sel):
+    if not sel.select(timeout=IO_TIMEOUT):
+        raise TimeoutError(f"No progress from the bench server in {IO_TIMEOUT:.0f}s")
+
+
+def measure_latency(address, pings=PINGS, source=None):
+    """Sorted round-trip times (ms) of ``pings`` small echoes, one in flight at a time"""
+    sock = _connect(address, ECHO, source=source)
+    message = os.urandom(PING_SIZE)
+    reply = bytearray(PING_SIZE)
+    view = memoryview(reply)
+    times = []
+    with sock, selectors.DefaultSelector() as sel:
+        sel.register(sock, selectors.EVENT_READ)
+        for _ in range(pings):
+            t0 = time.perf_counter_ns()
+            sock.sendall(message)
+            got = 0
+            while got < PING_SIZE:
+                try:
+                    n = sock.recv_into(view[got:])
+                except BlockingIOError:
+                    _wait(sel)
+                    continue
+                if not n:
+                    raise ConnectionError("Bench server closed the echo connection")
+                got += n
+            times.append((time.perf_counter_ns() - t0) / 1e6)
+    times.sort()
+    return times
+
+
+def measure_upload(address, seconds=SECONDS, source=None):
+    """Mbit/s the server received while we sent for ``seconds`` (counted until it acknowledged the total)"""
+    sock = _connect(address, SINK, source=source)
+    with sock, _payload_file() as payload, selectors.DefaultSelector() as sel:
+        payload.seek(0)
+        view = memoryview(payload.read())
+        sel.register(sock, selectors.EVENT_WRITE)
+        offset = 0
+        t0 = time.perf_counter()
+        deadline = t0 + seconds
+        while time.perf_counter() < deadline:
+            try:
+                offset = (offset + _send_payload(sock, payload, view, offset, BUFFER - offset)) % BUFFER
+            except BlockingIOError:
+                _wait(sel)
+        sock.shutdown(socket.SHUT_WR)
+        sel.modify(sock, selectors.EVENT_READ)
+        ack = b''
+        while len(ack) < 8:
+            try:
+                data = sock.recv(8 - len(ack))
+            except BlockingIOError:
+                _wait(sel)
+                continue
+            if not data:
+                raise ConnectionError("Bench server closed without acknowledging the upload")
+            ack += data
+        elapsed = time.perf_counter() - t0
+    return struct.unpack('!Q', ack)[0] * 8 / elapsed / 1e6
+
+
+def measure_download(address, seconds=SECONDS, source=None):
+    """Mbit/s received from the server over ``seconds``"""
+    sock = _connect(address, SOURCE, 1 << 62, source=source)
+    buf = memoryview(bytearray(BUFFER))
+    received = 0
+    with sock, selectors.DefaultSelector() as sel:
+        sel.register(sock, selectors.EVENT_READ)
+        t0 = time.perf_counter()
+        deadline = t0 + seconds
+        while time.perf_counter() < deadline:
+            try:
+                n = sock.recv_into(buf)
+            except BlockingIOError:
+                _wait(sel)
+                continue
+            if not n:
+                break
+            received += n
+        elapsed = time.perf_counter() - t0
+    return received * 8 / elapsed / 1e6
+
+
+# ========================================
+# INTERFACES
+# ========================================
+
+def read_interfaces():
+    """Interface inventory: sysfs on Linux, psutil elsewhere (empty when neither is there)"""
+    interfaces = read_net_interfaces()
+    if interfaces:
+        return interfaces
+    try:
+        import psutil
+    except ImportError:
+        return []
+    stats, addrs, io = psutil.net_if_stats(), psutil.net_if_addrs(), psutil.net_io_counters(pernic=True)
+    out = []
+    for name in sorted(stats):
+        link = next((a.address for a in addrs.get(name, ()) if a.family == psutil.AF_LINK), None)
+        out.append({
+            'name': name, 'mac': link.replace('-', ':').upper() if link else None,
+            'state': 'up' if stats[name].isup else 'down', 'mtu': stats[name].mtu,
+            'speed': stats[name].speed or None, 'wireless': None, 'virtual': None,
+            'driver': None, 'pci_id': None, 'subsystem': None,
+            'stats': _psutil_stats(io.get(name)),
+        })
+    return out
+
+
+def _psutil_stats(c):
+    if c is None:
+        return {}
+    return {'rx_bytes': c.bytes_recv, 'tx_bytes': c.bytes_sent, 'rx_packets': c.packets_recv,
+            'tx_packets': c.packets_sent, 'rx_errors': c.errin, 'tx_errors': c.errout,
+            'rx_dropped': c.dropin, 'tx_dropped': c.dropout}
+
+
+def snapshot(names):
+    """{interface: counters} right now"""
+    if sys.platform.startswith('linux'):
+        return {name: read_net_stats(name) for name in names}
+    import psutil
+    io = psutil.net_io_counters(pernic=True)
+    return {name: _psutil_stats(io.get(name)) for name in names}
+
+
+def _ipv4_addresses():
+    """{interface: first IPv4 address} (needs psutil; empty without it)"""
+    try:
+        import psutil
+    except ImportError:
+        return {}
+    out = {}
+    for name, addrs in psutil.net_if_addrs().items():
+        ip = next((a.address for a in addrs if a.family == socket.AF_INET), None)
+        if ip:
+            out[name] = ip
+    return out
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))]
+
+
+def bench_target(address, names, source=None, seconds=SECONDS, pings=PINGS):
+    """Latency, upload and download to ``address``, and which interface carried them with what new errors"""
+    before = snapshot(names)
+    times = measure_latency(address, pings, source)
+    upload = measure_upload(address, seconds, source)
+    download = measure_download(address, seconds, source)
+    after = snapshot(names)
+    delta = {name: {c: after[name].get(c, 0) - before[name].get(c, 0) for c in after[name]} for name in names}
+    carrier = max(names, key=lambda n: delta[n].get('tx_bytes', 0) + delta[n].get('rx_bytes', 0), default=None)
+    errors = {c: v for c, v in delta.get(carrier, {}).items() if c in ERROR_STATS and v > 0}
+    return {
+        'source': source,
+        'interface': carrier,
+        'upload_mbps': round(upload, 1),
+        'download_mbps': round(download, 1),
+        'latency_ms': {f'p{q}': round(percentile(times, q), 3) for q in (50, 95, 99)} | {'max': round(times[-1], 3)},
+        'error_deltas': errors,
+    }
+
+
+def bench(server=None, seconds=SECONDS, pings=PINGS):
+    """Inventory plus one benchmark per testable interface; loopback through an in-process server by default"""
+    server = server or os.environ.get(SERVER_ENV)
+    interfaces = read_interfaces()
+    names = [i['name'] for i in interfaces]
+    tests = {}
+    if not server:
+        with BenchServer() as local:
+            tests['loopback'] = bench_target(local.address, names, None, seconds, pings)
+    else:
+        address = parse_address(server)
+        addresses = _ipv4_addresses()
+        sources = [(i['name'], addresses[i['name']]) for i in interfaces
+                   if i['state'] in ('up', 'unknown') and not i['virtual'] and i['name'] in addresses]
+        for name, source in sources or [('default', None)]:
+            try:
+                tests[name] = bench_target(address, names, source, seconds, pings)
+            except OSError as e:
+                tests[name] = {'source': source, 'error': f"{type(e).__name__}: {e}"}
+    return {'server': server or 'loopback', 'interfaces': interfaces, 'tests': tests}
+
+
+def main(argv=None):
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Network interfaces, throughput and latency")
+    parser.add_argument('--serve', metavar='HOST:PORT', nargs='?', const=f'0.0.0.0:{DEFAULT_PORT}',
+                        help="run the bench server until interrupted")
+    parser.add_argument('--server', help=f"bench server to test against (default ${SERVER_ENV}, else loopback)")
+    parser.add_argument('--seconds', type=float, default=SECONDS, help="length of each throughput run")
+    parser.add_argument('--pings', type=int, default=PINGS, help="latency round trips")
+    args = parser.parse_args(argv)
+    if args.serve:
+        server = BenchServer(*parse_address(args.serve))
+        print(f"Bench server on {server.address[0]}:{server.address[1]}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+        return 0
+    json.dump(bench(args.server, args.seconds, args.pings), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""Single-pass parsers for /proc, dmidecode, sysfs power_supply and net data.
+
+Each source is read once, without a shell, and turned into plain records:
+
+    read_meminfo()          {'MemTotal': 24377356, ...}       (kB)
+    read_cpuinfo()          [{'processor': '0', 'model name': ...}, ...]
+    parse_dmidecode(text)   [{'handle': '0x0004', 'type': 17, 'name': 'Memory Device',
+                              'fields': {'Size': '8 GB', ...}}, ...]
+    read_power_supply()     [{'name': 'BAT0', 'type': 'Battery', 'capacity': '62', ...}, ...]
+    read_net_interfaces()   [{'name': 'wlp0s20f3', 'wireless': True, 'driver': 'iwlwifi',
+                              'stats': {'rx_errors': 0, ...}, ...}, ...]
+
+The functions taking text parse fixtures just as well as live output.
+"""
+import os
+
+from laptopcheck_cmd import run_first
+
+POWER_SUPPLY_ROOT = '/sys/class/power_supply'
+NET_ROOT = '/sys/class/net'
+DMI_ID_ROOT = '/sys/class/dmi/id'
+
+# Per-interface counters read from statistics/ (the probe reports deltas of these)
+NET_STATS = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets', 'rx_errors', 'tx_errors', 'rx_dropped',
+             'tx_dropped', 'rx_crc_errors', 'rx_fifo_errors', 'tx_carrier_errors', 'collisions')
+
+# Attributes some kernels expose as files but leave out of ``uevent``
+SUPPLY_EXTRA_ATTRS = ('type', 'cycle_count', 'manufacture_date')
+
+# dmidecode placeholders meaning "nothing here"
+DMI_EMPTY = {'', 'Not Specified', 'Unknown', 'None', 'Not Provided', 'NO DIMM', 'No Module Installed'}
+
+
+# ========================================
+# /proc
+# ========================================
+
+def parse_meminfo(text):
+    """``Key: value [kB]`` lines as ints (kB for sized fields)"""
+    info = {}
+    for line in text.splitlines():
+        key, sep, rest = line.partition(':')
+        if sep:
+            value = rest.split(None, 1)
+            if value:
+                try:
+                    info[key] = int(value[0])
+                except ValueError:
+                    pass
+    return info
+
+
+def read_meminfo(path='/proc/meminfo'):
+    with open(path) as f:
+        return parse_meminfo(f.read())
+
+
+def parse_cpuinfo(text):
+    """One dict per logical CPU; blocks are separated by blank lines"""
+    cpus, current = [], {}
+    for line in text.splitlines():
+        if not line.strip():
+            if current:
+                cpus.append(current)
+                current = {}
+            continue
+        key, sep, value = line.partition(':')
+        if sep:
+            current[key.strip()] = value.strip()
+    if current:
+        cpus.append(current)
+    return cpus
+
+
+def read_cpuinfo(path='/proc/cpuinfo'):
+    with open(path) as f:
+        return parse_cpuinfo(f.read())
+
+
+def cpu_summary(cpus):
+    """Model name plus logical and physical core counts"""
+    model = next((c['model name'] for c in cpus if 'model name' in c), None)
+    if model is None:
+        # ARM kernels report "Hardware"/"Processor" instead of "model name"
+        model = next((c.get('Hardware') or c.get('Processor') for c in cpus
+                      if c.get('Hardware') or c.get('Processor')), None)
+    physical = {(c.get('physical id'), c.get('core id')) for c in cpus if 'core id' in c}
+    return {'model': model, 'logical': len(cpus), 'physical': len(physical) or len(cpus)}
+
+
+# ========================================
+# dmidecode
+# ========================================
+
+def parse_dmidecode(text):
+    """Records from ``dmidecode`` output in a single pass over its lines.
+
+    Multi-line properties (an indented list under ``Key:``) become lists.
+    """
+    records = []
+    record = None
+    list_key = None
+    for line in text.splitlines():
+        if line.startswith('Handle '):
+            # "Handle 0x0004, DMI type 17, 92 bytes"
+            parts = line.split(',')
+            dmi_type = parts[1].split()[-1] if len(parts) > 1 else ''
+            record = {'handle': parts[0].split()[1], 'type': int(dmi_type) if dmi_type.isdigit() else None,
+                      'name': None, 'fields': {}}
+            records.append(record)
+            list_key = None
+        elif record is None or not line.strip():
+            list_key = None
+        elif not line.startswith('\t'):
+            record['name'] = line.strip()
+        elif line.startswith('\t\t') and list_key:
+            record['fields'][list_key].append(line.strip())
+        else:
+            key, _, value = line.strip().partition(':')
+            value = value.strip()
+            if value:
+                record['fields'][key] = value
+                list_key = None
+            else:
+                record['fields'][key] = []
+                list_key = key
+    return records
+
+
+def read_dmidecode(dmi_type=17):
+    """Raw ``dmidecode -t TYPE`` output, via passwordless sudo when available"""
+    return run_first(['sudo', '-n', 'dmidecode', '-t', str(dmi_type)], ['dmidecode', '-t', str(dmi_type)])
+
+
+def _dmi_value(fields, key):
+    value = fields.get(key)
+    return None if not isinstance(value, str) or value.strip() in DMI_EMPTY else value.strip()
+
+
+def memory_devices(records):
+    """Populated DIMM slots from dmidecode records (type 17)"""
+    modules = []
+    for r in records:
+        if r['type'] != 17:
+            continue
+        f = r['fields']
+        part = _dmi_value(f, 'Part Number')
+        size = _dmi_value(f, 'Size')
+        if part is None and size is None:
+            continue
+        speed = _dmi_value(f, 'Speed')
+        configured = _dmi_value(f, 'Configured Memory Speed') or _dmi_value(f, 'Configured Clock Speed')
+        modules.append({
+            'locator': _dmi_value(f, 'Locator'),
+            'size': size,
+            'type': _dmi_value(f, 'Type'),
+            'manufacturer': _dmi_value(f, 'Manufacturer'),
+            'part': part,
+            'serial': _dmi_value(f, 'Serial Number'),
+            'speed_mts': int(speed.split()[0]) if speed and speed.split()[0].isdigit() else None,
+            'configured_mts': int(configured.split()[0]) if configured and configured.split()[0].isdigit() else None,
+        })
+    return modules
+
+
+# ========================================
+# sysfs power_supply
+# ========================================
+
+def _read_attr(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def read_supply(path):
+    """All attributes of one power_supply device.
+
+    The kernel's ``uevent`` file carries every property in one read; older
+    kernels that leave some out get the remaining attribute files read
+    individually, each opened and closed once.
+    """
+    props = {}
+    text = _read_attr(os.path.join(path, 'uevent'))
+    if text:
+        for line in text.splitlines():
+            key, sep, value = line.partition('=')
+            if sep and key.startswith('POWER_SUPPLY_'):
+                props[key[len('POWER_SUPPLY_'):].lower()] = value
+    if not props:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name not in ('uevent', 'power', 'device', 'subsystem'):
+                    value = _read_attr(entry.path)
+                    if value is not None:
+                        props[entry.name] = value
+    for attr in SUPPLY_EXTRA_ATTRS:
+        if attr not in props:
+            value = _read_attr(os.path.join(path, attr))
+            if value is not None:
+                props[attr] = value
+    props.setdefault('name', os.path.basename(path))
+    return props
+
+
+def read_power_supply(root=POWER_SUPPLY_ROOT):
+    """Every power_supply device under ``root``, sorted by name"""
+    try:
+        names = sorted(os.listdir(root))
+    except OSError:
+        return []
+    return [read_supply(os.path.join(root, name)) for name in names]
+
+
+def batteries(supplies):
+    return [s for s in supplies if s.get('type') == 'Battery' and s.get('present', '1') != '0']
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def battery_energy(supply):
+    """(now, full, design) of one battery in µWh, any of them None when missing.
+
+    Batteries that report charge_* (µAh) instead are converted with the
+    nominal voltage, so packs of either kind can be added up.
+    """
+    values = [to_int(supply.get(f'energy_{k}')) for k in ('now', 'full', 'full_design')]
+    if any(v is not None for v in values):
+        return tuple(values)
+    volts = to_int(supply.get('voltage_min_design')) or to_int(supply.get('voltage_now'))
+    charge = [to_int(supply.get(f'charge_{k}')) for k in ('now', 'full', 'full_design')]
+    if not volts:
+        return (None, None, None)
+    return tuple(None if c is None else c * volts // 1_000_000 for c in charge)
+
+
+# ========================================
+# sysfs net
+# ========================================
+
+def _uevent(path):
+    props = {}
+    for line in (_read_attr(path) or '').splitlines():
+        key, sep, value = line.partition('=')
+        if sep:
+            props[key] = value
+    return props
+
+
+def read_net_stats(name, root=NET_ROOT):
+    """{counter: int} from one interface's statistics/ directory"""
+    stats_dir = os.path.join(root, name, 'statistics')
+    stats = {}
+    for counter in NET_STATS:
+        value = to_int(_read_attr(os.path.join(stats_dir, counter)))
+        if value is not None:
+            stats[counter] = value
+    return stats
+
+
+def read_net_interface(path, stats=True):
+    """One network interface: address, state, link speed, driver, PCI IDs and counters.
+
+    Virtual interfaces (lo, bridges, tunnels) have no ``device`` link and so
+    no driver or PCI IDs; ``speed`` is None when the link is down or the
+    driver does not report it.
+    """
+    root, name = os.path.split(path)
+    props = _uevent(os.path.join(path, 'uevent'))
+    device = _uevent(os.path.join(path, 'device', 'uevent'))
+    speed = to_int(_read_attr(os.path.join(path, 'speed')))
+    return {
+        'name': name,
+        'mac': (_read_attr(os.path.join(path, 'address')) or '').upper() or None,
+        'state': _read_attr(os.path.join(path, 'operstate')),
+        'mtu': to_int(_read_attr(os.path.join(path, 'mtu'))),
+        'speed': speed if speed and speed > 0 else None,
+        'wireless': props.get('DEVTYPE') == 'wlan' or os.path.isdir(os.path.join(path, 'wireless')),
+        'virtual': not device,
+        'driver': device.get('DRIVER'),
+        'pci_id': device.get('PCI_ID', '').lower() or None,
+        'subsystem': device.get('PCI_SUBSYS_ID', '').lower() or None,
+        'stats': read_net_stats(name, root) if stats else {},
+    }
+
+
+def read_net_interfaces(root=NET_ROOT, stats=True):
+    """Every network interface under ``root``, sorted by name (``stats=False`` skips the counters)"""
+    try:
+        names = sorted(os.listdir(root))
+    except OSError:
+        return []
+    return [read_net_interface(os.path.join(root, name), stats) for name in names]
+
+
+def parse_ip_link(text):
+    """{interface: MAC} from ``ip link`` output (interfaces without a link/ether address left out)"""
+    macs, name = {}, None
+    for line in text.splitlines():
+        if line[:1].isdigit():
+            name = line.split(':', 2)[1].strip().split('@')[0]
+        elif name and line.strip().startswith('link/ether '):
+            macs[name] = line.split()[1].upper()
+    return macs
+
+
+def wireless_names(iwconfig_text):
+    """Interfaces ``iwconfig`` reports as 802.11"""
+    return [line.split()[0] for line in iwconfig_text.splitlines()
+            if line[:1].strip() and 'IEEE 802.11' in line]
+
+
+def system_vendor(root=DMI_ID_ROOT):
+    return _read_attr(os.path.join(root, 'sys_vendor'))
@@ -1,269 +1,446 @@
 import platform
 import os
-import subprocess
-import multiprocessing
-import time
 import datetime
 import webbrowser
-import base64
-from io import BytesIO
-import matplotlib.pyplot as plt
-import pygame
-import tkinter as tk
-from tkinter import ttk, messagebox
-import psutil
-import numpy as np
 import re
-import json
-
-# Initialize
-pygame.mixer.init()
+import queue
+import sqlite3
+import threading
+from laptopcheck_cmd import CommandError, run, new_scan
+from laptopcheck_inventory import get_inventory
+from laptopcheck_parsers import (
+    read_cpuinfo, cpu_summary, read_dmidecode, parse_dmidecode, memory_devices, read_power_supply, batteries, to_int,
+    battery_energy, read_net_interfaces, parse_ip_link, wireless_names, system_vendor,
+)
+from laptopcheck_model import (
+    Status, ScanResult, ProcessorResult, MemoryResult, MemTestResult, RamModule, RamSpdResult, BatteryResult,
+    BatteryTestResult,
+    WifiResult, NetworkResult, StorageResult, StorageHealthResult, CounterResult, EventLogResult, StressResult,
+    AudioResult, CpuBenchResult, KeyboardResult, Condition, describe,
+)
+from laptopcheck_db import FleetDB, DEFAULT_DB_PATH
+from laptopcheck_report import write_report
+from laptopcheck_probes import register, build_probes, ALL, print_import_profile
+from laptopcheck_journal import ScanJournal, run_checkpointed
+from laptopcheck_instrument import Instrument, slowest
+from laptopcheck_scoring import features, get_policy, score as score_features
+
+# Heavy modules (psutil, numpy, sounddevice, tkinter) are imported by the code
+# that needs them, so startup stays fast and headless boxes work.
 os_type = platform.system().lower()
 
+# Reuse windows for checkpointed results (seconds)
+HOUR, DAY = 3600, 86400
+
 # ========================================
 # 0. MISSING CORE FUNCTIONS (ADDED)
 # ========================================
 
+def _static_output(key, argv):
+    """Output of a command whose result only changes with the hardware (cached per boot)"""
+    return get_inventory().get(key, lambda: run(argv))
+
+@register('Processor', result=ProcessorResult, valid_for=DAY)
 def get_processor_info():
     """Get processor information"""
+    info = ProcessorResult(model=platform.processor(), architecture=platform.machine(), cores=os.cpu_count())
     try:
         if 'windows' in os_type:
-            output = subprocess.check_output('wmic cpu get name,numberofcores,numberoflogicalprocessors', shell=True).decode()
+            output = _static_output('wmic-cpu', ['wmic', 'cpu', 'get', 'name,numberofcores,numberoflogicalprocessors'])
             lines = [line.strip() for line in output.split('\n') if line.strip()]
-            return lines[1] if len(lines) > 1 else platform.processor()
+            if len(lines) > 1:
+                # Columns are padded with runs of spaces: "<Name>  <cores>  <threads>"
+                info.model = re.split(r'\s{2,}', lines[1])[0]
         elif 'linux' in os_type:
-            with open('/proc/cpuinfo', 'r') as f:
-                for line in f:
-                    if 'model name' in line.lower():
-                        return line.split(':')[1].strip()
-            return platform.processor()
-        else:
-            return platform.processor()
-    except:
-        return platform.processor()
+            info.model = get_inventory().get('cpu-model', lambda: cpu_summary(read_cpuinfo())['model']) or info.model
+    except Exception as e:
+        info.status, info.error = Status.WARN, f"{type(e).__name__}: {e}"
+    return info
 
+@register('RAM', requires=('psutil',), result=MemoryResult, valid_for=DAY)
 def get_ram_info():
     """Get RAM information"""
+    import psutil
+    total_gb = psutil.virtual_memory().total / (1024**3)
     try:
         if 'windows' in os_type:
-            output = subprocess.check_output('wmic memorychip get capacity', shell=True).decode()
+            output = _static_output('wmic-memorychip', ['wmic', 'memorychip', 'get', 'capacity'])
             sizes = [int(size) for size in re.findall(r'\d+', output) if int(size) > 0]
-            total_gb = sum(sizes) / (1024**3) if sizes else psutil.virtual_memory().total / (1024**3)
-            return f"{total_gb:.1f} GB"
-        else:
-            total_gb = psutil.virtual_memory().total / (1024**3)
-            return f"{total_gb:.1f} GB"
-    except:
-        total_gb = psutil.virtual_memory().total / (1024**3)
-        return f"{total_gb:.1f} GB"
-
-def test_speakers():
-    """Test speaker functionality"""
-    try:
-        # Try to play a simple beep sound
-        pygame.mixer.init()
-        sample_rate = 22050
-        duration = 500  # milliseconds
-        frequency = 440  # Hz (A note)
-        
-        # Generate a simple sine wave
-        frames = int(duration * sample_rate / 1000)
-        arr = np.sin(2 * np.pi * frequency * np.linspace(0, duration/1000, frames))
-        
-        # Convert to 16-bit PCM format
-        arr = (arr * 32767).astype(np.int16)
-        
-        # Create pygame sound and play
-        sound = pygame.sndarray.make_sound(arr)
-        sound.play()
-        pygame.time.wait(duration)
-        
-        return "Working - beep played"
+            if sizes:
+                total_gb = sum(sizes) / (1024**3)
     except Exception as e:
-        return f"Test failed: {str(e)}"
+        return MemoryResult(status=Status.WARN, error=f"{type(e).__name__}: {e}", total_gb=round(total_gb, 1))
+    return MemoryResult(total_gb=round(total_gb, 1))
+
+# After Stress: both saturate the machine, and either distorts the other's figures
+@register('Memory Test', requires=('psutil', 'numpy'), timeout=600, result=MemTestResult, valid_for=DAY,
+          after=('Stress',))
+def run_memory_test(fraction=0.25):
+    """Pattern write/verify over ``fraction`` of available RAM, one worker per NUMA node or core"""
+    from laptopcheck_memtest import run_memtest
+    r = run_memtest(fraction)
+    return MemTestResult(
+        status=Status.FAIL if r['errors'] else Status.OK,
+        tested_gb=round(r['bytes'] / 1024**3, 2),
+        workers=r['workers'],
+        numa_nodes=r['numa_nodes'],
+        passes=len(r['passes']),
+        duration=r['duration'],
+        write_bw=round(r['write_gbs'], 2) if r['write_gbs'] else None,
+        read_bw=round(r['read_gbs'], 2) if r['read_gbs'] else None,
+        errors=r['errors'],
+        bit_errors=r['bit_errors'],
+        samples=r['samples'],
+    )
+
+@register('Speakers', requires=('sounddevice', 'numpy'), interactive=True, result=AudioResult, valid_for=DAY,
+          after=('Stress', 'Memory Test', 'CPU Bench'))
+def test_speakers(channels=2):
+    """Loopback test: tones and sweeps on each speaker, recorded by the microphone and graded by FFT"""
+    from laptopcheck_audio import run_loopback
+    return audio_result(run_loopback(channels))
+
+def audio_result(r):
+    """AudioResult of a graded loopback recording (laptopcheck_audio.analyze)"""
+    live = [c for c in r['channels'] if not c['dead']]
+    info = AudioResult(
+        channels=len(r['channels']),
+        dead=', '.join(c['name'] for c in r['channels'] if c['dead']) or None,
+        snr=round(min(c['snr_db'] for c in r['channels']), 1),
+        thd=round(max(c['thd_pct'] for c in live), 1) if live else None,
+        deviation=round(max(c['deviation_db'] or 0 for c in live), 1) if live else None,
+        imbalance=round(r['imbalance_db'], 1) if r['imbalance_db'] is not None else None,
+        latency=round(r['latency_ms'], 1),
+        response={c['name']: c['response_db'] for c in r['channels']},
+    )
+    if r['problems']:
+        info.status = Status.FAIL if r['dead'] else Status.WARN
+        info.error = '; '.join(r['problems'])
+    return info
 
 # ========================================
 # 1. FORENSIC & RARE CHECKS
 # ========================================
 
-def get_bios_flash_count():
-    try:
-        if 'windows' in os_type:
-            log = subprocess.check_output('wevtutil qe System /q:"*[System[(EventID=1796)]]" /f:text', shell=True).decode()
-            return len(re.findall(r"EventID=1796", log))
-        return "N/A"
-    except:
-        return "N/A"
-
-def get_lid_open_count():
-    try:
-        if 'windows' in os_type:
-            log = subprocess.check_output('wevtutil qe Microsoft-Windows-Kernel-Power/Thermal-Policy /c:1 /f:text', shell=True).decode()
-            return "Estimated from power logs"
-        return "N/A"
-    except:
-        return "N/A"
-
+@register('Event Log', timeout=300, result=EventLogResult, valid_for=DAY)
+def get_event_log():
+    """Firmware, lid, suspend, crash and thermal events from the system log (new records only)"""
+    from laptopcheck_eventlog import scan_system
+    r = scan_system(os_type)
+    if r is None:
+        return EventLogResult(status=Status.UNAVAILABLE)
+    if not r['records']:
+        # Nothing parsed means nothing known: the counters stay empty rather than read as "0 events"
+        return EventLogResult(status=Status.UNAVAILABLE, source=r['source'], new_records=r['new'],
+                              error="No readable log records (needs admin or the systemd-journal group)")
+    counts = r['counts']
+    return EventLogResult(
+        source=r['source'],
+        since=r['first'],
+        firmware_updates=counts['firmware_update'],
+        lid_opens=counts['lid_open'],
+        suspends=counts['suspend'],
+        unexpected_shutdowns=counts['unexpected_shutdown'],
+        thermal_events=counts['thermal'],
+        new_records=r['new'],
+        timeline=r['timeline'],
+    )
+
+def _last_event(log, category):
+    events = log.timeline.get(category) or []
+    return f"last {events[-1][0]}: {events[-1][1]}" if events else None
+
+@register('BIOS Flash', deps=('Event Log',), result=CounterResult, valid_for=DAY)
+def get_bios_flash_count(results):
+    log = results['Event Log']
+    # WARN still means records were parsed; an unreadable log comes through as UNAVAILABLE
+    if log.status not in (Status.OK, Status.WARN):
+        return CounterResult(status=log.status, error=log.error)
+    return CounterResult(count=log.firmware_updates, note=_last_event(log, 'firmware_update'))
+
+@register('Lid Opens', deps=('Event Log',), result=CounterResult, valid_for=DAY)
+def get_lid_open_count(results):
+    log = results['Event Log']
+    # WARN still means records were parsed; an unreadable log comes through as UNAVAILABLE
+    if log.status not in (Status.OK, Status.WARN):
+        return CounterResult(status=log.status, error=log.error)
+    note = f"{log.suspends} suspends since {log.since}" if log.since else None
+    return CounterResult(count=log.lid_opens, note=note)
+
+@register('RAM SPD', result=RamSpdResult, valid_for=DAY)
 def get_ram_spd():
-    try:
-        if 'linux' in os_type:
-            cmd = "sudo -n dmidecode -t 17 2>/dev/null || dmidecode -t 17"
-            out = subprocess.check_output(cmd, shell=True).decode()
-            modules = []
-            for block in out.split("Memory Device")[1:]:
-                serial = re.search(r"Serial Number: (.+)", block)
-                part = re.search(r"Part Number: (.+)", block)
-                speed = re.search(r"Speed: (.+)", block)
-                if part and "NO DIMM" not in part.group(1):
-                    modules.append({
-                        "part": part.group(1).strip(),
-                        "serial": serial.group(1).strip() if serial else "N/A",
-                        "speed": speed.group(1).strip() if speed else "N/A"
-                    })
-            return modules
-        return []
-    except:
-        return []
-
+    if 'linux' not in os_type:
+        return RamSpdResult(status=Status.UNAVAILABLE)
+    out = get_inventory().get('dmidecode-17', read_dmidecode)
+    modules = [RamModule(part=m['part'], serial=m['serial'], speed_mts=m['speed_mts'])
+               for m in memory_devices(parse_dmidecode(out)) if m['part']]
+    return RamSpdResult(modules=modules)
+
+@register('WiFi MAC', result=WifiResult, valid_for=DAY)
 def get_wifi_card():
-    try:
-        if 'windows' in os_type:
-            out = subprocess.check_output('netsh wlan show interfaces', shell=True).decode()
-            mac = re.search(r"Physical address[\s:]+([0-9A-F:]{17})", out)
-            return mac.group(1) if mac else "N/A"
-        elif 'linux' in os_type:
-            out = subprocess.check_output('iwconfig 2>/dev/null || ip link', shell=True).decode()
-            mac = re.search(r"ether ([0-9a-f:]{17})", out)
-            return mac.group(1).upper() if mac else "N/A"
-        return "N/A"
-    except:
-        return "N/A"
-
+    """MAC and PCI identity of the wireless card, and whether it came out of another maker's laptop"""
+    if 'windows' in os_type:
+        out = run(['netsh', 'wlan', 'show', 'interfaces'])
+        mac = re.search(r"Physical address[\s:]+([0-9A-F:]{17})", out)
+        return WifiResult(mac=mac.group(1)) if mac else WifiResult(status=Status.UNAVAILABLE)
+    elif 'linux' in os_type:
+        card = next((i for i in read_net_interfaces(stats=False) if i['wireless']), None)
+        if card is not None:
+            from laptopcheck_network import card_replaced
+            return WifiResult(mac=card['mac'], interface=card['name'], driver=card['driver'], pci_id=card['pci_id'],
+                              subsystem=card['subsystem'], replaced=card_replaced(card['subsystem'], system_vendor()))
+        # No sysfs (containers, old kernels): the interface iwconfig calls 802.11, its MAC from ip link
+        try:
+            names = wireless_names(run(['iwconfig']))
+        except (OSError, CommandError):
+            names = []
+        macs = parse_ip_link(run(['ip', 'link']))
+        name = next((n for n in names if n in macs), None) or next((n for n in macs if n.startswith('wl')), None)
+        return WifiResult(mac=macs[name], interface=name) if name else WifiResult(status=Status.UNAVAILABLE)
+    return WifiResult(status=Status.UNAVAILABLE)
+
+@register('Storage', result=StorageResult, valid_for=DAY)
 def get_storage_serial():
-    try:
-        if 'windows' in os_type:
-            out = subprocess.check_output('wmic diskdrive get serialnumber,model', shell=True).decode()
-            lines = [l.strip() for l in out.splitlines() if l.strip() and "SerialNumber" not in l]
-            return lines[0] if lines else "N/A"
-        elif 'linux' in os_type:
-            out = subprocess.check_output('lsblk -o NAME,SERIAL,MODEL -d -n', shell=True).decode()
-            return out.splitlines()[0] if out else "N/A"
-        return "N/A"
-    except:
-        return "N/A"
+    if 'windows' in os_type:
+        out = _static_output('wmic-diskdrive', ['wmic', 'diskdrive', 'get', 'serialnumber,model'])
+        lines = [l.strip() for l in out.splitlines() if l.strip() and "SerialNumber" not in l]
+        if not lines:
+            return StorageResult(status=Status.UNAVAILABLE)
+        # wmic pads columns: "<Model>  <SerialNumber>"
+        model, serial = (re.split(r'\s{2,}', lines[0], maxsplit=1) + [''])[:2]
+        return StorageResult(model=model or None, serial=serial or None)
+    elif 'linux' in os_type:
+        from laptopcheck_storage import parse_lsblk, disk_for_path
+        out = _static_output('lsblk', ['lsblk', '-o', 'NAME,SERIAL,MODEL', '-d', '-n', '-P'])
+        rows = parse_lsblk(out)
+        if rows:
+            # The disk holding the OS identifies the machine; fall back to the first real one
+            system = disk_for_path('/')
+            row = next((r for r in rows if r['NAME'] == system), rows[0])
+            return StorageResult(name=row.get('NAME') or None, serial=row.get('SERIAL') or None,
+                                 model=row.get('MODEL') or None)
+    return StorageResult(status=Status.UNAVAILABLE)
+
+# The sequential-read figure is only meaningful on an otherwise idle machine
+@register('Storage Health', requires=('numpy',), timeout=180, result=StorageHealthResult, valid_for=6 * HOUR,
+          after=('Stress', 'Memory Test'))
+def get_storage_health(size_mb=256, seconds=2.0):
+    """SMART/NVMe wear and a bounded sequential + random 4K benchmark (size_mb=0 skips it)"""
+    from laptopcheck_storage import storage_health
+    r = storage_health(size_mb=size_mb, seconds=seconds)
+    health, bench = r['health'] or {}, r['bench']
+    info = StorageHealthResult(
+        device=health.get('device') or (f"/dev/{r['disk']}" if r['disk'] else None),
+        protocol=health.get('protocol'),
+        smart_passed=health.get('passed'),
+        wear=health.get('wear'),
+        spare=health.get('spare'),
+        power_on_hours=health.get('power_on_hours'),
+        media_errors=health.get('media_errors'),
+        reallocated=health.get('reallocated'),
+        written_tb=health.get('written_tb'),
+        smart=health,
+    )
+    if bench:
+        seq, rand = bench['sequential'], bench['random']
+        info.seq_read, info.seq_write = round(seq['read_mbs'], 1), round(seq['write_mbs'], 1)
+        info.iops_qd1 = rand.get('qd1', {}).get('iops')
+        info.iops_peak = max((v['iops'] for v in rand.values()), default=None)
+        info.latency_p99 = rand.get('qd1', {}).get('p99_us')
+        info.direct_io = bench['direct']
+        info.random = rand
+    if not health:
+        info.status, info.error = Status.WARN, "No SMART data (needs smartctl or nvme-cli, usually as root)"
+    return info
 
 # ========================================
 # 2. ENHANCED DIAGNOSTICS
 # ========================================
 
+@register('Battery', requires=('psutil',), result=BatteryResult, valid_for=HOUR / 4)
 def get_battery_info_pro():
-    info = {}
-    try:
-        if 'linux' in os_type:
-            paths = ['/sys/class/power_supply/BAT0', '/sys/class/power_supply/BAT1']
-            for p in paths:
-                if os.path.exists(p):
-                    capacity = int(open(f"{p}/capacity").read())
-                    status = open(f"{p}/status").read().strip()
-                    cycle = open(f"{p}/cycle_count").read().strip() if os.path.exists(f"{p}/cycle_count") else "N/A"
-                    design = int(open(f"{p}/charge_full_design").read()) if os.path.exists(f"{p}/charge_full_design") else 0
-                    full = int(open(f"{p}/charge_full").read()) if os.path.exists(f"{p}/charge_full") else 0
-                    manuf = open(f"{p}/manufacturer").read().strip() if os.path.exists(f"{p}/manufacturer") else "N/A"
-                    date = open(f"{p}/manufacture_date").read().strip() if os.path.exists(f"{p}/manufacture_date") else "N/A"
-                    health = (full / design * 100) if design > 0 else 0
-                    info = {
-                        "Health": f"{health:.1f}%",
-                        "Charge": f"{capacity}%",
-                        "Cycle": cycle,
-                        "Manufacturer": manuf,
-                        "MFD": date
-                    }
-                    break
-        # Add Windows/macOS later
-        if not info:  # Fallback for Windows or if Linux battery not found
-            battery = psutil.sensors_battery()
-            if battery:
-                info = {
-                    "Health": "N/A",
-                    "Charge": f"{battery.percent}%",
-                    "Cycle": "N/A",
-                    "Manufacturer": "N/A",
-                    "MFD": "N/A"
-                }
-        return info
-    except:
-        return {"Error": "Battery not found"}
-
-def stress_test_pro(duration=30):
-    try:
-        temps = psutil.sensors_temperatures()
-        start_temp = temps.get('coretemp', [{}])[0].current if 'coretemp' in temps else None
-        start_rpm = psutil.sensors_fans().get('fan', [{}])[0].current if 'fan' in psutil.sensors_fans() else None
-
-        def worker():
-            [x*x for x in range(10000)]
-
-        procs = [multiprocessing.Process(target=worker) for _ in range(os.cpu_count())]
-        for p in procs: p.start()
-        for p in procs: p.join()
-
-        end_temp = temps.get('coretemp', [{}])[0].current if 'coretemp' in temps else None
-        end_rpm = psutil.sensors_fans().get('fan', [{}])[0].current if 'fan' in psutil.sensors_fans() else None
-
-        delta_t = f"{end_temp - start_temp:.1f}°C" if start_temp and end_temp else "N/A"
-        rpm_drop = f"{start_rpm - end_rpm:.0f} RPM" if start_rpm and end_rpm else "N/A"
-        return {"Delta Temp": delta_t, "Fan Drop": rpm_drop}
-    except:
-        return {"Error": "psutil sensors not available"}
+    import psutil
+    if 'linux' in os_type:
+        found = batteries(read_power_supply())
+        if found:
+            # Dual-battery machines are reported as one pack: capacities add up
+            cycles = [c for c in (to_int(b.get('cycle_count')) for b in found) if c is not None]
+            info = BatteryResult(cycles=max(cycles) if cycles else None,
+                                 manufacturer=found[0].get('manufacturer'),
+                                 manufacture_date=found[0].get('manufacture_date'),
+                                 batteries=len(found))
+            # energy_* (µWh) or charge_* (µAh, converted at nominal voltage)
+            now, full, design = zip(*(battery_energy(b) for b in found))
+            if all(design) and None not in full:
+                info.health = round(sum(full) / sum(design) * 100, 1)
+                info.design_capacity, info.full_capacity = sum(design) / 1000, sum(full) / 1000
+                if None not in now and sum(full):
+                    info.charge = round(sum(now) / sum(full) * 100, 1)
+            if info.charge is None:
+                levels = [to_int(b.get('capacity')) for b in found]
+                info.charge = sum(levels) / len(levels) if None not in levels else None
+            return info
+    # Add Windows/macOS later
+    battery = psutil.sensors_battery()  # Fallback for Windows or if Linux battery not found
+    if battery:
+        return BatteryResult(charge=float(battery.percent), batteries=1)
+    return BatteryResult(status=Status.UNAVAILABLE)
+
+@register('Battery Test', requires=('psutil', 'numpy'), timeout=4 * HOUR, result=BatteryTestResult,
+          valid_for=6 * HOUR, on_demand=True)
+def run_battery_test_pro(idle=300, load=300, kernel='int'):
+    """Discharge test: idle then stress-engine load, fitted drain and runtime (on battery power only)"""
+    from laptopcheck_battery import run_battery_test
+    if 'linux' not in os_type:
+        return BatteryTestResult(status=Status.UNAVAILABLE)
+    r = run_battery_test(phases=(('idle', idle), ('load', load)), kernel=kernel)
+    if r is None:
+        return BatteryTestResult(status=Status.UNAVAILABLE)
+    idle_p, load_p = r['phases'].get('idle', {}), r['phases'].get('load', {})
+    info = BatteryTestResult(
+        batteries=len(r['batteries']),
+        duration=r['duration'],
+        energy=round(r['energy_wh'], 2),
+        full_energy=round(r['full_wh'], 2),
+        used=round(r['used_wh'], 2),
+        idle_drain=idle_p.get('drain_w'),
+        load_drain=load_p.get('drain_w'),
+        idle_runtime=idle_p.get('runtime_h'),
+        load_runtime=load_p.get('runtime_h'),
+        full_idle_runtime=idle_p.get('full_runtime_h'),
+        full_load_runtime=load_p.get('full_runtime_h'),
+        phases=r['phases'],
+        series=r['series'],
+    )
+    if not r['discharging']:
+        info.status, info.error = Status.WARN, "Not discharging: unplug AC power for a meaningful result"
+    return info
+
+@register('Stress', requires=('psutil', 'numpy'), timeout=120, result=StressResult, valid_for=6 * HOUR)
+def stress_test_pro(duration=30, kernel='int'):
+    from laptopcheck_stress import run_stress
+    r = run_stress(duration, kernel)
+    temp, fan = r['stats']['cpu_temp'], r['stats']['fan_rpm']
+    return StressResult(
+        kernel=kernel,
+        workers=r['workers'],
+        duration=r['duration'],
+        throughput=r['throughput'],
+        throughput_unit=r['unit'],
+        throttle_onset=r['throttle_onset'],
+        temp_delta=temp['max'] - temp['first'] if temp['count'] else None,
+        peak_temp=temp['max'],
+        steady_temp=temp['steady'],
+        fan_drop=fan['first'] - fan['steady'] if fan['count'] else None,
+        stats=r['stats'],
+        series=r['series'],
+    )
+
+@register('CPU Bench', requires=('numpy',), deps=('Processor',), timeout=180, result=CpuBenchResult,
+          valid_for=6 * HOUR, after=('Stress', 'Memory Test', 'Storage Health', 'Battery Test'))
+def run_cpu_bench(results, seconds=1.0):
+    """Integer and NumPy scores on one and all cores, compared with other units of the same CPU model.
+
+    The comparison needs a shared baseline ($LAPTOPCHECK_CPU_BASELINE); the note says when there was none.
+    """
+    from laptopcheck_cpubench import SLOW_RELATIVE, bench_and_compare
+    r = bench_and_compare(getattr(results['Processor'], 'model', None), seconds=seconds)
+    scores = {metric: round(value, 2) for metric, value in r['scores'].items()}
+    info = CpuBenchResult(
+        model=r['model'],
+        percentile=round(r['percentile']) if r['percentile'] is not None else None,
+        relative=round(r['relative'], 1) if r['relative'] is not None else None,
+        peers=r['peers'] if r['comparison'] else None,
+        note=r['note'],
+        comparison=r['comparison'],
+        **scores,
+    )
+    if info.relative is not None and info.relative < SLOW_RELATIVE:
+        info.status = Status.WARN
+        info.error = f"{info.relative:.0f}% of the median of {info.peers} other units (throttling or cooling?)"
+    return info
+
+@register('Network', timeout=120, result=NetworkResult, valid_for=HOUR,
+          after=('Stress', 'Memory Test', 'CPU Bench'))
+def run_network_bench(server=None, seconds=1.0):
+    """Interfaces from sysfs, then throughput, latency and error deltas against the bench server (or loopback)"""
+    from laptopcheck_network import bench
+    r = bench(server, seconds=seconds)
+    tested = [t for t in r['tests'].values() if 'error' not in t]
+    if not tested:
+        return NetworkResult(status=Status.FAIL, interfaces=len(r['interfaces']), server=r['server'],
+                             error='; '.join(t['error'] for t in r['tests'].values()) or "Nothing to test",
+                             details=r)
+    first = tested[0]
+    speeds = {i['name']: i['speed'] for i in r['interfaces']}
+    info = NetworkResult(
+        interfaces=len(r['interfaces']),
+        server=r['server'],
+        interface=first['interface'],
+        link_speed=speeds.get(first['interface']),
+        upload=first['upload_mbps'],
+        download=first['download_mbps'],
+        latency_p50=round(first['latency_ms']['p50'] * 1000),
+        latency_p99=round(first['latency_ms']['p99'] * 1000),
+        new_errors=sum(sum(t['error_deltas'].values()) for t in tested),
+        details=r,
+    )
+    problems = [f"{t['interface']}: " + ', '.join(f"{v} {c}" for c, v in t['error_deltas'].items())
+                for t in tested if t['error_deltas']]
+    problems += [f"{name}: {t['error']}" for name, t in r['tests'].items() if 'error' in t]
+    if problems:
+        info.status, info.error = Status.WARN, '; '.join(problems)
+    return info
+
+# The window gives up a little before the scheduler would abandon the probe,
+# so no thread is left waiting on a test nobody finishes
+KEYBOARD_TIMEOUT = 570
+
+
+@register('Keyboard', interactive=True, timeout=KEYBOARD_TIMEOUT + 30, result=KeyboardResult, valid_for=DAY)
+def test_keyboard_matrix(ui=None, timeout=KEYBOARD_TIMEOUT):
+    """Every key of the layout pressed once: chatter, stuck keys, slow release and input delay.
+
+    ``ui(timeout)`` runs the test window on the GUI thread and returns the
+    analysis, or None if it was not finished in time; without it the test
+    opens a window of its own.
+    """
+    from laptopcheck_keyboard import run_keyboard_test
+    r = ui(timeout) if ui is not None else run_keyboard_test(timeout=timeout)
+    if r is None:
+        return KeyboardResult(status=Status.UNAVAILABLE, error="Keyboard test closed or not finished in time")
+    info = KeyboardResult(
+        tested=r['tested'],
+        expected=r['expected'],
+        missing=', '.join(r['missing']) or None,
+        chatter=', '.join(r['chatter']) or None,
+        stuck=', '.join(r['stuck']) or None,
+        slow=', '.join(r['slow']) or None,
+        hold=r['hold_ms'],
+        delay_p95=r['delay_p95_ms'],
+        keys=r['keys'],
+    )
+    if r['chatter'] or r['stuck']:
+        info.status = Status.FAIL
+        info.error = '; '.join(f"{label}: {', '.join(r[name])}" for name, label in
+                               (('chatter', "Chatter"), ('stuck', "Stuck")) if r[name])
+    elif r['missing'] or r['slow']:
+        info.status = Status.WARN
+        info.error = '; '.join(f"{label}: {', '.join(r[name])}" for name, label in
+                               (('missing', "Not pressed"), ('slow', "Slow release")) if r[name])
+    return info
 
 # ========================================
 # 3. CONDITION SCORING AI
 # ========================================
 
+@register('Condition', deps=ALL, result=Condition)
 def calculate_condition_score(results):
-    score = 100
-    reasons = []
-
-    # RAM upgrade
-    if len(results.get('RAM SPD', [])) > 1:
-        score -= 5
-        reasons.append("RAM upgraded (mixed modules)")
-
-    # WiFi swap
-    if results.get('WiFi MAC', 'N/A') != "N/A":
-        score -= 10
-        reasons.append("WiFi card replaced")
-
-    # Battery health
-    battery_health = results['Battery'].get('Health', '0')
-    if battery_health != 'N/A' and battery_health != 'Error':
-        try:
-            health = float(battery_health.replace('%', ''))
-            if health < 80: 
-                score -= 15
-                reasons.append("Battery health poor")
-            elif health < 90: 
-                score -= 5
-                reasons.append("Battery health degraded")
-        except ValueError:
-            pass
-
-    # Thermal
-    if 'Delta Temp' in results['Stress']:
-        delta_str = results['Stress']['Delta Temp']
-        if delta_str != 'N/A':
-            try:
-                delta = float(delta_str.replace('°C', ''))
-                if delta > 25: 
-                    score -= 10
-                    reasons.append("High thermal delta under stress")
-            except ValueError:
-                pass
-
-    # Final
-    grade = "GOOD" if score >= 80 else "FAIR" if score >= 60 else "POOR" if score >= 40 else "AVOID"
-    color = "good" if score >= 80 else "warn" if score >= 60 else "bad"
-    return {"score": score, "grade": grade, "color": color, "reasons": reasons}
+    """Deductions from the scoring rule table (see laptopcheck_scoring.py)"""
+    policy = get_policy()
+    score, grade, color, fired = score_features(policy, features(results))
+    return Condition(score=score, grade=grade, color=color, reasons=[reason for _, reason in fired],
+                     rules=[rule for rule, _ in fired], policy=policy.get('version'))
 
 # ========================================
 # 4. GUI + REPORT
@@ -271,11 +448,14 @@ def calculate_condition_score(results):
 
 class LaptopCheckPro:
     def __init__(self, root):
+        import tkinter as tk
+        from tkinter import ttk
         self.root = root
         self.root.title("LaptopCheck AI Pro")
         self.root.geometry("800x600")
         self.root.configure(bg='#1a1a1a')
         self.results = {}
+        self.scan = None
 
         style = ttk.Style()
         style.theme_use('clam')
@@ -299,87 +479,93 @@ class LaptopCheckPro:
         self.text.pack(fill='both', expand=True, pady=10)
 
     def log(self, msg):
+        import tkinter as tk
         self.text.insert(tk.END, msg + "\n")
         self.text.see(tk.END)
 
     def run_scan(self):
         self.log("Starting forensic scan...")
         self.results = {}
-
-        self.results['Processor'] = get_processor_info()
-        self.results['RAM'] = get_ram_info()
-        self.results['RAM SPD'] = get_ram_spd()
-        self.results['Battery'] = get_battery_info_pro()
-        self.results['WiFi MAC'] = get_wifi_card()
-        self.results['Storage'] = get_storage_serial()
-        self.results['BIOS Flash'] = get_bios_flash_count()
-        self.results['Lid Opens'] = get_lid_open_count()
-        self.results['Stress'] = stress_test_pro()
-        self.results['Speakers'] = test_speakers()
-        self.results['Keyboard'] = "User confirmed"
-
-        self.results['Condition'] = calculate_condition_score(self.results)
-
-        self.log("\nScan Complete!\n")
-        for k, v in self.results.items():
-            self.log(f"{k}: {json.dumps(v, indent=2)}")
-        self.report_btn['state'] = 'normal'
+        self.scan = None
+        self.run_btn['state'] = 'disabled'
+        self.report_btn['state'] = 'disabled'
+        self.scan_queue = queue.Queue()
+        threading.Thread(target=self._scan_worker, daemon=True).start()
+        self.root.after(100, self._poll_scan)
+
+    def _scan_worker(self):
+        new_scan()
+        started = datetime.datetime.now().isoformat(timespec='seconds')
+        try:
+            # Checkpointed: closing the window mid-scan keeps what already finished
+            instrument = Instrument()
+            results, carried = run_checkpointed(
+                instrument.wrap(build_probes(options={'Keyboard': {'ui': self._keyboard_ui}})), ScanJournal(),
+                on_result=lambda name, value: self.scan_queue.put((name, value)))
+            timings = instrument.finish(results)
+            if carried:
+                self.scan_queue.put(('Checkpoint', f"Reused from interrupted scan: {', '.join(carried)}"))
+            scan = ScanResult(hostname=platform.node(), started=started,
+                              finished=datetime.datetime.now().isoformat(timespec='seconds'),
+                              condition=results.pop('Condition', None), probes=results, timings=timings)
+            self.scan = scan
+            try:
+                with FleetDB(DEFAULT_DB_PATH) as db:
+                    db.add_scan(scan)
+            except sqlite3.Error as e:
+                self.scan_queue.put(('Database', f"Scan not saved: {e}"))
+        finally:
+            self.scan_queue.put(None)
+
+    def _keyboard_ui(self, timeout):
+        """Show the keyboard test on the Tk thread; wait up to ``timeout`` for its analysis (scan thread)"""
+        from laptopcheck_keyboard import KeyboardTest
+        reply, window = queue.Queue(), []
+        self.scan_queue.put(lambda: window.append(KeyboardTest(self.root, reply.put)))
+        try:
+            return reply.get(timeout=timeout)
+        except queue.Empty:
+            def close():
+                # On the Tk thread; the late analysis has nobody waiting for it
+                for test in window:
+                    test.on_done = None
+                    test.finish()
+
+            self.scan_queue.put(close)
+            return None
+
+    def _poll_scan(self):
+        # Tk is not thread-safe: results are handed over through the queue, and
+        # probes that need a window queue a callable to run here
+        while True:
+            try:
+                item = self.scan_queue.get_nowait()
+            except queue.Empty:
+                self.root.after(100, self._poll_scan)
+                return
+            if item is None:
+                break
+            if callable(item):
+                item()
+                continue
+            name, value = item
+            self.results[name] = value
+            self.log(describe(name, value))
+
+        self.log("\nScan Complete!")
+        if self.scan is not None and self.scan.timings:
+            slow = ', '.join(f"{p['name']} {p['wall']:.1f}s" for p in slowest(self.scan.timings, 3))
+            self.log(f"Took {self.scan.timings['wall']:.1f}s; slowest: {slow}")
+        self.log("")
+        self.run_btn['state'] = 'normal'
+        condition = self.results.get('Condition')
+        if self.scan is not None and condition is not None and condition.status is Status.OK:
+            self.report_btn['state'] = 'normal'
 
     def generate_report(self):
-        score = self.results['Condition']
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-          <title>LaptopCheck AI Pro Report</title>
-          <style>
-            body {{ font-family: 'Segoe UI', sans-serif; margin: 40px; background: #f4f4f4; }}
-            .card {{ background: white; padding: 25px; border-radius: 15px; box-shadow: 0 6px 20px rgba(0,0,0,0.1); margin-bottom: 20px; }}
-            h1 {{ color: #2c3e50; text-align: center; }}
-            .score {{ font-size: 2em; text-align: center; padding: 20px; border-radius: 15px; }}
-            .good {{ background: #d5efda; color: #27ae60; }}
-            .warn {{ background: #fdf3d7; color: #e67e22; }}
-            .bad {{ background: #fce3e3; color: #c0392b; }}
-            ul {{ line-height: 1.8; }}
-            @media print {{ body {{ background: white; }} }}
-          </style>
-        </head>
-        <body>
-          <h1>LaptopCheck AI Pro</h1>
-          <p style="text-align:center"><strong>{datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}</strong></p>
-
-          <div class="card score {score['color']}">
-            <strong>Overall Condition: {score['grade']} ({score['score']}/100)</strong>
-          </div>
-
-          <div class="card">
-            <h2>Hardware Authenticity</h2>
-            <ul>
-              <li><strong>RAM:</strong> { 'UPGRADED' if len(self.results['RAM SPD']) > 1 else 'Original' }</li>
-              <li><strong>WiFi:</strong> { 'SWAPPED' if self.results['WiFi MAC'] != 'N/A' else 'Original' }</li>
-              <li><strong>Storage:</strong> {self.results['Storage']}</li>
-            </ul>
-          </div>
-
-          <div class="card">
-            <h2>Physical Condition</h2>
-            <ul>
-              <li><strong>Battery Health:</strong> {self.results['Battery'].get('Health', 'N/A')}</li>
-              <li><strong>Thermal Delta:</strong> {self.results['Stress'].get('Delta Temp', 'N/A')}</li>
-              <li><strong>Fan Dust:</strong> {self.results['Stress'].get('Fan Drop', 'N/A')}</li>
-            </ul>
-          </div>
-
-          <p style="text-align:center; margin-top:40px;">
-            <button onclick="window.print()" style="padding:12px 30px; font-size:1.1em; background:#00d4ff; color:white; border:none; border-radius:8px; cursor:pointer;">
-              Print / Save as PDF
-            </button>
-          </p>
-        </body>
-        </html>
-        """
-        with open("LaptopCheck_AI_Pro_Report.html", "w") as f:
-            f.write(html)
+        from tkinter import messagebox
+        with open("LaptopCheck_AI_Pro_Report.html", "w", encoding="utf-8") as f:
+            write_report(self.scan, f)
         webbrowser.open("LaptopCheck_AI_Pro_Report.html")
         messagebox.showinfo("Success", "Pro Report Generated!")
 
@@ -387,7 +573,21 @@ class LaptopCheckPro:
 # 5. RUN
 # ========================================
 
-if __name__ == "__main__":
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="LaptopCheck AI Pro")
+    parser.add_argument('--import-profile', action='store_true',
+                        help="report per-module import time and a startup benchmark, then exit")
+    args = parser.parse_args(argv)
+    if args.import_profile:
+        print_import_profile()
+        return
+
+    import tkinter as tk
     root = tk.Tk()
     app = LaptopCheckPro(root)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
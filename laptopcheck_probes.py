@@ -0,0 +1,199 @@
+"""Pluggable probe registry with lazily imported dependencies.
+
+Each probe declares the third-party modules it needs. Nothing heavy is
+imported until the probe actually runs, so the app starts fast and a box
+without an audio device or a display can still run everything else.
+"""
+import functools
+import importlib
+import importlib.util
+import statistics
+import subprocess
+import sys
+
+from laptopcheck_model import Result, Status
+from laptopcheck_scheduler import Probe, DEFAULT_TIMEOUT
+
+# Use as ``deps=ALL`` for a probe that must run after every other probe
+ALL = '*'
+
+# How long a checkpointed result may be reused by a resumed scan (seconds)
+DEFAULT_VALID_FOR = 3600
+
+_registry = {}
+
+
+class ProbeSpec:
+    """Registry entry describing one probe and what it needs to run."""
+
+    def __init__(self, name, func, requires=(), deps=(), timeout=DEFAULT_TIMEOUT, interactive=False,
+                 result=Result, valid_for=DEFAULT_VALID_FOR, on_demand=False, after=()):
+        self.name = name
+        self.result = result
+        self.func = func
+        self.requires = tuple(requires)
+        self.deps = deps
+        self.timeout = timeout
+        self.interactive = interactive
+        self.valid_for = valid_for
+        self.on_demand = on_demand
+        self.after = tuple(after)
+
+    def missing(self):
+        """Required modules that are not installed"""
+        return [m for m in self.requires if importlib.util.find_spec(m) is None]
+
+    def load(self):
+        """Import the required modules; raises ImportError naming the first missing one"""
+        for module in self.requires:
+            try:
+                importlib.import_module(module)
+            except ImportError as e:
+                raise ImportError(f"{self.name} probe requires {module}: {e}") from e
+
+    def run(self, *args, **kwargs):
+        self.load()
+        return self.func(*args, **kwargs)
+
+    def failed(self, kind, message):
+        """Typed result recorded when the probe raises, times out or is skipped"""
+        status = Status.SKIPPED if kind == 'skipped' else Status.ERROR
+        return self.result(status=status, error=message)
+
+
+def register(name, requires=(), deps=(), timeout=DEFAULT_TIMEOUT, interactive=False, result=Result,
+             valid_for=DEFAULT_VALID_FOR, on_demand=False, after=()):
+    """Decorator adding a probe function to the registry; the function is returned unchanged.
+
+    ``result`` is the result dataclass the probe returns; failures are
+    recorded as an instance of it with an error status. ``valid_for`` is how
+    many seconds a checkpointed result stays reusable when a scan resumes.
+    ``on_demand`` probes (long tests) only run when asked for by name.
+    ``after`` names probes that must finish first when they are part of the
+    same scan (benchmarks that would be skewed by a concurrent load); unlike
+    ``deps`` they are not required and their results are not passed in.
+    Registering a name again replaces the earlier entry, so the module can
+    be both run as ``__main__`` and imported without clashing.
+    """
+    def decorator(func):
+        _registry[name] = ProbeSpec(name, func, requires, deps, timeout, interactive, result, valid_for,
+                                    on_demand, after)
+        return func
+    return decorator
+
+
+def get_probe(name):
+    return _registry[name]
+
+
+def registered_probes():
+    return list(_registry.values())
+
+
+def build_probes(names=None, include_interactive=True, options=None, extra=()):
+    """Turn registry entries into scheduler probes, resolving ``deps=ALL``.
+
+    ``options`` maps a probe name to keyword arguments for its function,
+    e.g. ``{'Stress': {'duration': 10}}``. On-demand probes run only when
+    listed in ``names`` or ``extra``; the probes those depend on are added.
+    """
+    options = options or {}
+    extra = _with_deps(extra)
+    names = _with_deps(names) if names is not None else None
+    specs = [s for s in _registry.values()
+             if (s.name in extra
+                 or (s.name in names if names is not None else not s.on_demand))
+             and (include_interactive or not s.interactive)]
+    selected = [s.name for s in specs]
+    probes = []
+    for spec in specs:
+        if spec.deps == ALL:
+            deps = [n for n in selected if n != spec.name and _registry[n].deps != ALL]
+        else:
+            deps = list(spec.deps)
+        func = functools.partial(spec.run, **options[spec.name]) if spec.name in options else spec.run
+        after = [n for n in spec.after if n in selected and n not in deps]
+        if after:
+            if not deps:
+                # The scheduler passes results to probes with deps; this one does not take them
+                func = functools.partial(_ignore_results, func)
+            deps = deps + after
+        probes.append(Probe(spec.name, func, deps=deps, timeout=spec.timeout, on_error=spec.failed))
+    return probes
+
+
+def _with_deps(names):
+    """``names`` plus every registered probe they depend on, directly or not"""
+    selected, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name in selected or name not in _registry:
+            continue
+        selected.add(name)
+        if _registry[name].deps != ALL:
+            todo.extend(_registry[name].deps)
+    return selected
+
+
+def _ignore_results(func, results):
+    return func()
+
+
+# ========================================
+# IMPORT PROFILE
+# ========================================
+
+def _time_in_subprocess(code):
+    """Seconds reported by ``code`` run in a fresh interpreter"""
+    out = subprocess.check_output([sys.executable, '-c', code], stderr=subprocess.DEVNULL, timeout=120)
+    return float(out.decode().strip().splitlines()[-1])
+
+
+def import_profile(modules=None, startup_module='laptopcheck_pro', repeat=5):
+    """Cold import time per module plus a startup benchmark of ``startup_module``.
+
+    Every measurement uses a fresh interpreter so modules already imported
+    in this process do not hide their real cost.
+    """
+    if modules is None:
+        modules = sorted({m for s in _registry.values() for m in s.requires} | {'tkinter'})
+    timer = "import time; t = time.perf_counter(); import {0}; print(time.perf_counter() - t)"
+    rows = []
+    for module in modules:
+        try:
+            rows.append((module, _time_in_subprocess(timer.format(module))))
+        except Exception as e:
+            rows.append((module, f"{type(e).__name__}"))
+
+    startup = []
+    for _ in range(repeat):
+        try:
+            startup.append(_time_in_subprocess(timer.format(startup_module)))
+        except Exception:
+            break
+    return {
+        'modules': rows,
+        'startup_module': startup_module,
+        'startup': statistics.median(startup) if startup else None,
+        'startup_runs': startup,
+    }
+
+
+def print_import_profile(profile=None, out=sys.stdout):
+    profile = profile or import_profile()
+    out.write("Module import times (cold, fresh interpreter):\n")
+    for module, seconds in sorted(profile['modules'], key=lambda r: -r[1] if isinstance(r[1], float) else 0):
+        value = f"{seconds * 1000:9.1f} ms" if isinstance(seconds, float) else f"{'unavailable':>12} ({seconds})"
+        out.write(f"  {module:<24}{value}\n")
+    out.write("\nProbes:\n")
+    for spec in _registry.values():
+        missing = spec.missing()
+        state = f"missing {', '.join(missing)}" if missing else "ready"
+        needs = ', '.join(spec.requires) or '-'
+        out.write(f"  {spec.name:<12} needs {needs:<20} {state}\n")
+    if profile['startup'] is not None:
+        runs = len(profile['startup_runs'])
+        out.write(f"\nStartup benchmark: import {profile['startup_module']} "
+                  f"median {profile['startup'] * 1000:.1f} ms over {runs} runs\n")
+    else:
+        out.write(f"\nStartup benchmark: import {profile['startup_module']} failed\n")
@@ -0,0 +1,342 @@
+"""Streaming HTML report generator for single scans and whole batches.
+
+Templates are compiled once at import time and every piece of a report is
+written straight to the output file handle, so a combined report for
+thousands of scans never holds more than one scan in memory. Charts are
+inline SVG drawn only from real telemetry series and cached by content.
+
+    with open('report.html', 'w') as fh:
+        write_report(scan, fh)
+
+    python laptopcheck_report.py --jsonl scans.jsonl --combined batch.html
+    python laptopcheck_report.py --db laptopcheck_fleet.db --outdir reports/
+"""
+import collections
+import functools
+import heapq
+import html
+import os
+import re
+import sys
+from string import Template
+
+from laptopcheck_model import describe, display_items, format_value, loads
+
+STYLE = """
+    body { font-family: 'Segoe UI', sans-serif; margin: 40px; background: #f4f4f4; }
+    .card { background: white; padding: 25px; border-radius: 15px; box-shadow: 0 6px 20px rgba(0,0,0,0.1); margin-bottom: 20px; }
+    h1 { color: #2c3e50; text-align: center; }
+    .score { font-size: 2em; text-align: center; padding: 20px; border-radius: 15px; }
+    .good { background: #d5efda; color: #27ae60; }
+    .warn { background: #fdf3d7; color: #e67e22; }
+    .bad { background: #fce3e3; color: #c0392b; }
+    ul { line-height: 1.8; }
+    .charts { display: flex; flex-wrap: wrap; gap: 20px; }
+    .machine { page-break-after: always; }
+    details pre { white-space: pre-wrap; }
+    .timing table { border-collapse: collapse; font-size: 0.9em; }
+    .timing th, .timing td { padding: 3px 12px; text-align: right; }
+    .timing th:first-child, .timing td:first-child, .timing td:last-child { text-align: left; }
+    @media print { body { background: white; } .noprint { display: none; } }
+"""
+
+HEAD = Template("""<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>$title</title>
+  <style>$style</style>
+</head>
+<body>
+  <h1>$title</h1>
+""")
+
+MACHINE = Template("""
+  <section class="machine">
+  <p style="text-align:center"><strong>$hostname &middot; $date</strong></p>
+
+  <div class="card score $color">
+    <strong>Overall Condition: $grade ($score/100)</strong>
+    $reasons
+  </div>
+
+  <div class="card">
+    <h2>Hardware Authenticity</h2>
+    <ul>
+      <li><strong>RAM:</strong> $ram</li>
+      <li><strong>WiFi:</strong> $wifi</li>
+      <li><strong>Storage:</strong> $storage</li>
+    </ul>
+  </div>
+
+  <div class="card">
+    <h2>Physical Condition</h2>
+    <ul>
+      <li><strong>Battery Health:</strong> $battery</li>
+      <li><strong>Thermal Delta:</strong> $thermal</li>
+      <li><strong>Peak / Steady Temp:</strong> $peak</li>
+      <li><strong>Fan Dust:</strong> $fan</li>
+      <li><strong>Throughput:</strong> $throughput</li>
+      <li><strong>Drive Wear / Read Speed:</strong> $drive</li>
+      <li><strong>Memory Errors / Bandwidth:</strong> $memory</li>
+    </ul>
+  </div>
+""")
+
+CHARTS = Template("""
+  <div class="card">
+    <h2>Stress Telemetry</h2>
+    <div class="charts">$charts</div>
+  </div>
+""")
+
+DETAILS = Template("""
+  <div class="card">
+    <details><summary>All probe results</summary><pre>$details</pre></details>
+  </div>
+""")
+
+TIMING = Template("""
+  <div class="card timing">
+    <h2>Scan Timing</h2>
+    <p>$total</p>
+    <table>
+      <tr><th>Probe</th><th>Wall</th><th>CPU</th><th>Child CPU</th><th>Commands</th><th>Peak RSS</th><th>Error</th></tr>
+      $rows
+    </table>
+  </div>
+""")
+
+FOOT = Template("""
+  <div class="card noprint">
+    <h2>Summary</h2>
+    <p>$count scan(s): $grades</p>
+    $slowest
+  </div>
+  <p class="noprint" style="text-align:center; margin-top:40px;">
+    <button onclick="window.print()" style="padding:12px 30px; font-size:1.1em; background:#00d4ff; color:white; border:none; border-radius:8px; cursor:pointer;">
+      Print / Save as PDF
+    </button>
+  </p>
+</body>
+</html>
+""")
+
+# Stress series worth charting: channel -> (title, unit)
+CHART_CHANNELS = {
+    'cpu_temp': ("CPU temperature", "°C"),
+    'cpu_freq': ("CPU frequency", "MHz"),
+    'fan_rpm': ("Fan speed", "RPM"),
+    'rate': ("Throughput", "/s"),
+}
+
+
+# ========================================
+# CHARTS
+# ========================================
+
+@functools.lru_cache(maxsize=256)
+def svg_chart(title, unit, times, values, width=360, height=160):
+    """Inline SVG line chart; ``times``/``values`` are tuples so results can be cached"""
+    points = [(t, v) for t, v in zip(times, values) if v is not None]
+    if len(points) < 2:
+        return ''
+    t0, t1 = points[0][0], points[-1][0]
+    lo, hi = min(v for _, v in points), max(v for _, v in points)
+    span_t, span_v = (t1 - t0) or 1, (hi - lo) or 1
+    pad = 30
+    coords = ' '.join(
+        f"{pad + (t - t0) / span_t * (width - 2 * pad):.1f},"
+        f"{height - pad - (v - lo) / span_v * (height - 2 * pad):.1f}"
+        for t, v in points)
+    label = html.escape(f"{title} ({unit})")
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}" role="img" aria-label="{label}">'
+            f'<rect width="100%" height="100%" fill="#fafafa"/>'
+            f'<text x="{pad}" y="18" font-size="12">{label}</text>'
+            f'<text x="2" y="{pad + 4}" font-size="10">{hi:.0f}</text>'
+            f'<text x="2" y="{height - pad + 4}" font-size="10">{lo:.0f}</text>'
+            f'<text x="{width - pad}" y="{height - 8}" font-size="10" text-anchor="end">{t1:.0f}s</text>'
+            f'<polyline fill="none" stroke="#00a3cc" stroke-width="2" points="{coords}"/></svg>')
+
+
+def charts_for(scan):
+    stress = scan.get('Stress')
+    series = getattr(stress, 'series', None) or {}
+    charts = []
+    for channel, (title, unit) in CHART_CHANNELS.items():
+        data = series.get(channel)
+        if data:
+            if channel == 'rate':
+                unit = getattr(stress, 'throughput_unit', None) or unit
+            charts.append(svg_chart(title, unit, tuple(data['t']), tuple(data['v'])))
+    return ''.join(c for c in charts if c)
+
+
+# ========================================
+# WRITERS
+# ========================================
+
+def _e(value):
+    return html.escape(str(value))
+
+
+def _machine_fields(scan):
+    condition = scan.condition
+    spd, wifi, storage = scan.get('RAM SPD'), scan.get('WiFi MAC'), scan.get('Storage')
+    battery, stress, disk = scan.get('Battery'), scan.get('Stress'), scan.get('Storage Health')
+    memtest = scan.get('Memory Test')
+    reasons = getattr(condition, 'reasons', None) or []
+    storage_text = ' '.join(v for v in (getattr(storage, 'model', None), getattr(storage, 'serial', None)) if v)
+    return {
+        'hostname': _e(scan.hostname or 'unknown host'),
+        'date': _e((scan.finished or scan.started or '').replace('T', ' ')),
+        'color': _e(getattr(condition, 'color', None) or 'bad'),
+        'grade': _e(getattr(condition, 'grade', None) or 'UNGRADED'),
+        'score': _e(format_value(getattr(condition, 'score', None))),
+        'reasons': '<ul>' + ''.join(f'<li>{_e(r)}</li>' for r in reasons) + '</ul>' if reasons else '',
+        'ram': 'UPGRADED' if len(getattr(spd, 'modules', [])) > 1 else 'Original',
+        'wifi': {True: 'SWAPPED', False: 'Original'}.get(getattr(wifi, 'replaced', None), 'Unknown'),
+        'storage': _e(storage_text or 'N/A'),
+        'battery': _e(format_value(getattr(battery, 'health', None), '%')),
+        'thermal': _e(format_value(getattr(stress, 'temp_delta', None), '°C')),
+        'peak': _e(f"{format_value(getattr(stress, 'peak_temp', None), '°C')} / "
+                   f"{format_value(getattr(stress, 'steady_temp', None), '°C')}"),
+        'fan': _e(format_value(getattr(stress, 'fan_drop', None), 'RPM')),
+        'throughput': _e(dict(display_items(stress)).get('Throughput', 'N/A') if stress else 'N/A'),
+        'drive': _e(f"{format_value(getattr(disk, 'wear', None), '%')} / "
+                    f"{format_value(getattr(disk, 'seq_read', None), 'MB/s')}"),
+        'memory': _e(f"{format_value(getattr(memtest, 'errors', None))} / "
+                     f"{format_value(getattr(memtest, 'read_bw', None), 'GB/s')}"),
+    }
+
+
+def _seconds(value):
+    return '' if value is None else f"{value:.2f} s"
+
+
+def timing_card(timings):
+    """Per-probe time, commands and memory, slowest first ('' for scans without timings)"""
+    probes = (timings or {}).get('probes')
+    if not probes:
+        return ''
+    rows = []
+    for p in sorted(probes, key=lambda p: -(p.get('wall') or 0)):
+        error = p.get('error') or ('reused' if p.get('ran') is False else '')
+        if p.get('message'):
+            error = f"{error}: {p['message']}"
+        commands = p.get('commands')
+        if commands is not None and p.get('shared'):
+            commands = f"{commands} (+{p['shared']} shared)"
+        rows.append('<tr>' + ''.join(f'<td>{_e(v)}</td>' for v in (
+            p['name'], _seconds(p.get('wall')), _seconds(p.get('cpu')), _seconds(p.get('child_cpu')),
+            '' if commands is None else commands,
+            '' if p.get('peak_rss_mb') is None else f"{p['peak_rss_mb']:.0f} MB", error)) + '</tr>')
+    total = (f"Total {timings['wall']:.1f} s wall, {timings.get('cpu', 0):.1f} s probe CPU, "
+             f"{timings.get('commands', 0)} external commands, peak RSS {timings.get('peak_rss_mb', 0):.0f} MB")
+    return TIMING.substitute(total=_e(total), rows='\n      '.join(rows))
+
+
+def write_machine(scan, fh):
+    """Write one scan's section to ``fh``"""
+    fh.write(MACHINE.substitute(_machine_fields(scan)))
+    charts = charts_for(scan)
+    if charts:
+        fh.write(CHARTS.substitute(charts=charts))
+    details = '\n\n'.join(describe(name, result) for name, result in scan.probes.items())
+    fh.write(DETAILS.substitute(details=_e(details)))
+    fh.write(timing_card(scan.timings))
+    fh.write("  </section>\n")
+
+
+def write_report(scan, fh, title="LaptopCheck AI Pro Report"):
+    write_combined([scan], fh, title=title)
+
+
+def write_combined(scans, fh, title="LaptopCheck AI Pro Batch Report"):
+    """One HTML document for any iterable of scans, written as it is consumed"""
+    fh.write(HEAD.substitute(title=_e(title), style=STYLE))
+    grades = collections.Counter()
+    # Slowest machines and per-probe totals, so slow units or slow tools stand out
+    slow_scans, probe_wall, probe_runs = [], collections.Counter(), collections.Counter()
+    for scan in scans:
+        write_machine(scan, fh)
+        grades[getattr(scan.condition, 'grade', None) or 'UNGRADED'] += 1
+        if scan.timings.get('wall') is not None:
+            heapq.heappush(slow_scans, (scan.timings['wall'], scan.hostname or 'unknown host'))
+            if len(slow_scans) > 5:
+                heapq.heappop(slow_scans)
+        for p in scan.timings.get('probes', ()):
+            if p.get('wall') is not None:
+                probe_wall[p['name']] += p['wall']
+                probe_runs[p['name']] += 1
+    summary = ', '.join(f"{g} {n}" for g, n in grades.most_common()) or 'none'
+    slowest = ''
+    if slow_scans:
+        machines = ', '.join(f"{host} {wall:.0f} s" for wall, host in sorted(slow_scans, reverse=True))
+        probes = ', '.join(f"{name} {probe_wall[name] / probe_runs[name]:.1f} s"
+                           for name, _ in probe_wall.most_common(5))
+        slowest = f"<p>Slowest scans: {_e(machines)}</p><p>Slowest probes (mean per scan): {_e(probes)}</p>"
+    fh.write(FOOT.substitute(count=sum(grades.values()), grades=_e(summary), slowest=slowest))
+    return grades
+
+
+def _safe_name(text):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', text).strip('_') or 'scan'
+
+
+def write_per_machine(scans, outdir):
+    """One HTML file per scan in ``outdir``; returns the paths written"""
+    os.makedirs(outdir, exist_ok=True)
+    paths = []
+    for n, scan in enumerate(scans, 1):
+        ident = scan.machine['storage_serial'] or scan.machine['wifi_mac'] or scan.hostname or 'scan'
+        path = os.path.join(outdir, f"{n:05d}_{_safe_name(ident)}.html")
+        with open(path, 'w', encoding='utf-8') as fh:
+            write_report(scan, fh)
+        paths.append(path)
+    return paths
+
+
+def iter_jsonl(path):
+    """ScanResults from a CLI JSONL file, one line at a time"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Render LaptopCheck HTML reports for a batch of scans")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--jsonl', help="scans written by laptopcheck_cli.py")
+    source.add_argument('--db', help="fleet database written by the GUI or CLI")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--combined', metavar='FILE', help="write one combined report")
+    target.add_argument('--outdir', metavar='DIR', help="write one report per scan")
+    args = parser.parse_args(argv)
+
+    db = None
+    if args.jsonl:
+        scans = iter_jsonl(args.jsonl)
+    else:
+        from laptopcheck_db import FleetDB
+        db = FleetDB(args.db)
+        scans = db.iter_scans()
+    try:
+        if args.combined:
+            with open(args.combined, 'w', encoding='utf-8') as fh:
+                grades = write_combined(scans, fh)
+            print(f"Wrote {sum(grades.values())} scan(s) to {args.combined}")
+        else:
+            paths = write_per_machine(scans, args.outdir)
+            print(f"Wrote {len(paths)} report(s) to {args.outdir}")
+    finally:
+        if db is not None:
+            db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
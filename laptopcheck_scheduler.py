@@ -0,0 +1,107 @@
+"""Concurrent probe scheduler for LaptopCheck scans.
+
+Independent probes run at the same time on a thread pool, so a scan takes
+about as long as its slowest probe instead of the sum of all of them.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+DEFAULT_TIMEOUT = 60
+
+
+class Probe:
+    """A named scan step with optional dependencies and a timeout.
+
+    A probe without dependencies is called with no arguments. A probe that
+    declares dependencies runs only after all of them have finished and is
+    called with a dict of every result collected so far.
+
+    ``on_error(kind, message)`` builds the value recorded when the probe
+    raises (kind 'error'), times out ('timeout') or cannot run because a
+    dependency is missing ('skipped'). By default the message is recorded.
+    """
+
+    def __init__(self, name, func, deps=(), timeout=DEFAULT_TIMEOUT, on_error=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.on_error = on_error
+
+    def failed(self, kind, message):
+        return self.on_error(kind, message) if self.on_error else message
+
+    def __repr__(self):
+        return f"Probe({self.name!r}, deps={self.deps!r}, timeout={self.timeout})"
+
+
+class ProbeScheduler:
+    """Run probes concurrently, honouring dependencies and per-probe timeouts.
+
+    ``completed`` holds results carried over from an earlier run (see
+    laptopcheck_journal); those probes are reported first and not run again.
+    """
+
+    def __init__(self, probes, max_workers=None, on_result=None, completed=None):
+        self.probes = list(probes)
+        self.max_workers = max_workers or min(32, len(self.probes) or 1)
+        self.on_result = on_result
+        self.completed = dict(completed or {})
+        names = [p.name for p in self.probes]
+        if len(set(names)) != len(names):
+            raise ValueError("Probe names must be unique")
+
+    def _emit(self, name, value, results):
+        results[name] = value
+        if self.on_result:
+            self.on_result(name, value)
+
+    def run(self):
+        """Run every probe and return a dict of results in completion order."""
+        results = {}
+        for name, value in self.completed.items():
+            self._emit(name, value, results)
+        pending = {p.name: p for p in self.probes if p.name not in results}
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="probe")
+        try:
+            while pending or running:
+                for name, probe in list(pending.items()):
+                    if all(d in results for d in probe.deps):
+                        del pending[name]
+                        if probe.deps:
+                            fut = executor.submit(probe.func, dict(results))
+                        else:
+                            fut = executor.submit(probe.func)
+                        running[fut] = (probe, time.monotonic() + probe.timeout)
+
+                if not running:
+                    # Whatever is left depends on a probe that does not exist
+                    for name, probe in pending.items():
+                        missing = [d for d in probe.deps if d not in results]
+                        message = f"Skipped: missing dependency {', '.join(missing)}"
+                        self._emit(name, probe.failed('skipped', message), results)
+                    break
+
+                next_deadline = min(deadline for _, deadline in running.values())
+                done, _ = wait(running, timeout=max(0, next_deadline - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                for fut in done:
+                    probe, _ = running.pop(fut)
+                    try:
+                        value = fut.result()
+                    except Exception as e:
+                        value = probe.failed('error', f"{type(e).__name__}: {e}")
+                    self._emit(probe.name, value, results)
+
+                now = time.monotonic()
+                for fut, (probe, deadline) in list(running.items()):
+                    if deadline <= now and not fut.done():
+                        # A thread cannot be killed; abandon it and move on
+                        del running[fut]
+                        fut.cancel()
+                        message = f"Timed out after {probe.timeout}s"
+                        self._emit(probe.name, probe.failed('timeout', message), results)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
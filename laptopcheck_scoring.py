@@ -0,0 +1,347 @@
+"""Declarative condition scoring: a rule table applied to scan features.
+
+A policy is a plain table (Python dict, JSON or TOML) of rules and grade
+bands. Every scan is reduced to a small vector of numeric features; a rule
+fires when its feature compares true against its threshold and deducts its
+points. Rules sharing a ``group`` are exclusive: only the first that fires
+counts, like an if/elif chain.
+
+    [[rules]]
+    id = "battery.poor"
+    field = "battery_health"
+    op = "<"
+    value = 80
+    points = 15
+    group = "battery"
+    reason = "Battery health poor"
+
+One scan is scored in plain Python (``score``). Stored scans are re-graded
+in bulk by ``evaluate``, which runs each rule once over NumPy columns:
+
+    python laptopcheck_scoring.py laptopcheck_fleet.db --policy strict.toml [--write]
+
+Missing features are NaN and never fire a rule.
+"""
+import json
+import math
+import operator
+import os
+import sys
+import threading
+import time
+import warnings
+
+from laptopcheck_model import Status
+
+POLICY_ENV = 'LAPTOPCHECK_POLICY'
+
+OPS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+       '==': operator.eq, '!=': operator.ne}
+
+DEFAULT_POLICY = {
+    'version': 'default-1',
+    'start': 100,
+    'grades': [
+        {'name': 'GOOD', 'min': 80, 'color': 'good'},
+        {'name': 'FAIR', 'min': 60, 'color': 'warn'},
+        {'name': 'POOR', 'min': 40, 'color': 'bad'},
+        {'name': 'AVOID', 'color': 'bad'},
+    ],
+    'rules': [
+        {'id': 'ram.mixed', 'field': 'ram_modules', 'op': '>', 'value': 1, 'points': 5,
+         'reason': "RAM upgraded (mixed modules)"},
+        {'id': 'memory.errors', 'field': 'memtest_errors', 'op': '>', 'value': 0, 'points': 50,
+         'reason': "Memory errors detected (bad DIMM)"},
+        {'id': 'wifi.replaced', 'field': 'wifi_replaced', 'op': '==', 'value': 1, 'points': 10,
+         'reason': "WiFi card replaced"},
+        {'id': 'battery.poor', 'field': 'battery_health', 'op': '<', 'value': 80, 'points': 15,
+         'group': 'battery', 'reason': "Battery health poor"},
+        {'id': 'battery.degraded', 'field': 'battery_health', 'op': '<', 'value': 90, 'points': 5,
+         'group': 'battery', 'reason': "Battery health degraded"},
+        {'id': 'disk.smart_failed', 'field': 'disk_smart_failed', 'op': '==', 'value': 1, 'points': 25,
+         'reason': "Drive failed SMART self-assessment"},
+        {'id': 'disk.worn_out', 'field': 'disk_wear', 'op': '>=', 'value': 90, 'points': 20,
+         'group': 'disk.wear', 'reason': "Drive nearly worn out"},
+        {'id': 'disk.worn', 'field': 'disk_wear', 'op': '>=', 'value': 50, 'points': 5,
+         'group': 'disk.wear', 'reason': "Drive wear above 50%"},
+        {'id': 'disk.media_errors', 'field': 'disk_bad_sectors', 'op': '>', 'value': 0, 'points': 10,
+         'reason': "Drive has media errors or reallocated sectors"},
+        {'id': 'disk.slow', 'field': 'disk_seq_read', 'op': '<', 'value': 150, 'points': 5,
+         'reason': "Slow storage"},
+        {'id': 'cpu.slow', 'field': 'cpu_vs_peers', 'op': '<', 'value': 70, 'points': 15,
+         'group': 'cpu', 'reason': "CPU far slower than other units of its model"},
+        {'id': 'cpu.below', 'field': 'cpu_vs_peers', 'op': '<', 'value': 85, 'points': 5,
+         'group': 'cpu', 'reason': "CPU slower than other units of its model"},
+        {'id': 'thermal.delta', 'field': 'temp_delta', 'op': '>', 'value': 25, 'points': 10,
+         'reason': "High thermal delta under stress"},
+    ],
+}
+
+
+# ========================================
+# FEATURES
+# ========================================
+
+def _ok(result, *statuses):
+    return result is not None and result.status in (statuses or (Status.OK,))
+
+
+def _battery_health(results):
+    battery = results.get('Battery')
+    return battery.health if _ok(battery) else None
+
+
+def _disk(attr):
+    def feature(results):
+        disk = results.get('Storage Health')
+        if not _ok(disk, Status.OK, Status.WARN):
+            return None
+        if attr == 'smart_failed':
+            return None if disk.smart_passed is None else int(disk.smart_passed is False)
+        if attr == 'bad_sectors':
+            if disk.media_errors is None and disk.reallocated is None:
+                return None
+            return (disk.media_errors or 0) + (disk.reallocated or 0)
+        return getattr(disk, attr)
+    return feature
+
+
+def _cpu_vs_peers(results):
+    bench = results.get('CPU Bench')
+    return bench.relative if _ok(bench, Status.OK, Status.WARN) else None
+
+
+def _wifi_replaced(results):
+    # Only a card proven to come from another maker counts; a MAC alone says nothing
+    replaced = getattr(results.get('WiFi MAC'), 'replaced', None)
+    return None if replaced is None else int(replaced)
+
+
+def _attr(probe, attr):
+    return lambda results: getattr(results.get(probe), attr, None)
+
+
+# feature name -> function(results dict) returning a number or None
+FEATURES = {
+    'ram_modules': lambda results: len(results['RAM SPD'].modules) if results.get('RAM SPD') else None,
+    'memtest_errors': _attr('Memory Test', 'errors'),
+    'wifi_replaced': _wifi_replaced,
+    'battery_health': _battery_health,
+    'disk_smart_failed': _disk('smart_failed'),
+    'disk_wear': _disk('wear'),
+    'disk_bad_sectors': _disk('bad_sectors'),
+    'disk_seq_read': _disk('seq_read'),
+    'temp_delta': _attr('Stress', 'temp_delta'),
+    # Weakest benchmark score as a percentage of the same-model median
+    'cpu_vs_peers': _cpu_vs_peers,
+}
+
+# Bump when a feature is added, renamed or computed differently: stored
+# feature vectors of an older version are recomputed from the scan payload
+FEATURE_VERSION = 2
+
+# Old feature names still accepted in policy files: old name -> current name
+DEPRECATED_FIELDS = {
+    # "Any MAC found" counted as a replaced card; only a proven swap does now
+    'wifi_mac': 'wifi_replaced',
+}
+
+
+def features(results):
+    """Numeric feature vector of one scan's probe results (None when missing)"""
+    out = {}
+    for name, feature in FEATURES.items():
+        try:
+            value = feature(results)
+        except (AttributeError, TypeError):
+            value = None
+        out[name] = None if value is None else float(value)
+    return out
+
+
+# ========================================
+# POLICY
+# ========================================
+
+def validate(policy):
+    """Check a policy table and return a normalised copy; raises ValueError naming the bad entry"""
+    if not policy.get('grades'):
+        raise ValueError("Policy has no grades")
+    policy = dict(policy, rules=[dict(rule) for rule in policy.get('rules', [])])
+    ids = set()
+    for rule in policy['rules']:
+        rid = rule.get('id')
+        if not rid or rid in ids:
+            raise ValueError(f"Rule ids must be present and unique: {rid!r}")
+        ids.add(rid)
+        missing = {'field', 'op', 'value', 'points'} - set(rule)
+        if missing:
+            raise ValueError(f"Rule {rid!r} is missing {', '.join(sorted(missing))}")
+        if rule['op'] not in OPS:
+            raise ValueError(f"Rule {rid!r} has unknown op {rule['op']!r}; choose from {' '.join(OPS)}")
+        if rule['field'] in DEPRECATED_FIELDS:
+            warnings.warn(f"Rule {rid!r}: field {rule['field']!r} is deprecated, "
+                          f"using {DEPRECATED_FIELDS[rule['field']]!r}", DeprecationWarning, stacklevel=2)
+            rule['field'] = DEPRECATED_FIELDS[rule['field']]
+        if rule['field'] not in FEATURES:
+            raise ValueError(f"Rule {rid!r} uses unknown field {rule['field']!r}")
+    return policy
+
+
+def load_policy(path=None):
+    """Policy from a .json or .toml file; DEFAULT_POLICY when no path (or $LAPTOPCHECK_POLICY) is given"""
+    path = path or os.environ.get(POLICY_ENV)
+    if not path:
+        return DEFAULT_POLICY
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            policy = tomllib.load(f)
+    else:
+        with open(path, encoding='utf-8') as f:
+            policy = json.load(f)
+    policy.setdefault('version', os.path.basename(path))
+    return validate(policy)
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_policy(refresh=False):
+    """Process-wide policy, loaded once; ``refresh=True`` reads the file again"""
+    global _policy
+    with _policy_lock:
+        if _policy is None or refresh:
+            _policy = load_policy()
+        return _policy
+
+
+def _grade(policy, score):
+    for grade in policy['grades']:
+        if grade.get('min') is None or score >= grade['min']:
+            return grade
+    return policy['grades'][-1]
+
+
+# ========================================
+# ENGINES
+# ========================================
+
+def score(policy, feats):
+    """(score, grade, color, [(rule id, reason), ...]) for one feature dict"""
+    total = policy.get('start', 100)
+    fired, groups = [], set()
+    for rule in policy['rules']:
+        value = feats.get(rule['field'])
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        group = rule.get('group')
+        if group in groups or not OPS[rule['op']](value, rule['value']):
+            continue
+        if group:
+            groups.add(group)
+        total -= rule['points']
+        fired.append((rule['id'], rule.get('reason', rule['id'])))
+    grade = _grade(policy, total)
+    return total, grade['name'], grade.get('color'), fired
+
+
+def columns(feature_rows):
+    """Feature dicts -> {name: float64 array}, NaN for missing values"""
+    import numpy as np
+    rows = list(feature_rows)
+    return {name: np.array([r.get(name) if r.get(name) is not None else np.nan for r in rows],
+                           dtype=np.float64)
+            for name in FEATURES}
+
+
+def evaluate(policy, cols):
+    """Score every row of ``cols`` at once.
+
+    Returns a dict of arrays: ``score`` (int), ``grade`` and ``color`` (str)
+    and ``fired``, a (rules x rows) bool matrix in policy order alongside
+    ``rules``, the rule ids.
+    """
+    import numpy as np
+    rules = policy['rules']
+    n = len(next(iter(cols.values()))) if cols else 0
+    fired = np.zeros((len(rules), n), dtype=bool)
+    taken = {}
+    with np.errstate(invalid='ignore'):
+        for i, rule in enumerate(rules):
+            col = cols.get(rule['field'])
+            if col is None:
+                continue
+            hit = OPS[rule['op']](col, rule['value']) & ~np.isnan(col)
+            group = rule.get('group')
+            if group:
+                prev = taken.get(group)
+                if prev is not None:
+                    hit &= ~prev
+                taken[group] = hit if prev is None else prev | hit
+            fired[i] = hit
+    points = np.array([r['points'] for r in rules], dtype=np.int64)
+    scores = policy.get('start', 100) - points @ fired if rules else np.full(n, policy.get('start', 100))
+
+    # Grade bands are ordered best first; each score takes the first band it reaches
+    grades = policy['grades']
+    band = np.full(n, len(grades) - 1)
+    for i in range(len(grades) - 2, -1, -1):
+        if grades[i].get('min') is not None:
+            band[scores >= grades[i]['min']] = i
+    names = np.array([g['name'] for g in grades])
+    colors = np.array([g.get('color') or '' for g in grades])
+    return {'score': scores, 'grade': names[band], 'color': colors[band], 'fired': fired,
+            'rules': [r['id'] for r in rules]}
+
+
+def fired_rules(result, row):
+    """Rule ids that fired for one row of an ``evaluate`` result"""
+    return [rid for rid, hit in zip(result['rules'], result['fired'][:, row]) if hit]
+
+
+def main(argv=None):
+    import argparse
+    import collections
+    parser = argparse.ArgumentParser(description="Re-grade stored scans under a scoring policy")
+    parser.add_argument('db', nargs='?', help="fleet database to re-grade")
+    parser.add_argument('--policy', help="policy file (.json or .toml); default: built-in")
+    parser.add_argument('--write', action='store_true', help="store the new scores and grades")
+    parser.add_argument('--dump-policy', action='store_true', help="print the built-in policy as JSON and exit")
+    args = parser.parse_args(argv)
+
+    if args.dump_policy:
+        json.dump(DEFAULT_POLICY, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return 0
+    if not args.db:
+        parser.error("a database is required")
+
+    from laptopcheck_db import FleetDB
+    policy = load_policy(args.policy)
+    with FleetDB(args.db) as db:
+        t0 = time.perf_counter()
+        ids, cols, old = db.feature_columns()
+        t1 = time.perf_counter()
+        result = evaluate(policy, cols)
+        t2 = time.perf_counter()
+        if args.write:
+            db.store_grades(ids, result)
+        t3 = time.perf_counter()
+
+    before = collections.Counter(old)
+    after = collections.Counter(result['grade'].tolist())
+    changed = sum(1 for a, b in zip(old, result['grade'].tolist()) if a != b)
+    print(f"{len(ids)} scans under policy {policy.get('version')}: {changed} change grade")
+    for name in [g['name'] for g in policy['grades']]:
+        print(f"  {name:<8}{before.get(name, 0):>8} -> {after.get(name, 0)}")
+    print(f"load {t1 - t0:.2f}s, evaluate {t2 - t1:.3f}s" + (f", write {t3 - t2:.2f}s" if args.write else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""Drive health (SMART / NVMe log) and a bounded throughput benchmark.
+
+Health comes from ``smartctl --json`` when it is installed, falling back to
+``nvme smart-log``; both parse captured fixtures the same way as live
+output. The benchmark works on a scratch file on the drive under test, never
+the raw device:
+
+    sequential  large page-aligned buffers, O_DIRECT where the filesystem
+                allows it (page cache dropped with fadvise otherwise)
+    random 4K   preadv at random aligned offsets from a thread pool, one
+                thread per outstanding request, at several queue depths
+
+Latencies are kept per request so percentiles are exact.
+"""
+import json
+import mmap
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from laptopcheck_cmd import CommandError, run
+from laptopcheck_inventory import VIRTUAL_BLOCK
+
+# Scratch file lives here: /var/tmp is disk-backed where /tmp may be tmpfs
+BENCH_DIR = '/var/tmp' if os.path.isdir('/var/tmp') else tempfile.gettempdir()
+SEQ_BLOCK = 4 * 1024 * 1024
+RANDOM_BLOCK = 4096
+QUEUE_DEPTHS = (1, 4, 16, 32)
+PERCENTILES = (50, 90, 99, 99.9)
+
+# One NVMe "data unit" is 1000 512-byte sectors
+NVME_DATA_UNIT = 512 * 1000
+# ATA attributes whose normalized value is the remaining life in percent
+ATA_LIFE_LEFT = (177, 202, 231, 233)
+ATA_LBAS_WRITTEN = (241, 246)
+
+
+# ========================================
+# DEVICES
+# ========================================
+
+def parse_lsblk(text):
+    """Rows of ``lsblk -P`` output as dicts, virtual devices dropped"""
+    rows = []
+    for line in text.splitlines():
+        row = dict(re.findall(r'(\w+)="([^"]*)"', line))
+        if row.get('NAME') and not row['NAME'].startswith(VIRTUAL_BLOCK):
+            rows.append(row)
+    return rows
+
+
+def disk_for_path(path):
+    """Whole-disk name (``nvme0n1``, ``sda``) holding ``path``, or None"""
+    try:
+        st = os.stat(path)
+        sys_path = os.path.realpath(f"/sys/dev/block/{os.major(st.st_dev)}:{os.minor(st.st_dev)}")
+    except (OSError, AttributeError):
+        return None
+    if not os.path.exists(sys_path):
+        return None
+    if os.path.exists(os.path.join(sys_path, 'partition')):
+        sys_path = os.path.dirname(sys_path)
+    name = os.path.basename(sys_path)
+    return None if name.startswith(VIRTUAL_BLOCK) else name
+
+
+# ========================================
+# HEALTH
+# ========================================
+
+def _ata_attr(table, ids):
+    return next((a for a in table if a.get('id') in ids), None)
+
+
+def parse_smartctl(data):
+    """Health summary from ``smartctl --json -a`` output (NVMe or ATA)"""
+    device = data.get('device', {})
+    health = {
+        'device': device.get('name'),
+        'protocol': device.get('protocol'),
+        'model': data.get('model_name'),
+        'serial': data.get('serial_number'),
+        'passed': data.get('smart_status', {}).get('passed'),
+        'temperature': data.get('temperature', {}).get('current'),
+        'power_on_hours': data.get('power_on_time', {}).get('hours'),
+        'wear': None, 'spare': None, 'media_errors': None, 'reallocated': None, 'written_tb': None,
+        'rotational': bool(data.get('rotation_rate')) if 'rotation_rate' in data else None,
+    }
+    log = data.get('nvme_smart_health_information_log')
+    if log:
+        health.update(wear=log.get('percentage_used'), spare=log.get('available_spare'),
+                      media_errors=log.get('media_errors'))
+        if log.get('data_units_written') is not None:
+            health['written_tb'] = round(log['data_units_written'] * NVME_DATA_UNIT / 1e12, 2)
+    table = data.get('ata_smart_attributes', {}).get('table', [])
+    if table:
+        life = _ata_attr(table, ATA_LIFE_LEFT)
+        if life is not None and 0 <= life.get('value', -1) <= 100:
+            health['wear'] = 100 - life['value']
+        bad = [_ata_attr(table, (i,)) for i in (5, 197, 198)]
+        health['reallocated'] = sum(a['raw']['value'] for a in bad if a is not None) if any(bad) else None
+        written = _ata_attr(table, ATA_LBAS_WRITTEN)
+        if written is not None:
+            health['written_tb'] = round(written['raw']['value'] * 512 / 1e12, 2)
+    return health
+
+
+def parse_nvme_smart_log(data, device=None):
+    """Health summary from ``nvme smart-log -o json`` (nvme-cli)"""
+    written = data.get('data_units_written')
+    temp = data.get('temperature')
+    return {
+        'device': device, 'protocol': 'NVMe', 'model': None, 'serial': None,
+        'passed': data.get('critical_warning') == 0 if 'critical_warning' in data else None,
+        # nvme-cli reports Kelvin
+        'temperature': temp - 273 if temp is not None and temp > 200 else temp,
+        'power_on_hours': data.get('power_on_hours'),
+        'wear': data.get('percent_used', data.get('percentage_used')),
+        'spare': data.get('avail_spare'),
+        'media_errors': data.get('media_errors'),
+        'reallocated': None,
+        'written_tb': round(written * NVME_DATA_UNIT / 1e12, 2) if written is not None else None,
+        'rotational': False,
+    }
+
+
+def read_health(disk):
+    """Health of ``/dev/<disk>`` from smartctl or nvme-cli; None if neither works"""
+    dev = f"/dev/{disk}"
+    attempts = [
+        (['sudo', '-n', 'smartctl', '--json=c', '-a', dev], parse_smartctl),
+        (['smartctl', '--json=c', '-a', dev], parse_smartctl),
+    ]
+    if disk.startswith('nvme'):
+        parse_nvme = lambda data: parse_nvme_smart_log(data, dev)  # noqa: E731
+        attempts += [(['sudo', '-n', 'nvme', 'smart-log', '-o', 'json', dev], parse_nvme),
+                     (['nvme', 'smart-log', '-o', 'json', dev], parse_nvme)]
+    for argv, parse in attempts:
+        try:
+            # smartctl's exit status is a bitmask that is non-zero for perfectly usable output
+            data = json.loads(run(argv, check=False) or 'null')
+        except (OSError, CommandError, ValueError):
+            continue
+        if isinstance(data, dict) and ('smart_status' in data or 'critical_warning' in data
+                                       or 'nvme_smart_health_information_log' in data):
+            return parse(data)
+    return None
+
+
+# ========================================
+# BENCHMARK
+# ========================================
+
+def _open(path, flags):
+    """(fd, direct): O_DIRECT when the filesystem supports it"""
+    direct = getattr(os, 'O_DIRECT', 0)
+    if direct:
+        try:
+            return os.open(path, flags | direct), True
+        except OSError:
+            pass
+    return os.open(path, flags | getattr(os, 'O_BINARY', 0)), False
+
+
+def _drop_cache(fd):
+    if hasattr(os, 'posix_fadvise'):
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _pread_into(fd, buf, offset):
+    if hasattr(os, 'preadv'):
+        return os.preadv(fd, [buf], offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    data = os.read(fd, len(buf))
+    buf[:len(data)] = data
+    return len(data)
+
+
+def sequential(path, size, block=SEQ_BLOCK):
+    """Write then read ``size`` bytes sequentially; MB/s for each and O_DIRECT use"""
+    buf = mmap.mmap(-1, block)  # anonymous maps are page-aligned, as O_DIRECT needs
+    buf.write(os.urandom(block))
+    blocks = max(1, size // block)
+
+    fd, direct = _open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    try:
+        t0 = time.perf_counter()
+        for _ in range(blocks):
+            os.write(fd, buf)
+        os.fsync(fd)
+        write_s = time.perf_counter() - t0
+    finally:
+        os.close(fd)
+
+    fd, direct_read = _open(path, os.O_RDONLY)
+    try:
+        if not direct_read:
+            _drop_cache(fd)
+        t0 = time.perf_counter()
+        offset = 0
+        for _ in range(blocks):
+            offset += _pread_into(fd, buf, offset)
+        read_s = time.perf_counter() - t0
+    finally:
+        os.close(fd)
+        buf.close()
+    total = blocks * block
+    return {'write_mbs': total / write_s / 1e6, 'read_mbs': total / read_s / 1e6,
+            'direct': direct and direct_read, 'bytes': total}
+
+
+def random_reads(path, seconds=2.0, queue_depths=QUEUE_DEPTHS, block=RANDOM_BLOCK):
+    """4K random-read IOPS and latency percentiles (µs) per queue depth.
+
+    Each of ``qd`` threads keeps one preadv outstanding; the call releases
+    the GIL, so the drive sees ``qd`` requests in flight.
+    """
+    import numpy as np
+    size = os.path.getsize(path)
+    slots = size // block
+    fd, direct = _open(path, os.O_RDONLY)
+    if not direct:
+        _drop_cache(fd)
+    results = {}
+    try:
+        for qd in queue_depths:
+            stop = threading.Event()
+
+            def worker(seed):
+                rng = random.Random(seed)
+                buf = mmap.mmap(-1, block)
+                lat = []
+                try:
+                    while not stop.is_set():
+                        t0 = time.perf_counter_ns()
+                        _pread_into(fd, buf, rng.randrange(slots) * block)
+                        lat.append(time.perf_counter_ns() - t0)
+                finally:
+                    buf.close()
+                return lat
+
+            with ThreadPoolExecutor(max_workers=qd, thread_name_prefix="io") as pool:
+                t0 = time.perf_counter()
+                futures = [pool.submit(worker, n) for n in range(qd)]
+                time.sleep(seconds)
+                stop.set()
+                lat = np.concatenate([np.asarray(f.result(), dtype=np.float64) for f in futures])
+                elapsed = time.perf_counter() - t0
+            pct = np.percentile(lat, PERCENTILES) / 1000 if lat.size else [None] * len(PERCENTILES)
+            results[f"qd{qd}"] = {
+                'iops': round(lat.size / elapsed, 1),
+                **{f"p{p:g}_us".replace('.', '_'): round(float(v), 1) for p, v in zip(PERCENTILES, pct)},
+            }
+    finally:
+        os.close(fd)
+    return results, direct
+
+
+def benchmark(directory=BENCH_DIR, size_mb=256, seconds=2.0, queue_depths=QUEUE_DEPTHS):
+    """Sequential and random benchmark on a scratch file in ``directory``"""
+    fd, path = tempfile.mkstemp(prefix='laptopcheck-bench-', dir=directory)
+    os.close(fd)
+    try:
+        seq = sequential(path, size_mb * 1024 * 1024)
+        rand, direct = random_reads(path, seconds, queue_depths)
+    finally:
+        os.remove(path)
+    return {'sequential': seq, 'random': rand, 'direct': seq['direct'] and direct}
+
+
+def storage_health(directory=BENCH_DIR, size_mb=256, seconds=2.0, queue_depths=QUEUE_DEPTHS):
+    """Health of the drive holding ``directory`` plus, unless size_mb is 0, its benchmark"""
+    disk = disk_for_path(directory)
+    health = read_health(disk) if disk else None
+    bench = benchmark(directory, size_mb, seconds, queue_depths) if size_mb else None
+    return {'disk': disk, 'health': health, 'bench': bench}
@@ -0,0 +1,174 @@
+"""Multi-core stress engine with sustained load and live telemetry sampling.
+
+One worker process per core runs a selectable kernel until the requested
+duration has elapsed, while a TelemetrySampler records temperatures, fan
+RPM, per-core frequency and workload throughput on a fixed interval.
+
+Kernels:
+    int     pure integer ALU work (LCG/xorshift mixing), ops/s
+    fma     NumPy vectorised multiply-add on cache-sized arrays, FLOP/s
+    stream  NumPy memory copy on arrays far larger than cache, bytes/s
+"""
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from laptopcheck_model import format_rate  # noqa: F401  (re-exported for callers)
+from laptopcheck_telemetry import Telemetry, TelemetrySampler
+
+# A sample below this fraction of the peak frequency seen so far counts as throttled
+THROTTLE_RATIO = 0.9
+# Consecutive throttled samples needed before onset is reported
+THROTTLE_SAMPLES = 2
+
+
+# ========================================
+# KERNELS (run inside worker processes)
+# ========================================
+
+def _int_kernel():
+    def chunk(n=20000):
+        x = 0x12345678
+        for _ in range(n):
+            x = (x * 1103515245 + 12345) & 0xFFFFFFFF
+            x ^= x >> 13
+        return n
+    return chunk
+
+
+def _fma_kernel():
+    import numpy as np
+    a = np.random.rand(1 << 15)
+    b = np.random.rand(1 << 15)
+    c = np.empty_like(a)
+
+    def chunk(reps=64):
+        for _ in range(reps):
+            np.multiply(a, b, out=c)
+            np.add(c, a, out=c)
+        return 2 * a.size * reps
+    return chunk
+
+
+def _stream_kernel():
+    import numpy as np
+    src = np.ones(1 << 22)  # 32 MiB per array, well beyond any cache
+    dst = np.empty_like(src)
+
+    def chunk():
+        np.copyto(dst, src)
+        return 2 * src.nbytes  # read + write
+    return chunk
+
+
+KERNELS = {'int': _int_kernel, 'fma': _fma_kernel, 'stream': _stream_kernel}
+UNITS = {'int': 'ops/s', 'fma': 'FLOP/s', 'stream': 'B/s'}
+
+
+def _worker(kernel, slot, counters, stop):
+    chunk = KERNELS[kernel]()
+    done = 0.0
+    while not stop.is_set():
+        done += chunk()
+        counters[slot] = done
+
+
+# ========================================
+# ENGINE
+# ========================================
+
+def _throttle_onset(times, values):
+    """Time of the first sustained drop below THROTTLE_RATIO of the running peak"""
+    peak = 0.0
+    run_start, run_len = None, 0
+    for t, v in zip(times, values):
+        if np.isnan(v):
+            continue
+        if peak and v < peak * THROTTLE_RATIO:
+            if run_len == 0:
+                run_start = float(t)
+            run_len += 1
+            if run_len >= THROTTLE_SAMPLES:
+                return run_start
+        else:
+            run_len = 0
+            peak = max(peak, v)
+    return None
+
+
+def run_stress(duration=30, kernel='int', workers=None, interval=0.5, stop_event=None, on_sample=None,
+               telemetry=None):
+    """Load every core with ``kernel`` for ``duration`` seconds and sample telemetry.
+
+    ``stop_event`` (a threading or multiprocessing Event) ends the run early.
+    ``on_sample(t, values)`` is called from the sampler thread for each sample.
+    Samples go into ``telemetry`` (a new store if not given); the returned
+    dict holds derived figures, per-channel statistics and downsampled series.
+    """
+    if kernel not in KERNELS:
+        raise ValueError(f"Unknown kernel {kernel!r}; choose from {', '.join(KERNELS)}")
+    workers = workers or os.cpu_count() or 1
+    if telemetry is None:
+        capacity = max(64, int(duration / interval) + 8)
+        telemetry = Telemetry(capacity=capacity)
+
+    # spawn, not fork: the engine is usually started from a probe thread
+    # while other threads hold locks, which a forked child would inherit
+    ctx = multiprocessing.get_context('spawn')
+    stop = ctx.Event()
+    counters = ctx.Array('d', workers, lock=False)
+    last = [time.monotonic(), 0.0]
+
+    def throughput():
+        now, total = time.monotonic(), sum(counters)
+        rate = (total - last[1]) / (now - last[0]) if now > last[0] else 0.0
+        last[:] = [now, total]
+        return {'rate': rate}
+
+    sampler = TelemetrySampler(telemetry, interval, extra=throughput, on_sample=on_sample)
+    sampler.start()  # first sample is the idle baseline before load starts
+    procs = [ctx.Process(target=_worker, args=(kernel, i, counters, stop), daemon=True)
+             for i in range(workers)]
+    t0 = time.monotonic()
+    for p in procs:
+        p.start()
+    try:
+        deadline = t0 + duration
+        while time.monotonic() < deadline:
+            if stop_event is not None and stop_event.is_set():
+                break
+            time.sleep(max(0.0, min(interval, deadline - time.monotonic())))
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        sampler.stop()
+    elapsed = time.monotonic() - t0
+
+    times, rates = telemetry.series('rate')
+    _, freqs = telemetry.series('cpu_freq')
+    loaded = slice(1, -1)  # skip the idle baseline and the sample taken after the workers stopped
+    if not np.all(np.isnan(freqs[loaded])):
+        onset = _throttle_onset(times[loaded], freqs[loaded])
+    else:
+        # No frequency sensors (VMs, some ARM boards): fall back to throughput
+        onset = _throttle_onset(times[loaded], rates[loaded])
+    tail = rates[loaded][len(rates[loaded]) // 2:]
+    stats = telemetry.summary()
+
+    return {
+        'kernel': kernel,
+        'unit': UNITS[kernel],
+        'workers': workers,
+        'duration': round(elapsed, 2),
+        'cancelled': elapsed + interval < duration,
+        'total_work': sum(counters),
+        'throughput': float(np.nanmean(tail)) if tail.size and not np.all(np.isnan(tail)) else None,
+        'throttle_onset': onset,
+        'stats': stats,
+        'series': telemetry.views(['cpu_temp', 'fan_rpm', 'cpu_freq', 'rate']),
+    }
@@ -0,0 +1,294 @@
+"""Compact time-series telemetry store for sensor sampling.
+
+Samples live in preallocated NumPy ring buffers, one per channel, so memory
+stays fixed however long a burn-in runs: once a buffer is full the oldest
+samples are overwritten. Missing readings are stored as NaN.
+
+    telemetry = Telemetry(capacity=7200)
+    sampler = TelemetrySampler(telemetry, interval=0.5).start()
+    ...
+    sampler.stop()
+    telemetry.stats('cpu_temp')      # {'min': ..., 'max': ..., 'steady': ...}
+    telemetry.view('cpu_temp', 120)  # downsampled (times, values)
+"""
+import glob
+import threading
+import time
+
+import numpy as np
+
+# Temperature sensor groups in the order they are preferred for "CPU temp"
+CPU_SENSORS = ('coretemp', 'k10temp', 'zenpower', 'cpu_thermal', 'cpu-thermal', 'acpitz')
+
+# Fraction of a run treated as steady state when summarising (the tail end)
+STEADY_FRACTION = 0.25
+
+
+# ========================================
+# RING BUFFER
+# ========================================
+
+class RingBuffer:
+    """Fixed-capacity float64 buffer; with a ``width`` each sample is a row."""
+
+    __slots__ = ('_data', '_next', '_count')
+
+    def __init__(self, capacity, width=None):
+        shape = (capacity,) if width is None else (capacity, width)
+        self._data = np.full(shape, np.nan)
+        self._next = 0
+        self._count = 0
+
+    @property
+    def capacity(self):
+        return self._data.shape[0]
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        row = self._data[self._next]
+        if row.ndim:
+            row[:] = np.nan
+            if value is not None:
+                n = min(len(value), row.shape[0])
+                row[:n] = value[:n]
+        else:
+            self._data[self._next] = np.nan if value is None else value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def values(self):
+        """Samples oldest-first (a view when the buffer has not wrapped)"""
+        if self._count < self.capacity:
+            return self._data[:self._count]
+        return np.concatenate((self._data[self._next:], self._data[:self._next]))
+
+    def last(self):
+        if not self._count:
+            return None
+        return self._data[(self._next - 1) % self.capacity]
+
+
+def _bucket_means(values, points):
+    """Mean of ``points`` equal-sized buckets along axis 0, ignoring NaN"""
+    edges = np.linspace(0, len(values), points + 1).astype(int)[:-1]
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), edges, axis=0)
+    counts = np.add.reduceat(valid, edges, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _row_means(values):
+    """Per-sample mean across the columns of a 2-D channel, ignoring NaN"""
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, values, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _none_if_nan(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+# ========================================
+# TELEMETRY STORE
+# ========================================
+
+class Telemetry:
+    """Aligned ring buffers: one timestamp buffer plus one buffer per channel."""
+
+    def __init__(self, capacity=7200, widths=None):
+        self.capacity = capacity
+        self.widths = dict(widths or {})
+        self.times = RingBuffer(capacity)
+        self.channels = {}
+        self._lock = threading.Lock()
+
+    def record(self, t, **values):
+        """Append one sample taken at ``t`` seconds; absent channels get NaN"""
+        with self._lock:
+            for name in values:
+                if name not in self.channels:
+                    buf = RingBuffer(self.capacity, self.widths.get(name))
+                    # Back-fill so the new channel lines up with the timestamps
+                    for _ in range(len(self.times)):
+                        buf.append(None)
+                    self.channels[name] = buf
+            self.times.append(t)
+            for name, buf in self.channels.items():
+                buf.append(values.get(name))
+
+    def __len__(self):
+        return len(self.times)
+
+    def series(self, channel):
+        """Full-resolution (times, values) arrays for one channel"""
+        with self._lock:
+            return self.times.values().copy(), self.channels[channel].values().copy()
+
+    def view(self, channel, points=200):
+        """(times, values) reduced to at most ``points`` bucket means"""
+        times, values = self.series(channel)
+        if len(times) <= points:
+            return times, values
+        return _bucket_means(times, points), _bucket_means(values, points)
+
+    def stats(self, channel):
+        """Summary statistics; 2-D channels are averaged across columns first"""
+        times, values = self.series(channel)
+        if values.ndim > 1:
+            values = _row_means(values)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return {'count': 0, 'min': None, 'max': None, 'mean': None, 'p95': None,
+                    'first': None, 'last': None, 'steady': None, 't_max': None}
+        data = values[valid]
+        steady = data[-max(1, int(len(data) * STEADY_FRACTION)):]
+        return {
+            'count': int(valid.sum()),
+            'min': float(data.min()),
+            'max': float(data.max()),
+            'mean': float(data.mean()),
+            'p95': float(np.percentile(data, 95)),
+            'first': float(data[0]),
+            'last': float(data[-1]),
+            'steady': float(steady.mean()),
+            't_max': _none_if_nan(times[valid][int(data.argmax())]),
+        }
+
+    def summary(self, channels=None):
+        return {name: self.stats(name) for name in (channels or self.channels)}
+
+    def views(self, channels=None, points=120):
+        """JSON-ready downsampled series, NaN replaced by None"""
+        out = {}
+        for name in (channels or self.channels):
+            times, values = self.view(name, points)
+            if values.ndim > 1:
+                values = _row_means(values)
+            out[name] = {'t': [round(float(t), 3) for t in times],
+                         'v': [_none_if_nan(v) for v in values]}
+        return out
+
+
+# ========================================
+# SENSORS
+# ========================================
+
+def read_cpu_temp():
+    """Hottest current reading from the preferred CPU sensor group, or None"""
+    import psutil
+    try:
+        temps = psutil.sensors_temperatures()
+    except (AttributeError, OSError):
+        return None
+    for name in CPU_SENSORS:
+        readings = [t.current for t in temps.get(name, []) if t.current]
+        if readings:
+            return max(readings)
+    return None
+
+
+def read_fan_rpm():
+    """Mean RPM over all reported fans, or None"""
+    import psutil
+    try:
+        fans = psutil.sensors_fans()
+    except (AttributeError, OSError):
+        return None
+    rpms = [f.current for entries in fans.values() for f in entries if f.current]
+    return sum(rpms) / len(rpms) if rpms else None
+
+
+def read_core_freqs():
+    """Current frequency (MHz) of each core; empty when unavailable"""
+    import psutil
+    try:
+        return [f.current for f in psutil.cpu_freq(percpu=True) or []]
+    except (AttributeError, OSError, NotImplementedError):
+        return []
+
+
+def read_battery_power():
+    """Total battery discharge rate in watts from sysfs, or None"""
+    total, found = 0.0, False
+    for bat in glob.glob('/sys/class/power_supply/BAT*'):
+        try:
+            with open(f"{bat}/status") as f:
+                if f.read().strip() != 'Discharging':
+                    continue
+            try:
+                with open(f"{bat}/power_now") as f:
+                    total += int(f.read()) / 1e6
+            except FileNotFoundError:
+                with open(f"{bat}/current_now") as f:
+                    current = int(f.read())
+                with open(f"{bat}/voltage_now") as f:
+                    total += current * int(f.read()) / 1e12
+            found = True
+        except (OSError, ValueError):
+            continue
+    return total if found else None
+
+
+class TelemetrySampler:
+    """Background thread recording sensor readings into a Telemetry store.
+
+    ``extra`` is an optional callable returning a dict of additional channel
+    values to record with every sample (e.g. workload throughput).
+    """
+
+    def __init__(self, telemetry, interval=0.5, extra=None, on_sample=None):
+        import psutil
+        self.telemetry = telemetry
+        self.interval = interval
+        self.extra = extra
+        self.on_sample = on_sample
+        self.cores = psutil.cpu_count() or 1
+        self.telemetry.widths.setdefault('core_freq', self.cores)
+        self.telemetry.widths.setdefault('core_util', self.cores)
+        self._stop = threading.Event()
+        self._thread = None
+        self.t0 = None
+
+    def sample(self):
+        import psutil
+        freqs = read_core_freqs()
+        values = {
+            'cpu_temp': read_cpu_temp(),
+            'fan_rpm': read_fan_rpm(),
+            'cpu_freq': sum(freqs) / len(freqs) if freqs else None,
+            'core_freq': freqs or None,
+            'core_util': psutil.cpu_percent(percpu=True),
+            'battery_w': read_battery_power(),
+        }
+        if self.extra:
+            values.update(self.extra())
+        t = time.monotonic() - self.t0
+        self.telemetry.record(t, **values)
+        if self.on_sample:
+            self.on_sample(t, values)
+        return values
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        import psutil
+        psutil.cpu_percent(percpu=True)  # prime the utilisation counters
+        self.t0 = time.monotonic()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.sample()
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+import laptopcheck_agent as agent
+from laptopcheck_db import FleetDB
+from laptopcheck_model import ProcessorResult, ScanResult
+
+
+def make_scan(started='2026-01-05T10:00:00'):
+    return ScanResult(hostname='bench-07', started=started, finished=started,
+                      probes={'Processor': ProcessorResult(model="Intel(R) Core(TM) i5-8350U CPU @ 1.70GHz")})
+
+
+@pytest.fixture
+def collector(tmp_path):
+    """A Collector on 127.0.0.1 (any free port) serving from a loop thread, storing into a tmp FleetDB"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    c = agent.Collector(str(tmp_path / 'fleet.db'), port=0, token='s3cret', batch_interval=0.05)
+    asyncio.run_coroutine_threadsafe(c.start(), loop).result(10)
+    yield c
+    asyncio.run_coroutine_threadsafe(c.stop(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+
+
+def link(collector, token='s3cret'):
+    return agent.AgentLink(collector.host, collector.port, token=token, timeout=5.0)
+
+
+def stored_scans(collector):
+    with FleetDB(collector.db_path) as db:
+        return db.conn.execute("SELECT COUNT(*) FROM scans").fetchone()[0]
+
+
+def test_resend_is_stored_once(collector):
+    scan = make_scan()
+    first = link(collector).deliver(scan, probes=['Processor'], attempts=1)
+    # A retry after a lost reply carries the same idempotency key
+    again = link(collector).deliver(scan, attempts=1)
+    assert first == again
+    other = link(collector).deliver(make_scan('2026-01-06T10:00:00'), attempts=1)
+    assert other != first
+    assert stored_scans(collector) == 2
+
+
+def test_wrong_token_is_rejected(collector):
+    with pytest.raises(ConnectionError, match="bad token"):
+        link(collector, token='guess').deliver(make_scan(), attempts=1)
+    with pytest.raises(ConnectionError, match="bad token"):
+        link(collector, token=None).deliver(make_scan(), attempts=1)
+    assert stored_scans(collector) == 0
+
+
+def test_spooled_scans_are_delivered_later(collector, tmp_path):
+    spool_dir = str(tmp_path / 'spool')
+    older, newer = make_scan('2026-01-05T10:00:00'), make_scan('2026-01-06T10:00:00')
+    path = agent.spool(older, spool_dir=spool_dir)
+    os.utime(path, (1, 1))
+    agent.spool(newer, spool_dir=spool_dir)
+
+    ids = agent.flush_spool(link(collector), spool_dir)
+    assert len(ids) == 2 and ids[0] < ids[1]
+    assert os.listdir(spool_dir) == []
+    assert stored_scans(collector) == 2
+    # Nothing left to send
+    assert agent.flush_spool(link(collector), spool_dir) == []
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+import laptopcheck_audio as audio  # noqa: E402
+
+from conftest import FIXTURES  # noqa: E402
+
+
+def grade(name, tmp_path):
+    samples, rate = audio.read_wav(os.path.join(FIXTURES, 'audio', name))
+    _, layout = audio.stimulus(2, rate, cache_dir=str(tmp_path))
+    return audio.analyze(samples, layout)
+
+
+def test_good_loopback(tmp_path):
+    r = grade('loopback_ok.wav', tmp_path)
+    assert r['problems'] == [] and not r['dead']
+    assert [c['name'] for c in r['channels']] == ['Left', 'Right']
+    assert r['latency_ms'] > 0
+
+
+def test_dead_right_channel(tmp_path):
+    r = grade('loopback_dead_right.wav', tmp_path)
+    assert r['dead']
+    assert [c['dead'] for c in r['channels']] == [False, True]
+    assert "Right channel silent" in r['problems']
+
+
+def test_distorted_left_channel(tmp_path):
+    r = grade('loopback_distorted.wav', tmp_path)
+    assert not r['dead']
+    assert any(p.startswith("Left channel distorted") for p in r['problems'])
+    left, right = r['channels']
+    assert left['thd_pct'] > right['thd_pct']
+
+
+def test_stimulus_cache_follows_parameters(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio, '_buffers', {})
+    first, _ = audio.stimulus(2, 8000, cache_dir=str(tmp_path))
+    monkeypatch.setattr(audio, 'LEVEL', audio.LEVEL / 2)
+    second, _ = audio.stimulus(2, 8000, cache_dir=str(tmp_path))
+    assert np.abs(second).max() == pytest.approx(np.abs(first).max() / 2, rel=1e-3)
@@ -0,0 +1,98 @@
+import pytest
+
+import laptopcheck_cpubench as cpubench
+
+
+@pytest.mark.parametrize('text, key', [
+    ("Intel(R) Core(TM) i7-8650U CPU @ 1.90GHz", 'intel core i7-8650u'),
+    ("Intel Core i7-8650U", 'intel core i7-8650u'),
+    ("11th Gen Intel(R) Core(TM) i7-1165G7 @ 2.80GHz", 'intel core i7-1165g7'),
+    ("AMD Ryzen 7 PRO 4750U with Radeon Graphics", 'amd ryzen 7 pro 4750u'),
+    ("AMD Ryzen 5 3500U 4-Core Processor", 'amd ryzen 5 3500u'),
+    ("", None),
+    (None, None),
+])
+def test_normalize_model(text, key):
+    assert cpubench.normalize_model(text) == key
+
+
+def test_percentile_of():
+    peers = [10, 20, 30, 40]
+    assert cpubench.percentile_of(5, peers) == 0
+    assert cpubench.percentile_of(50, peers) == 100
+    assert cpubench.percentile_of(25, peers) == 50
+    # Ties count half
+    assert cpubench.percentile_of(20, peers) == 37.5
+    assert cpubench.percentile_of(20, [20, 20]) == 50
+
+
+def seed(db, model, values, metric='int_1'):
+    for n, value in enumerate(values):
+        db.record(model, {metric: value}, f"peer{n}")
+
+
+def test_compare_needs_enough_peers(tmp_path):
+    with cpubench.BaselineDB(str(tmp_path / 'baseline.db')) as db:
+        seed(db, 'intel core i7-8650u', [100, 100, 100])
+        c = db.compare('intel core i7-8650u', {'int_1': 80}, 'this')['int_1']
+        assert (c['peers'], c['median'], c['percentile'], c['relative']) == (3, 100, None, None)
+
+        seed(db, 'intel core i7-8650u', [90, 110, 100, 100, 100])
+        c = db.compare('intel core i7-8650u', {'int_1': 80}, 'this')['int_1']
+        assert (c['peers'], c['percentile'], c['relative']) == (5, 0, 80)
+        # The machine's own earlier score is not one of its peers
+        assert db.compare('intel core i7-8650u', {'int_1': 80}, 'peer0')['int_1']['peers'] == 4
+
+
+@pytest.fixture
+def bench(tmp_path, monkeypatch):
+    """bench_and_compare against a seeded database with a fixed score for this machine"""
+    path = str(tmp_path / 'baseline.db')
+    with cpubench.BaselineDB(path) as db:
+        seed(db, 'intel core i7-8650u', [100] * 6)
+    monkeypatch.setattr(cpubench, 'machine_key', lambda: 'this')
+
+    def run(score, record=True):
+        monkeypatch.setattr(cpubench, 'run_bench', lambda seconds: {'int_1': score})
+        r = cpubench.bench_and_compare("Intel(R) Core(TM) i7-8650U CPU @ 1.90GHz", path, record=record)
+        with cpubench.BaselineDB(path) as db:
+            return r, len(db.peers('intel core i7-8650u')['int_1'])
+    return run
+
+
+def test_normal_run_is_recorded(bench):
+    r, stored = bench(98)
+    assert (r['relative'], r['recorded'], stored) == (98, True, 7)
+
+
+def test_slow_run_is_not_recorded(bench):
+    # A throttling unit must not lower the median later units are judged against
+    r, stored = bench(60)
+    assert (r['relative'], r['recorded'], stored) == (60, False, 6)
+
+
+def test_no_record(bench):
+    r, stored = bench(98, record=False)
+    assert (r['recorded'], stored) == (False, 6)
+
+
+
+def test_too_few_peers_is_said(tmp_path, monkeypatch):
+    path = str(tmp_path / 'baseline.db')
+    with cpubench.BaselineDB(path) as db:
+        seed(db, 'intel core i7-8650u', [100] * 2)
+    monkeypatch.setattr(cpubench, 'machine_key', lambda: 'this')
+    monkeypatch.setattr(cpubench, 'run_bench', lambda seconds: {'int_1': 50})
+    r = cpubench.bench_and_compare("Intel Core i7-8650U", path)
+    assert (r['peers'], r['relative'], r['recorded']) == (2, None, True)
+    assert r['note'] == "2 other units of this model in the baseline; 5 needed to compare"
+
+
+def test_no_shared_baseline_is_not_compared(monkeypatch):
+    # A per-machine database would only hold the machine itself: nothing to compare with
+    monkeypatch.delenv(cpubench.BASELINE_ENV, raising=False)
+    monkeypatch.setattr(cpubench, 'BaselineDB', None)
+    monkeypatch.setattr(cpubench, 'run_bench', lambda seconds: {'int_1': 98})
+    r = cpubench.bench_and_compare("Intel Core i7-8650U")
+    assert (r['scores'], r['comparison'], r['relative'], r['recorded']) == ({'int_1': 98}, {}, None, False)
+    assert cpubench.BASELINE_ENV in r['note']
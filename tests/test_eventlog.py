@@ -0,0 +1,37 @@
+import os
+
+import laptopcheck_eventlog as eventlog
+
+from conftest import FIXTURES
+
+
+def scanned(name):
+    return eventlog.scan_file(os.path.join(FIXTURES, name), eventlog.BookmarkIndex(None))
+
+
+def test_secure_boot_failures_are_not_firmware_updates():
+    # TPM-WMI 1796: a Secure Boot variable update that failed
+    r = scanned('wevtutil_1796.txt')
+    assert (r['format'], r['records']) == ('text', 3)
+    assert r['counts']['firmware_update'] == 0
+
+
+def test_only_successful_firmware_installs_count():
+    r = scanned(os.path.join('eventlog', 'system.xml'))
+    # One failed (20) and one successful (19) install of the same firmware, plus two 1796 failures
+    assert r['counts']['firmware_update'] == 1
+    assert r['timeline']['firmware_update'][0][0] == '2024-02-20T03:02:45'
+
+
+def test_unreadable_log_has_no_counts(monkeypatch):
+    import laptopcheck_pro as pro
+    from laptopcheck_model import Status
+    from laptopcheck_model import describe
+    empty = {'counts': dict.fromkeys(eventlog.CATEGORIES, 0), 'timeline': {}, 'records': 0, 'new': 0,
+             'first': None, 'last': None, 'bios': None, 'source': 'journal'}
+    monkeypatch.setattr(eventlog, 'scan_system', lambda os_type, index=None: empty)
+    log = pro.get_event_log()
+    assert log.status == Status.UNAVAILABLE
+    assert log.firmware_updates is log.lid_opens is log.suspends is None
+    assert pro.get_bios_flash_count({'Event Log': log}).count is None
+    assert 'Lid opens' not in describe('Event Log', log)
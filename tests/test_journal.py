@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+import laptopcheck_journal as journal
+import laptopcheck_pro  # noqa: F401  registers the probes
+from laptopcheck_model import CpuBenchResult, KeyboardResult, ProcessorResult, Status
+from laptopcheck_probes import get_probe
+
+
+@pytest.fixture
+def interrupted(tmp_path, monkeypatch):
+    """Journal of a scan that stopped after recording ``results`` {name: result}"""
+    monkeypatch.setattr(journal, 'machine_identity', lambda: {'hostname': 'test'})
+
+    def write(results):
+        j = journal.ScanJournal(str(tmp_path / 'journal.jsonl'))
+        j.begin()
+        for name, result in results.items():
+            j.record(name, result)
+        return j
+    return write
+
+
+def resumed(j, *names):
+    return j.resume([get_probe(name) for name in names])
+
+
+def test_finished_results_are_reused(interrupted):
+    j = interrupted({'Processor': ProcessorResult(model="x")})
+    assert resumed(j, 'Processor', 'Condition')['Processor'].model == "x"
+
+
+def test_finished_scan_is_not_resumed(interrupted):
+    j = interrupted({'Processor': ProcessorResult(model="x")})
+    j.finish()
+    assert resumed(j, 'Processor') == {}
+
+
+def test_stale_results_run_again(interrupted, monkeypatch):
+    j = interrupted({'Processor': ProcessorResult(model="x")})
+    now = time.time()
+    monkeypatch.setattr(journal.time, 'time', lambda: now + get_probe('Processor').valid_for + 1)
+    assert resumed(j, 'Processor') == {}
+
+
+@pytest.mark.parametrize('status', [Status.ERROR, Status.SKIPPED, Status.UNAVAILABLE])
+def test_unfinished_results_run_again(interrupted, status):
+    # A keyboard test that was closed or ran out of time asks the tester again
+    j = interrupted({'Keyboard': KeyboardResult(status=status, error="Keyboard test closed or not finished in time")})
+    assert resumed(j, 'Keyboard') == {}
+
+
+def test_dependent_probe_reused_with_its_dependencies(interrupted):
+    j = interrupted({'Processor': ProcessorResult(model="x"), 'CPU Bench': CpuBenchResult()})
+    assert set(resumed(j, 'Processor', 'CPU Bench', 'Condition')) == {'Processor', 'CPU Bench'}
+    # Without its dependency the bench runs again
+    j = interrupted({'CPU Bench': CpuBenchResult()})
+    assert resumed(j, 'Processor', 'CPU Bench') == {}
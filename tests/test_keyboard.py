@@ -0,0 +1,114 @@
+from laptopcheck_keyboard import PRESS, RELEASE, STUCK_MS, analyze, live_update, normalize
+
+MS = 1_000_000
+
+
+class Typist:
+    """Builds (ns, kind, keysym, event_ms) events the way the Tk handlers record them"""
+
+    def __init__(self):
+        self.t = 0
+        self.events = []
+
+    def __call__(self, kind, keysym, after_ms):
+        self.t += after_ms * MS
+        self.events.append((self.t, kind, keysym, self.t // MS))
+        return self
+
+    def tap(self, keysym, hold=80, gap=100):
+        return self(PRESS, keysym, gap)(RELEASE, keysym, hold)
+
+
+def test_clean_typing():
+    t = Typist()
+    for key in 'abc':
+        t.tap(key)
+    r = analyze(t.events, ('a', 'b', 'c', 'd'))
+    assert (r['tested'], r['missing']) == (3, ['d'])
+    assert r['chatter'] == r['stuck'] == r['slow'] == []
+    assert r['keys']['a']['hold_ms'] == 80.0
+
+
+def test_chatter_is_a_quick_second_press():
+    t = Typist().tap('a', hold=60)
+    t(PRESS, 'a', 5)(RELEASE, 'a', 40)
+    r = analyze(t.events, ('a',))
+    assert r['chatter'] == ['a']
+    assert r['keys']['a']['presses'] == 2
+
+
+def test_x11_autorepeat_is_one_hold():
+    # X11 repeats a held key as release/press pairs with no gap
+    t = Typist()(PRESS, 'b', 0)
+    for i in range(20):
+        t(RELEASE, 'b', 500 if i == 0 else 33)(PRESS, 'b', 0)
+    t(RELEASE, 'b', 10)
+    for key in 'cdefg':
+        t.tap(key)
+    r = analyze(t.events, tuple('bcdefg'))
+    key = r['keys']['b']
+    assert (key['presses'], key['repeats'], key['chatter']) == (1, 20, 0)
+    # Held on purpose: neither chatter nor a slow release
+    assert r['chatter'] == [] and r['slow'] == []
+
+
+def test_windows_autorepeat_is_one_hold():
+    # Windows repeats as presses without releases
+    t = Typist()(PRESS, 'w', 0)
+    for _ in range(5):
+        t(PRESS, 'w', 33)
+    t(RELEASE, 'w', 10)
+    r = analyze(t.events, ('w',))
+    assert (r['keys']['w']['presses'], r['keys']['w']['repeats']) == (1, 5)
+    assert r['chatter'] == []
+
+
+def test_stuck_and_slow_keys():
+    t = Typist()
+    for key in 'abcde':
+        t.tap(key, hold=90)
+    t.tap('s', hold=900)
+    t(PRESS, 'z', 10)
+    r = analyze(t.events, tuple('abcdesz'))
+    assert r['slow'] == ['s']
+    assert r['stuck'] == ['z']
+
+
+def test_shifted_keysyms_map_to_physical_keys():
+    assert normalize('exclam') == '1'
+    assert normalize('A') == 'a'
+    assert normalize('colon') == 'semicolon'
+
+
+def live(events):
+    """Live key state after ``events``, as the test window tracks it"""
+    state = {}
+    for ns, kind, keysym, _ in events:
+        s = state.setdefault(keysym, {'down': False, 'pressed': None, 'piece': None, 'released': None,
+                                      'repeating': False, 'chatter': False})
+        live_update(s, kind, ns)
+    return state
+
+
+def test_live_view_folds_x11_autorepeat():
+    t = Typist()(PRESS, 'a', 100)(RELEASE, 'a', 200)(PRESS, 'a', 0)
+    for _ in range(10):
+        t(RELEASE, 'a', 33)(PRESS, 'a', 0)
+    s = live(t.events)['a']
+    assert (s['down'], s['chatter'], s['repeating']) == (True, False, True)
+    # The hold is timed from the first press, not the last repeat
+    assert s['pressed'] == 100 * MS
+    assert not analyze(t.events, ('a',))['chatter']
+
+
+def test_live_view_chatter():
+    t = Typist().tap('a', hold=60)
+    t(PRESS, 'a', 5)
+    assert live(t.events)['a']['chatter']
+
+
+def test_live_view_times_stuck_from_the_press():
+    # Pressed again long after the last release: just pressed, not held since that release
+    t = Typist().tap('a')(PRESS, 'a', STUCK_MS + 1000)
+    s = live(t.events)['a']
+    assert s['down'] and (t.t - s['pressed']) / MS < STUCK_MS
@@ -0,0 +1,41 @@
+import os
+
+import laptopcheck_network as network
+from laptopcheck_parsers import read_net_interfaces
+
+from conftest import FIXTURES
+
+
+def test_loopback_bench_against_in_process_server():
+    r = network.bench(seconds=0.2, pings=20)
+    assert r['server'] == 'loopback'
+    test = r['tests']['loopback']
+    assert test['upload_mbps'] > 0
+    assert test['download_mbps'] > 0
+    latency = test['latency_ms']
+    assert 0 < latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max']
+
+
+def test_server_modes():
+    with network.BenchServer() as server:
+        assert len(network.measure_latency(server.address, pings=5)) == 5
+        assert network.measure_upload(server.address, seconds=0.1) > 0
+        assert network.measure_download(server.address, seconds=0.1) > 0
+
+
+def test_card_replaced():
+    assert network.card_replaced('17aa:225d', 'LENOVO') is False
+    assert network.card_replaced('1028:0244', 'LENOVO') is True
+    # Chip maker's own ID: retail and OEM cards alike, so no verdict
+    assert network.card_replaced('8086:0074', 'Dell Inc.') is None
+    assert network.card_replaced('1028:0244', 'QEMU') is None
+    assert network.card_replaced(None, 'LENOVO') is None
+
+
+def test_sysfs_fixture():
+    interfaces = {i['name']: i for i in read_net_interfaces(os.path.join(FIXTURES, 'sys_class_net'))}
+    wlan = interfaces['wlp0s20f3']
+    assert wlan['wireless'] and wlan['driver'] == 'iwlwifi'
+    assert wlan['pci_id'] == '8086:a0f0' and wlan['subsystem'] == '1028:0244'
+    assert wlan['stats']['rx_dropped'] == 1832
+    assert interfaces['lo']['virtual'] and not interfaces['enp0s31f6']['wireless']
@@ -0,0 +1,23 @@
+import laptopcheck_pro  # noqa: F401  registers the probes
+from laptopcheck_probes import build_probes
+
+
+def names(probes):
+    return [p.name for p in probes]
+
+
+def test_selected_probes_bring_their_dependencies():
+    assert names(build_probes(['CPU Bench'])) == ['Processor', 'CPU Bench']
+    assert names(build_probes(['Lid Opens'])) == ['Event Log', 'Lid Opens']
+
+
+def test_soft_ordering_does_not_add_probes():
+    # 'after' only orders probes that were selected anyway
+    probes = build_probes(['Network', 'CPU Bench'])
+    assert names(probes) == ['Processor', 'CPU Bench', 'Network']
+    assert probes[-1].deps == ('CPU Bench',)
+
+
+def test_condition_depends_on_everything_selected():
+    probes = build_probes(['Processor', 'Condition'])
+    assert probes[-1].deps == ('Processor',)
@@ -0,0 +1,51 @@
+import os
+import sys
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+import bench_probes as bench  # noqa: E402
+
+
+def replayed(machine):
+    with bench.replay(bench.MACHINES[machine]):
+        return {probe: bench.PROBES[probe]() for probe in bench.MACHINES[machine]['probes']}
+
+
+def test_linux_nvme():
+    r = replayed('linux-nvme')
+    assert r['Processor'].model == "11th Gen Intel(R) Core(TM) i7-1165G7 @ 2.80GHz"
+    assert [m.serial for m in r['RAM SPD'].modules] == ['36A1B2C4', '4F1E22A7']
+    assert (r['Battery'].batteries, r['Battery'].health, r['Battery'].cycles) == (1, 87.4, 412)
+    assert (r['Storage'].name, r['Storage'].serial) == ('nvme0n1', 'S4EWNF0M812345X')
+    # Wireless card from the sysfs tree, not the Ethernet port listed first
+    wifi = r['WiFi MAC']
+    assert (wifi.interface, wifi.mac, wifi.replaced) == ('wlp0s20f3', '34:C9:3D:12:AB:7E', True)
+
+
+def test_linux_dual_battery_and_command_fallback():
+    r = replayed('linux-dual')
+    assert (r['Battery'].batteries, r['Battery'].health) == (2, 83.5)
+    assert r['WiFi MAC'].mac == '34:C9:3D:12:AB:7E' and r['WiFi MAC'].replaced is None
+    assert (r['Event Log'].lid_opens, r['Lid Opens'].count) == (3, 3)
+
+
+def test_windows():
+    r = replayed('windows')
+    assert r['Processor'].model == "Intel(R) Core(TM) i5-8350U CPU @ 1.70GHz"
+    assert r['Storage'].serial == 'Y9SS10ABCDEF'
+    assert r['WiFi MAC'].mac == '3C:F0:11:A2:B3:C4'
+    assert r['Event Log'].firmware_updates == r['BIOS Flash'].count == 1
+
+
+def test_condition_of_replayed_machine():
+    condition = bench.pro.calculate_condition_score(bench.scan_results('linux-nvme', bench.MACHINES['linux-nvme']))
+    assert condition.rules == ['ram.mixed', 'wifi.replaced', 'battery.degraded']
+    assert (condition.score, condition.grade) == (80, 'GOOD')
+
+
+def test_compare_flags_changed_output_only():
+    baseline = {'cases': {}, 'outputs': {'m/P': {'value': 1}}}
+    assert bench.compare({}, {'m/P': {'value': 1}}, baseline, 0.3) == []
+    failures = bench.compare({}, {'m/P': {'value': 2}}, baseline, 0.3)
+    assert len(failures) == 1 and 'output changed' in failures[0]
@@ -0,0 +1,61 @@
+import copy
+import random
+
+import pytest
+
+import laptopcheck_scoring as scoring
+
+# Values either side of every threshold in DEFAULT_POLICY, plus missing
+VALUES = {
+    'ram_modules': [1, 2, 4],
+    'memtest_errors': [0, 1, 12],
+    'wifi_replaced': [0, 1],
+    'battery_health': [55.0, 79.9, 80, 85.5, 90, 99.0],
+    'disk_smart_failed': [0, 1],
+    'disk_wear': [0, 49, 50, 89, 90, 100],
+    'disk_bad_sectors': [0, 1, 300],
+    'disk_seq_read': [80.0, 149.9, 150, 2800.0],
+    'temp_delta': [10.0, 25, 25.1, 40.0],
+    'cpu_vs_peers': [60.0, 70, 84.9, 85, 101.0],
+}
+
+
+def varied_rows(n, seed=7):
+    rng = random.Random(seed)
+    return [{name: rng.choice(values + [None]) for name, values in VALUES.items()} for _ in range(n)]
+
+
+def test_evaluate_agrees_with_score():
+    policy = scoring.DEFAULT_POLICY
+    rows = varied_rows(3000)
+    result = scoring.evaluate(policy, scoring.columns(rows))
+    for i, row in enumerate(rows):
+        total, grade, color, fired = scoring.score(policy, row)
+        assert (int(result['score'][i]), result['grade'][i], result['color'][i] or None) == (total, grade, color)
+        assert scoring.fired_rules(result, i) == [rule for rule, _ in fired]
+
+
+def test_validate_maps_deprecated_fields_on_a_copy():
+    policy = copy.deepcopy(scoring.DEFAULT_POLICY)
+    policy['rules'][2]['field'] = 'wifi_mac'
+    with pytest.warns(DeprecationWarning, match="wifi_mac"):
+        checked = scoring.validate(policy)
+    assert checked['rules'][2]['field'] == 'wifi_replaced'
+    assert policy['rules'][2]['field'] == 'wifi_mac'
+
+
+def test_validate_rejects_unknown_fields():
+    policy = copy.deepcopy(scoring.DEFAULT_POLICY)
+    policy['rules'][0]['field'] = 'ram_colour'
+    with pytest.raises(ValueError, match="ram_colour"):
+        scoring.validate(policy)
+
+
+def test_policy_is_loaded_once(monkeypatch):
+    loads = []
+    monkeypatch.setattr(scoring, 'load_policy', lambda: loads.append(1) or scoring.DEFAULT_POLICY)
+    monkeypatch.setattr(scoring, '_policy', None)
+    assert scoring.get_policy() is scoring.get_policy()
+    assert len(loads) == 1
+    scoring.get_policy(refresh=True)
+    assert len(loads) == 2
@@ -0,0 +1,41 @@
+import json
+import os
+
+import laptopcheck_storage as storage
+
+from conftest import FIXTURES
+
+
+def fixture_json(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_smartctl_nvme():
+    h = storage.parse_smartctl(fixture_json('smartctl_nvme.json'))
+    assert (h['protocol'], h['device'], h['passed']) == ('NVMe', '/dev/nvme0n1', True)
+    assert (h['wear'], h['spare'], h['media_errors']) == (7, 100, 0)
+    assert h['reallocated'] is None
+    assert h['written_tb'] == 14.57
+
+
+def test_smartctl_ata():
+    h = storage.parse_smartctl(fixture_json('smartctl_ata.json'))
+    assert (h['protocol'], h['model'], h['passed']) == ('ATA', 'CT500MX500SSD1', True)
+    # Wear from the life-left attribute, reallocated from attributes 5/197/198
+    assert (h['wear'], h['reallocated']) == (12, 3)
+    assert h['rotational'] is False
+    assert h['written_tb'] == 11.0
+
+
+def test_nvme_cli_smart_log_matches_smartctl():
+    cli = storage.parse_nvme_smart_log(fixture_json('nvme_smart_log.json'), 'nvme0')
+    smartctl = storage.parse_smartctl(fixture_json('smartctl_nvme.json'))
+    for key in ('passed', 'temperature', 'power_on_hours', 'wear', 'spare', 'media_errors', 'written_tb'):
+        assert cli[key] == smartctl[key], key
+
+
+def test_lsblk():
+    with open(os.path.join(FIXTURES, 'lsblk_P.txt'), encoding='utf-8') as f:
+        rows = storage.parse_lsblk(f.read())
+    assert [(r['NAME'], r['SERIAL']) for r in rows] == [('sda', 'WD-WX12A3456789'), ('nvme0n1', 'S4EWNF0M812345X')]